@@ -0,0 +1,355 @@
+# benchmarks/throughput.py
+"""
+Benchmark de throughput ponta a ponta (servidor + AutoController + PlantSimulator).
+
+Uso (a partir de `New Project/src`):
+
+    python -m benchmarks.throughput --duration 900 --speed 20 --out bench.json
+    python -m benchmarks.throughput --baseline benchmarks/baseline.json
+    python -m benchmarks.throughput --save-baseline benchmarks/baseline.json
+
+Sai com código 1 se alguma métrica piorar além da tolerância em relação ao baseline,
+ou se o estoque do rack encher dentro da janela medida (as métricas de fluxo
+passariam a medir a acumulação nas esteiras).
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from addresses import Coils
+from clock import SimClock
+from controllers import AutoController
+from server import FactoryModbusEventServer
+from services.DAO import MES
+from simulators.plant import PlantSimulator
+
+CLIENTS = ("rafael_ltda", "maria_sa", "joao_corp", "ana_ind")
+
+# métrica -> sentido ("higher" = maior é melhor, "lower" = menor é melhor)
+METRICS: Dict[str, str] = {
+    "boxes_classified_per_hour": "higher",
+    "boxes_stored_per_hour": "higher",
+    "order_lead_time_p50_s": "lower",
+    "order_lead_time_p90_s": "lower",
+    "order_lead_time_p99_s": "lower",
+    "orders_fulfilled": "higher",
+    "crane_utilization": "lower",
+    "tt1_utilization": "lower",
+    "tt2_utilization": "lower",
+    "tt3_utilization": "lower",
+}
+
+
+@dataclass
+class Scenario:
+    # tempo virtual medido: com a chegada e os pedidos padrão o estoque não enche
+    # (sem pedidos ele enche em ~810 s; ver `storage_full_s`)
+    duration_s: float = 900.0
+    speed: float = 20.0  # aceleração do SimClock
+    scan_time: float = 0.05
+    arrival_period_s: float = 30.0  # uma caixa a cada N segundos virtuais
+    mix: Dict[str, float] = field(
+        default_factory=lambda: {"BLUE": 0.5, "GREEN": 0.3, "OTHER": 0.2}
+    )
+    order_period_s: float = 45.0  # um pedido (1 caixa) a cada N segundos: ~20 amostras de prazo
+    order_colors: Tuple[str, ...] = ("BLUE", "GREEN", "OTHER")
+    stock_fulfillment: bool = True  # FulfillmentPlanner: pedido atendido pelo estoque se for mais rápido
+    seed: int = 7
+    port: int = 5021
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Percentil com interpolação linear (q em 0..100); None se vazio."""
+    if not values:
+        return None
+    xs = sorted(values)
+    k = (len(xs) - 1) * q / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(xs) - 1)
+    return xs[lo] + (xs[hi] - xs[lo]) * (k - lo)
+
+
+def arrival_schedule(sc: Scenario) -> List[Tuple[float, str]]:
+    """Sequência determinística (seed) de (instante, cor) das caixas."""
+    rng = random.Random(sc.seed)
+    colors = list(sc.mix)
+    weights = [sc.mix[c] for c in colors]
+    out = []
+    t = 0.0
+    while t < sc.duration_s:
+        out.append((t, rng.choices(colors, weights)[0]))
+        t += sc.arrival_period_s
+    return out
+
+
+def order_schedule(sc: Scenario) -> List[Tuple[float, str]]:
+    if sc.order_period_s <= 0:
+        return []
+    out = []
+    t, i = sc.order_period_s, 0
+    while t < sc.duration_s:
+        out.append((t, sc.order_colors[i % len(sc.order_colors)]))
+        t += sc.order_period_s
+        i += 1
+    return out
+
+
+def _order_lead_times(
+    orders: List[Tuple[float, str]], sim: PlantSimulator
+) -> Tuple[List[float], int]:
+    """
+    Casa cada pedido com a primeira caixa da mesma cor entregue depois dele
+    (FIFO por cor): guardada pelo transelevador após passar pela esteira
+    central, ou retirada do estoque e entregue na saída do rack.
+    """
+    delivered = sorted(
+        [(t, box, box.entered("central")) for t, box, _ in sim.stored if box.entered("central") is not None]
+        + [(box.entered("delivered"), box, box.entered("delivered")) for box in sim.delivered]
+    )
+    used = set()
+    leads = []
+    for t_order, color in orders:
+        for t_done, box, t_start in delivered:
+            if box.id in used or box.color != color or t_start < t_order:
+                continue
+            used.add(box.id)
+            leads.append(t_done - t_order)
+            break
+    return leads, len(leads)
+
+
+class _StorageWatch:
+    """Dorme no relógio simulado anotando quando o estoque do rack encheu."""
+
+    def __init__(self, wh, clock, step_s: float = 5.0):
+        self.wh = wh
+        self.clock = clock
+        self.step_s = step_s
+        self.at: Optional[float] = None
+
+    def sleep_until(self, t: float) -> None:
+        while True:
+            if self.at is None and not self.wh.grid.free_cells(self.wh.storage_columns):
+                self.at = self.clock.monotonic()
+            left = t - self.clock.monotonic()
+            if left <= 0:
+                return
+            self.clock.sleep(min(left, self.step_s))
+
+
+def run(sc: Scenario, verbose: bool = False) -> dict:
+    """Executa um cenário e devolve o resultado (dict serializável em JSON)."""
+    clock = SimClock(speed=sc.speed)
+    # pedidos do MES num arquivo temporário: o benchmark não escreve em src/orders
+    MES.use_config_path(os.path.join(tempfile.mkdtemp(prefix="throughput-"), "orders.json"))
+    srv = FactoryModbusEventServer(
+        "127.0.0.1", sc.port, scan_time=sc.scan_time, verbose=False, clock=clock
+    )
+    auto = AutoController(srv, verbose=False)
+    auto.fulfillment.enabled = sc.stock_fulfillment
+    srv.auto = auto
+    # o simulador começa com as mesmas caixas que o rack do servidor
+    rack = srv.lines.rack
+    sim = PlantSimulator(
+        srv,
+        initial_rack={rack.config.address(c, r): p for c, r, p, _, _ in rack.warehouse.grid.occupied()},
+    )
+
+    arrivals = arrival_schedule(sc)
+    orders = order_schedule(sc)
+    events = sorted(
+        [(t, "box", c) for t, c in arrivals] + [(t, "order", c) for t, c in orders]
+    )
+
+    sink = sys.stdout if verbose else io.StringIO()
+    wall0 = time.monotonic()
+    with contextlib.redirect_stdout(sink):
+        srv.start()
+        sim.start()
+        clock.sleep(1.0)
+        sim.press(Coils.Start)
+
+        t0 = clock.monotonic()
+        tt0 = {t.name: t.busy_s for t in sim.tables}
+        crane0 = sim.crane.busy_s
+        created_orders: List[Tuple[float, str]] = []
+        full = _StorageWatch(rack.warehouse, clock)
+        for t_ev, kind, color in events:
+            full.sleep_until(t0 + t_ev)
+            if kind == "box":
+                sim.emit(color)
+            else:
+                # mesmo caminho do Create_OP: pedido em memória + persistido no MES
+                client = CLIENTS[len(created_orders) % len(CLIENTS)]
+                auto.orders.create_order(color=color, boxes=1)
+                MES().add_persistent_order(client=client, color=color, boxes=1, resource=1)
+                auto.enter_order_mode()
+                created_orders.append((clock.monotonic() - t0, color))
+        full.sleep_until(t0 + sc.duration_s)
+
+        elapsed = clock.monotonic() - t0
+        stored = [s for s in sim.stored if s[0] - t0 <= sc.duration_s]
+        classified = [
+            b
+            for b in sim.boxes.values()
+            if any(
+                w in ("estoque", "central") and t - t0 <= sc.duration_s
+                for w, t in b.history
+            )
+        ]
+        leads, fulfilled = _order_lead_times(
+            [(t0 + t, c) for t, c in created_orders], sim
+        )
+
+        sim.stop()
+        srv.stop()
+        auto.stop()
+
+    hours = elapsed / 3600.0
+    metrics = {
+        "boxes_emitted": len(arrivals),
+        "boxes_classified_per_hour": round(len(classified) / hours, 2),
+        "boxes_stored_per_hour": round(len(stored) / hours, 2),
+        "orders_created": len(created_orders),
+        "orders_fulfilled": fulfilled,
+        "orders_from_stock": auto.fulfillment.from_stock,
+        "order_lead_time_p50_s": percentile(leads, 50),
+        "order_lead_time_p90_s": percentile(leads, 90),
+        "order_lead_time_p99_s": percentile(leads, 99),
+        "crane_utilization": round((sim.crane.busy_s - crane0) / elapsed, 4),
+    }
+    for t in sim.tables:
+        metrics[f"{t.name}_utilization"] = round((t.busy_s - tt0[t.name]) / elapsed, 4)
+    for k in ("order_lead_time_p50_s", "order_lead_time_p90_s", "order_lead_time_p99_s"):
+        if metrics[k] is not None:
+            metrics[k] = round(metrics[k], 2)
+
+    return {
+        "benchmark": "throughput",
+        "scenario": asdict(sc),
+        "metrics": metrics,
+        "meta": {
+            "virtual_s": round(elapsed, 2),
+            # colunas de estoque sem posição livre a partir daqui (None = nunca):
+            # depois disso as caixas só acumulam nas esteiras
+            "storage_full_s": None if full.at is None else round(full.at - t0, 1),
+            "wall_s": round(time.monotonic() - wall0, 2),
+            "python": platform.python_version(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+        },
+    }
+
+
+def compare(
+    result: dict,
+    baseline: dict,
+    tolerance: float = 0.10,
+    overrides: Optional[Dict[str, float]] = None,
+) -> List[str]:
+    """
+    Compara `result` com `baseline` e devolve a lista de regressões.
+
+    Uma métrica regride quando piora (no sentido de `METRICS`) mais que a
+    tolerância relativa (`tolerance`, ou `overrides[métrica]`).
+    """
+    overrides = overrides or {}
+    regressions = []
+    cur, ref = result["metrics"], baseline["metrics"]
+    for name, sense in METRICS.items():
+        a, b = cur.get(name), ref.get(name)
+        if a is None or b is None:
+            continue
+        tol = overrides.get(name, tolerance)
+        limit = abs(b) * tol
+        worse = (b - a) if sense == "higher" else (a - b)
+        if worse > limit:
+            regressions.append(
+                f"{name}: {a} vs baseline {b} (tolerância {tol:.0%}, sentido={sense})"
+            )
+    return regressions
+
+
+def _parse_overrides(items: List[str]) -> Dict[str, float]:
+    out = {}
+    for item in items:
+        name, _, value = item.partition("=")
+        if name not in METRICS:
+            raise SystemExit(f"métrica desconhecida em --tol: {name}")
+        out[name] = float(value)
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark de throughput da planta")
+    ap.add_argument("--duration", type=float, default=Scenario.duration_s)
+    ap.add_argument("--speed", type=float, default=Scenario.speed)
+    ap.add_argument("--arrival-period", type=float, default=Scenario.arrival_period_s)
+    ap.add_argument("--order-period", type=float, default=Scenario.order_period_s)
+    ap.add_argument("--seed", type=int, default=Scenario.seed)
+    ap.add_argument(
+        "--no-stock-fulfillment", action="store_true",
+        help="pedidos só pela produção (rota ORDER), sem retirada do estoque",
+    )
+    ap.add_argument("--port", type=int, default=Scenario.port)
+    ap.add_argument("--out", default="bench_throughput.json")
+    ap.add_argument("--baseline", help="JSON de referência para comparação")
+    ap.add_argument("--save-baseline", help="grava o resultado também como baseline")
+    ap.add_argument("--tolerance", type=float, default=0.10)
+    ap.add_argument(
+        "--tol", action="append", default=[], metavar="METRICA=FRAC",
+        help="tolerância por métrica (ex.: --tol crane_utilization=0.2)",
+    )
+    ap.add_argument("--verbose", action="store_true")
+    args = ap.parse_args(argv)
+
+    sc = Scenario(
+        duration_s=args.duration,
+        speed=args.speed,
+        arrival_period_s=args.arrival_period,
+        order_period_s=args.order_period,
+        stock_fulfillment=not args.no_stock_fulfillment,
+        seed=args.seed,
+        port=args.port,
+    )
+    result = run(sc, verbose=args.verbose)
+
+    full_s = result["meta"]["storage_full_s"]
+    # estoque cheio: o resultado não vale como baseline
+    saves = (args.out,) if full_s is not None else (args.out, args.save_baseline)
+    for path in filter(None, saves):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    print(json.dumps(result["metrics"], indent=2))
+    if full_s is not None:
+        print(
+            f"[BENCH] FALHA: estoque cheio em {full_s:.0f}s de {sc.duration_s:.0f}s; a partir daí "
+            "as caixas acumulam nas esteiras e TT1/classificação medem a acumulação. "
+            "Reduza --duration ou a chegada (--arrival-period)"
+        )
+        return 1
+
+    code = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.tolerance, _parse_overrides(args.tol))
+        for r in regressions:
+            print(f"[BENCH] REGRESSÃO {r}")
+        if not regressions:
+            print("[BENCH] OK: dentro da tolerância do baseline")
+        code = 1 if regressions else 0
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import threading
+import time
+from typing import Optional, Protocol
+
+
+class Clock(Protocol):
+    """
+    Interface comum dos relógios (`RealClock`, `SimClock`): é o tipo que os
+    construtores aceitam em `clock=`.
+    """
+
+    speed: Optional[float]
+
+    def time(self) -> float: ...
+
+    def monotonic(self) -> float: ...
+
+    def sleep(self, seconds: float) -> None: ...
+
+    def wait(self, event: threading.Event, timeout: Optional[float] = None) -> bool: ...
+
+    def wait_condition(
+        self, cond: threading.Condition, timeout: Optional[float] = None
+    ) -> None: ...
+
+
+class RealClock:
+    """
+    Relógio de parede: delega para o módulo `time`.
+
+    Todo sleep, timeout e timestamp do controlador passa por um relógio do
+    servidor (`server.clock`), para que a mesma lógica rode em tempo real ou
+    em tempo simulado (`SimClock`).
+    """
+
+    speed = 1.0
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def wait(self, event: threading.Event, timeout: Optional[float] = None) -> bool:
+        """Equivalente a `event.wait(timeout)`, com o timeout no tempo do relógio."""
+        return event.wait(timeout)
+
+    def wait_condition(
+        self, cond: threading.Condition, timeout: Optional[float] = None
+    ) -> None:
+        """
+        Equivalente a `cond.wait(timeout)` (o lock de `cond` precisa estar adquirido).
+        Pode acordar antes do timeout: o chamador deve revalidar o prazo com
+        `monotonic()`.
+        """
+        cond.wait(timeout)
+
+
+class SimClock(RealClock):
+    """
+    Relógio simulado.
+
+    - `speed > 0`: o tempo virtual corre `speed` vezes mais rápido que o real
+      (ex.: `SimClock(speed=60)` roda uma hora de turno em um minuto).
+    - `speed=None`: o tempo só anda com `advance(dt)`, de forma determinística;
+      quem chama `sleep` fica bloqueado até o tempo virtual passar do prazo.
+
+    Args:
+        speed: Fator de aceleração ou None para modo passo-a-passo
+        start: Instante virtual inicial (epoch, em segundos)
+        poll_s: Fatia de espera real usada no modo passo-a-passo para
+            esperas em Event/Condition
+    """
+
+    def __init__(
+        self,
+        speed: Optional[float] = 10.0,
+        start: float = 0.0,
+        poll_s: float = 0.001,
+    ):
+        if speed is not None and speed <= 0:
+            raise ValueError(f"speed deve ser > 0 ou None, recebido: {speed}")
+        self.speed = speed
+        self.poll_s = poll_s
+        self._cond = threading.Condition()
+        self._start = start
+        self._now = start  # usado apenas no modo passo-a-passo
+        self._real0 = time.monotonic()
+
+    # -------- leitura --------
+    def time(self) -> float:
+        if self.speed is None:
+            return self._now
+        return self._start + (time.monotonic() - self._real0) * self.speed
+
+    def monotonic(self) -> float:
+        return self.time()
+
+    # -------- modo passo-a-passo --------
+    def advance(self, seconds: float) -> None:
+        """Avança o tempo virtual (somente com `speed=None`)."""
+        if self.speed is not None:
+            raise RuntimeError("advance() só é usado com speed=None.")
+        with self._cond:
+            self._now += seconds
+            self._cond.notify_all()
+
+    # -------- espera --------
+    def sleep(self, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        if self.speed is not None:
+            time.sleep(seconds / self.speed)
+            return
+        with self._cond:
+            deadline = self._now + seconds
+            while self._now < deadline:
+                self._cond.wait()
+
+    def wait(self, event: threading.Event, timeout: Optional[float] = None) -> bool:
+        if timeout is None:
+            return event.wait()
+        if self.speed is not None:
+            return event.wait(max(0.0, timeout) / self.speed)
+        deadline = self._now + timeout
+        while self._now < deadline:
+            if event.wait(self.poll_s):
+                return True
+        return event.is_set()
+
+    def wait_condition(
+        self, cond: threading.Condition, timeout: Optional[float] = None
+    ) -> None:
+        if timeout is None:
+            cond.wait()
+        elif self.speed is not None:
+            cond.wait(max(0.0, timeout) / self.speed)
+        else:
+            cond.wait(min(timeout, self.poll_s))
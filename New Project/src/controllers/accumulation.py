@@ -0,0 +1,136 @@
+# accumulation.py
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+EMPTY = "EMPTY"  # sem caixa
+RECEIVING = "RECEIVING"  # motor ligado trazendo uma caixa até a ponta
+HOLDING = "HOLDING"  # caixa parada na ponta, esperando a zona seguinte
+RELEASING = "RELEASING"  # motor ligado entregando a caixa para a zona seguinte
+
+
+@dataclass(frozen=True)
+class Zone:
+    """Uma esteira (zona) da cadeia: motor, sensor da ponta e sensor do meio (opcional)."""
+
+    name: str
+    motor: int  # DI do motor
+    exit_sensor: int  # coil: caixa na ponta da zona
+    mid_sensor: Optional[int] = None  # coil: caixa no meio da zona
+
+
+class AccumulationConveyor:
+    """
+    Esteira de acumulação com N zonas em série, sem pressão entre caixas
+    (cada zona guarda no máximo uma caixa e só entrega quando a seguinte está vazia).
+
+    É reativa: `update()` roda na thread de scan a cada borda de um dos
+    sensores da cadeia (`sensors`) e recalcula o estado de todas as zonas a
+    partir da imagem do scan — sem threads, sem polling e sem pulsos de tempo
+    fixo. Várias caixas podem estar em trânsito ao mesmo tempo.
+
+    A última zona só fica vazia quando a caixa sai do seu sensor da ponta
+    (retirada pelo transelevador).
+    """
+
+    def __init__(
+        self,
+        server,
+        zones: Sequence[Zone],
+        entry_sensor: int,
+        name: str = "acumulação",
+        verbose: bool = False,
+    ):
+        if not zones:
+            raise ValueError("A esteira de acumulação precisa de pelo menos uma zona.")
+        self.server = server
+        self.zones = list(zones)
+        self.entry_sensor = entry_sensor  # caixa esperando na entrada da zona 0
+        self.name = name
+        self.verbose = verbose
+
+        self._lock = threading.Lock()
+        self.state: Dict[str, str] = {z.name: EMPTY for z in self.zones}
+        # caixas dentro de cada zona, contadas pelas bordas dos sensores: a
+        # esteira de montante não é controlada por esta cadeia e pode empurrar
+        # mais de uma caixa para a mesma zona
+        self.count: Dict[str, int] = {z.name: 0 for z in self.zones}
+        self._prev: Dict[int, bool] = {}  # nível de cada sensor no último update
+        self.delivered = 0  # caixas que chegaram na ponta da última zona
+
+    @property
+    def sensors(self) -> List[int]:
+        """Coils que disparam `update()`."""
+        out = [self.entry_sensor]
+        for z in self.zones:
+            out.append(z.exit_sensor)
+            if z.mid_sensor is not None:
+                out.append(z.mid_sensor)
+        return out
+
+    def in_flight(self) -> int:
+        """Quantidade de zonas com caixa."""
+        return sum(1 for s in self.state.values() if s != EMPTY)
+
+    def update(self) -> None:
+        read = self.server.get_sensor
+        with self._lock:
+            first_run = not self._prev
+            level = {c: read(c) for c in self.sensors}
+            prev = self._prev or {c: False for c in level}
+            rose = {c for c in level if level[c] and not prev[c]}
+            fell = {c for c in level if prev[c] and not level[c]}
+            self._prev = level
+
+            st, cnt = self.state, self.count
+            last = len(self.zones) - 1
+
+            # contagem: entra pela borda de subida do sensor do meio (ou, sem
+            # ele, quando a zona anterior entrega) e sai pela descida da ponta
+            for i, z in enumerate(self.zones):
+                if z.mid_sensor is not None:
+                    if z.mid_sensor in rose:
+                        cnt[z.name] += 1
+                elif i > 0 and self.zones[i - 1].exit_sensor in fell:
+                    cnt[z.name] += 1
+                if z.exit_sensor in fell:
+                    cnt[z.name] = max(0, cnt[z.name] - 1)
+                if first_run or cnt[z.name] == 0:
+                    # partida com caixas já na esteira
+                    cnt[z.name] = max(cnt[z.name], int(level[z.exit_sensor]))
+
+            # de jusante para montante: uma zona liberada no fim da cadeia já
+            # pode receber a caixa da anterior na mesma passada
+            for i in range(last, -1, -1):
+                z = self.zones[i]
+                at_exit = level[z.exit_sensor]
+                s = st[z.name]
+
+                if at_exit:
+                    if s in (EMPTY, RECEIVING):
+                        if s == RECEIVING and i == last:
+                            self.delivered += 1
+                        s = HOLDING
+                elif s in (HOLDING, RELEASING):
+                    # caixa saiu da ponta (entregue ou retirada)
+                    s = RECEIVING if cnt[z.name] else EMPTY
+                elif s == EMPTY and cnt[z.name]:
+                    s = RECEIVING
+
+                if s == HOLDING and i < last and st[self.zones[i + 1].name] == EMPTY:
+                    s = RELEASING
+                    st[self.zones[i + 1].name] = RECEIVING  # reserva a zona seguinte
+
+                if s != st[z.name] and self.verbose:
+                    print(f"[{self.name}] {z.name}: {st[z.name]} -> {s} (caixas={cnt[z.name]})")
+                st[z.name] = s
+
+            first = self.zones[0].name
+            if st[first] == EMPTY and level[self.entry_sensor]:
+                st[first] = RECEIVING
+                if self.verbose:
+                    print(f"[{self.name}] {first}: {EMPTY} -> {RECEIVING} (entrada)")
+
+            self.server.set_actuators(
+                {z.motor: st[z.name] in (RECEIVING, RELEASING) for z in self.zones}
+            )
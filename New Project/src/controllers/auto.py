@@ -1,13 +1,28 @@
 # auto.py
 from queue import Queue
-import threading, time
+import threading
+from typing import Optional
 from addresses import Coils, Inputs
 from services.orders import OrderManager
 from services.DAO import MES
+from controllers.vision import HalClassifier
+from controllers.fulfillment import FulfillmentPlanner
+from controllers.resources import TT1, TT2
 
 
 class AutoController:
-    def __init__(self, server, verbose: bool = False):
+    def __init__(
+        self,
+        server,
+        verbose: bool = False,
+        hal_mode: str = "stop",
+        hal_align_ms: int = 180,
+        hal_window_ms: int = 700,
+        hal_move_offset_s: Optional[float] = None,
+        hal_move_window_s: float = 0.6,
+        belt_speed_mps: Optional[float] = None,
+        hal_camera_distance_m: Optional[float] = None,
+    ):
         self.server = server
         self.verbose = verbose
         self._thread = None
@@ -19,7 +34,6 @@ class AutoController:
 
         self.lines = self.server.lines
 
-        self.turntable_busy = False
         self.active_job = None
 
         self._pending_lock = threading.Lock()
@@ -30,7 +44,6 @@ class AutoController:
 
         self.tt2_q: Queue[str] = Queue()  # fila própria da turntable 2
         self._tt2_worker_th = None
-        self.turntable2_busy = False
 
         self.TT2_GIRO_S = 3
         self.TT2_RETORNO_S = 3
@@ -43,9 +56,57 @@ class AutoController:
 
         self._hal_prev = False
         self._hal_inhibit = False
+        self.hal_edges = 0  # bordas de subida do Sensor_Hall (inclusive as inibidas)
+        # classificação por bordas da visão (decisão antecipada após
+        # `confirm_scans` scans consistentes; a janela cheia é a reserva)
+        self.hal = HalClassifier(server, confirm_scans=2, verbose=verbose)
+
+        # "stop": para a Esteira_Producao_2 em todo HAL (padrão)
+        # "move": classifica com a esteira rodando e só para se a leitura for
+        #         ambígua. A janela é medida a partir da borda do HAL pelo tempo
+        #         de trânsito da esteira: a caixa chega debaixo da câmera
+        #         hal_move_offset_s depois da borda (padrão: distância
+        #         HAL→câmera / velocidade da esteira) e precisa ser decidida em
+        #         hal_move_window_s, antes de sair do campo da câmera
+        # janela cheia (parada) do hal_sequence: hal_align_ms + hal_window_ms
+        self.hal_align_ms = hal_align_ms
+        self.hal_window_ms = hal_window_ms
+        if hal_move_offset_s is None and belt_speed_mps and hal_camera_distance_m is not None:
+            hal_move_offset_s = hal_camera_distance_m / belt_speed_mps
+        self.hal_move_offset_s = hal_move_offset_s
+        self.hal_move_window_s = hal_move_window_s
+        self.hal_mode = hal_mode
+        self.hal_stops = 0  # paradas da esteira no HAL (modo "move": só as ambíguas)
 
         self.fulfillment_mode = "stock"
 
+        # pedidos atendidos pelo estoque quando for mais rápido que a produção
+        self.fulfillment = FulfillmentPlanner(self, verbose=verbose)
+
+    @property
+    def hal_mode(self) -> str:
+        return self._hal_mode
+
+    @hal_mode.setter
+    def hal_mode(self, mode: str) -> None:
+        if mode not in ("stop", "move"):
+            raise ValueError(f"hal_mode inválido: {mode}. Use 'stop' ou 'move'")
+        if mode == "move" and self.hal_move_offset_s is None:
+            raise ValueError(
+                "hal_mode='move' precisa do atraso HAL→câmera: informe hal_move_offset_s "
+                "ou belt_speed_mps e hal_camera_distance_m"
+            )
+        self._hal_mode = mode
+
+    # estado das mesas (a posse fica no server.resources)
+    @property
+    def turntable_busy(self) -> bool:
+        return self.server.resources.busy(TT1)
+
+    @property
+    def turntable2_busy(self) -> bool:
+        return self.server.resources.busy(TT2)
+
     def join(self, timeout=2.0):
         if self._thread and self._thread.is_alive():
             self._thread.join(timeout)
@@ -70,6 +131,8 @@ class AutoController:
 
         self._thread.start()
 
+        self.fulfillment.start()
+
         # inicia consumidor da fila de chegadas
         if not self._arrival_worker_th or not self._arrival_worker_th.is_alive():
             self._arrival_worker_th = threading.Thread(
@@ -88,6 +151,7 @@ class AutoController:
         """Para o consumidor da fila e aguarda as threads finalizarem."""
         self.running = False
         self._stop_event.set()
+        self.fulfillment.stop()
         # desbloqueia o get() do worker
         try:
             self.tt2_q.put_nowait(None)
@@ -117,8 +181,11 @@ class AutoController:
             has_orders = False
             is_order = False
 
-        if self._should_route_to_order(klass):
-            self.tt2_q.put(("ORDER", klass))
+        # a caixa é prometida ao pedido já aqui: o FulfillmentPlanner não
+        # tira do estoque uma caixa que já está a caminho da Central
+        order = self.orders.allocate(klass) if self._should_route_to_order(klass) else None
+        if order is not None:
+            self.tt2_q.put(("ORDER", klass, order))
             if self.verbose:
                 print(
                     f"[HAL] classificado (pedido): {klass} -> atender agora na Central"
@@ -179,14 +246,61 @@ class AutoController:
                 with self._pending_lock:
                     self._pending_enq.discard(sensor_addr)
 
-        t = threading.Timer(delay_s, _do_enqueue)
-        t.daemon = True
+        def _delayed():
+            self.server.clock.sleep(delay_s)
+            _do_enqueue()
+
+        t = threading.Thread(target=_delayed, name="arrival-delay", daemon=True)
         t.start()
 
     def enqueue_hal(self, sensor_addr: int) -> None:
+        self.hal_edges += 1
         # Só enfileira se não estiver inibido, evitando ricochetes por nível
-        if not getattr(self, "_hal_inhibit", False):
-            self.arrival_q.put(("HAL", sensor_addr))
+        if getattr(self, "_hal_inhibit", False):
+            return
+        if self.hal_mode == "move":
+            # a caixa não espera a arrival_q: a janela corre com a esteira
+            self._hal_inhibit = True
+            threading.Thread(
+                target=self._hal_on_the_move,
+                args=(self.server.clock.monotonic(),),
+                name="hal-move",
+                daemon=True,
+            ).start()
+            return
+        self.arrival_q.put(("HAL", sensor_addr))
+
+    def _hal_on_the_move(self, t_edge: float, debounce: int = 2) -> None:
+        """Modo "move": classifica sem parar a esteira; para só se for ambíguo."""
+        try:
+            clock = self.server.clock
+            clock.sleep(t_edge + self.hal_move_offset_s - clock.monotonic())
+            result = self.hal.classify(self.hal_move_window_s, debounce)
+
+            if result.ambiguous:
+                # a caixa ainda está no campo da câmera: para e usa a janela cheia
+                if self.server.verbose:
+                    print(f"[HAL] leitura ambígua em movimento {result.samples}, parando esteira")
+                self.server.set_actuator(Inputs.Esteira_Producao_2, False)
+                self.hal_stops += 1
+                try:
+                    # mesma janela cheia do hal_sequence
+                    full_s = (self.hal_align_ms + self.hal_window_ms) / 1000.0
+                    result = self.hal.classify(full_s, debounce)
+                finally:
+                    if self.server.machine_state == "running":
+                        self.server.set_actuator(Inputs.Esteira_Producao_2, True)
+
+            klass = result.klass
+            if self.verbose:
+                print(
+                    f"[HAL] classificado em movimento: {klass} ({result.elapsed * 1e3:.0f} ms, "
+                    f"blue={result.samples['BLUE']}, green={result.samples['GREEN']})"
+                )
+            self.server.tracker.classify(klass)
+            self.on_hal_classified(klass)
+        finally:
+            self._hal_inhibit = False
 
     def _arrival_worker(self):
         stop_evt = getattr(self.server, "_stop_evt", None)
@@ -240,7 +354,8 @@ class AutoController:
 
                     # 1) Para a esteira de produção 2 uma única vez
                     self.server.set_actuator(Inputs.Esteira_Producao_2, False)
-                    time.sleep(0.05)
+                    self.hal_stops += 1
+                    self.server.clock.sleep(0.05)
 
                     # 2) Roda a janela de classificação (sua função atual)
                     result = self.hal_sequence()
@@ -251,7 +366,7 @@ class AutoController:
                             f"[HAL] classificação concluída ({result}), religando Esteira_Producao_2"
                         )
                     self.server.set_actuator(Inputs.Esteira_Producao_2, True)
-                    # time.sleep(0.12)
+                    # self.server.clock.sleep(0.12)
                     # self.server.set_actuator(Inputs.Esteira_Producao_2, False)
                 finally:
                     # Libera novas bordas de HAL
@@ -260,11 +375,18 @@ class AutoController:
                 self.arrival_q.task_done()
                 continue
 
-            # espere a mesa estar livre
-            while self.turntable_busy and not (stop_evt and stop_evt.is_set()):
-                time.sleep(0.01)
+            # espere a mesa estar livre: a reserva da TT1 vale para o ciclo
+            # inteiro e é liberada pelo pós-limite quando a caixa sai da mesa
+            tt1 = self.server.resources.request(TT1, f"arrival:{tipo}")
+            while not tt1.wait(1.0):
+                if stop_evt and stop_evt.is_set():
+                    tt1.cancel()
+                    break
+            if not tt1.active:
+                self.arrival_q.task_done()
+                continue
 
-            self.turntable_busy = True
+            handed_off = False
             self.active_job = tipo
             try:
                 P = POLICY.get(tipo)
@@ -284,19 +406,20 @@ class AutoController:
                 # Dispara a FASE 2 (retorno + descarga) em paralelo
                 threading.Thread(
                     target=self._post_limit_sequence,
-                    args=(POLICY,),
+                    args=(POLICY, tt1, self.hal_edges),
                     name="post-limit",
                     daemon=True,
                 ).start()
+                handed_off = True
 
                 # 2) aguarda um pequeno intervalo ANTES de religar a esteira da linha
-                t_dead = time.time() + P["feed_delay"]
-                while time.time() < t_dead:
+                t_dead = self.server.clock.time() + P["feed_delay"]
+                while self.server.clock.time() < t_dead:
                     if (
                         stop_evt and stop_evt.is_set()
                     ) or self.server.machine_state != "running":
                         break
-                    time.sleep(0.02)
+                    self.server.clock.sleep(0.02)
 
                 # 3) só então libera a linha de origem
                 if self.server.machine_state == "running" and not (
@@ -310,21 +433,13 @@ class AutoController:
                         self.lines.run_empty_line()
 
                 # 4) opcional: espere o watcher desligar o belt interno antes do próximo job
-                fin_deadline = time.time() + (P["belt_tout"] + 0.7)
-                while (
-                    getattr(self.lines, "_belt_watching", False)
-                    and time.time() < fin_deadline
-                ):
-                    if (
-                        stop_evt and stop_evt.is_set()
-                    ) or self.server.machine_state != "running":
-                        break
-                    time.sleep(0.02)
+                self.lines._belt_watching.wait(False, timeout=P["belt_tout"] + 0.7)
 
-                time.sleep(0.05)  # anti-ricochete
+                self.server.clock.sleep(0.05)  # anti-ricochete
             finally:
                 self.active_job = None
-                self.turntable_busy = False
+                if not handed_off:
+                    tt1.release()
                 self.arrival_q.task_done()
 
     def _auto_cycle(self):
@@ -334,50 +449,45 @@ class AutoController:
         # se quiser manter o feeder antigo para outras lógicas, ele pode coexistir.
         # Senão, deixe apenas o arrival_worker.
         while self.server.machine_state == "running":
-            time.sleep(0.1)
+            self.server.clock.sleep(0.1)
 
         if self.verbose:
             print("Ciclo automático encerrado")
 
-    def _post_limit_sequence(self, policy: dict):
+    def _post_limit_sequence(self, policy: dict, tt1=None, hal_edges: int = 0):
         """
         Fase 2: só entra DEPOIS do watcher começar e terminar.
         1) Espera watcher iniciar (_belt_watching=True) com timeout curto.
         2) Espera watcher terminar (_belt_watching=False).
         3) Volta mesa ao centro (turn OFF) sem belt (tempo fixo).
         4) Descarrega: belt oposta + esteira final.
-        5) Espera Sensor_Final_Producao (ou timeout) e para tudo.
+        5) Libera a TT1 (`tt1`, reserva do arrival-worker) quando a caixa chega ao HAL.
+        6) Espera Sensor_Final_Producao (ou timeout) e para tudo.
         """
+        try:
+            self._post_limit_steps(policy, tt1, hal_edges)
+        finally:
+            if tt1 is not None:
+                tt1.release()
 
+    def _post_limit_steps(self, policy: dict, tt1, hal_edges: int) -> None:
         # 0) aguarda o watcher COMEÇAR (evita atropelar o giro inicial)
-        start_deadline = time.time() + 1.0  # até 1s para o watcher levantar
-        while (
-            not getattr(self.lines, "_belt_watching", False)
-            and time.time() < start_deadline
-        ):
-            time.sleep(0.01)
-
-        if not getattr(self.lines, "_belt_watching", False):
+        if not self.lines._belt_watching.wait(True, timeout=1.0):
             if self.server.verbose:
                 print(
                     "[post] watcher não iniciou; abortando pós-limite para não atropelar o giro."
                 )
-            self.turntable_busy = False
             return
 
         # 1) agora espera o watcher TERMINAR (limite atingido ou timeout interno)
-        end_deadline = time.time() + 12.0  # segurança
-        while (
-            getattr(self.lines, "_belt_watching", False) and time.time() < end_deadline
-        ):
-            time.sleep(0.01)
+        self.lines._belt_watching.wait(False, timeout=12.0)  # segurança
 
         # 2) retorna mesa ao centro (sem belt)
         return_time = policy.get("return_time", 1.1)
         if self.server.verbose:
             print(f"[post] retornando turntable ao centro por ~{return_time}s")
         self.lines.set_turntable_async(turn_on=False, belt="stop")
-        time.sleep(return_time)
+        self.server.clock.sleep(return_time)
 
         # 3) descarregar: esteira final produção
         if self.server.verbose:
@@ -398,83 +508,94 @@ class AutoController:
 
         self.lines.set_turntable_async(turn_on=None, belt="forward", stop_limit=None)
 
-        # 4) espera saída na produção (ou timeout)
+        # 4) a caixa saiu da mesa quando chega ao HAL: libera a TT1 para a
+        #    próxima chegada (o pedido ORDER nunca passa pelo Sensor_Final_Producao).
+        #    `hal_edges` foi lido na partida do ciclo: a caixa azul, que não
+        #    gira, pode ter passado pelo HAL antes de chegar aqui
         exit_tout = policy.get("exit_timeout", 100.0)
-        t0 = time.time()
-        while (
-            not self.server.get_sensor(Coils.Sensor_Final_Producao)
-            and (time.time() - t0) < exit_tout
-        ):
-            time.sleep(0.02)
-
-        # 5) para belt interna e produção; libera fila
+        if self.hal_edges == hal_edges:
+            self.server.wait_for(Coils.Sensor_Hall, True, timeout=exit_tout)
+        if tt1 is not None:
+            tt1.release()
+
+        # 5) espera saída na produção (ou timeout)
+        self.server.wait_for(Coils.Sensor_Final_Producao, True, timeout=exit_tout)
+
+        # 6) para belt interna (só se nenhuma chegada pegou a mesa) e produção
         if self.server.verbose:
             print(
                 "[post] Sensor_Final_Producao detectado ou timeout: parando belt interna e ligando esteira produção"
             )
-        self.lines.turntable_belt_stop()
+        stopper = self.server.resources.try_acquire(TT1, "post-limit:parada")
+        if stopper is not None:
+            with stopper:
+                self.lines._t_set_turntable(None, "stop", None, 1.0)
         self.lines.run_production_line()
-        self.turntable_busy = False
 
     # ========== HAL Sequence ==========
     def hal_sequence(
         self,
-        window_ms: int = 700,
+        window_ms: Optional[int] = None,
         debounce: int = 2,
-        align_ms: int = 180,
+        align_ms: Optional[int] = None,
         sample_while_running: bool = False,
     ):
         """
         Fluxo:
-        1) HAL=1 -> (opção A) mantém a esteira rodando por align_ms p/ posicionar
-            (opção B) se preferir, para e dá um pulso curto (nudge) — ver mais abaixo.
-        2) Para Esteira_Producao_2
-        3) Amostra Vision_Blue/Green por window_ms (10 ms step)
+        1) HAL=1 -> (opção A) para Esteira_Producao_2 e classifica pelas bordas
+            de Vision_Blue/Green (`self.hal`): decide assim que uma cor fica
+            acesa por `hal.confirm_scans` scans seguidos; sem isso, a janela
+            cheia (align_ms + window_ms) decide com `debounce` scans
+            (opção B) amostra enquanto a esteira ainda roda e só então para
+        2) Retorna a classe ("BLUE" | "GREEN" | "OTHER")
+
+        `window_ms` / `align_ms` valem `hal_window_ms` / `hal_align_ms` se omitidos.
         """
+        window_ms = self.hal_window_ms if window_ms is None else window_ms
+        align_ms = self.hal_align_ms if align_ms is None else align_ms
         if self._hal_busy:
-            return
+            return None
         self._hal_busy = True
         try:
             print("[HAL] sequence: alinhando e abrindo janela…")
 
-            # (A) manter rodando um pouco para posicionar
             if sample_while_running:
                 # opção: amostrar enquanto ainda está rodando
-                t_end = time.time() + (window_ms / 1000.0)
+                t_end = self.server.clock.time() + (window_ms / 1000.0)
                 seen_blue = seen_green = 0
-                while time.time() < t_end and self.server.machine_state == "running":
+                while self.server.clock.time() < t_end and self.server.machine_state == "running":
                     if self._read(Coils.Vision_Blue):
                         seen_blue += 1
                     if self._read(Coils.Vision_Green):
                         seen_green += 1
-                    time.sleep(0.01)
+                    self.server.clock.sleep(0.01)
                 # depois para a esteira
                 self.server.set_actuator(Inputs.Esteira_Producao_2, False)
-            else:
-                # manter rodando 'align_ms' para a peça entrar debaixo da câmera
-                time.sleep(align_ms / 1000.0)
-                # agora para a esteira e amostra com peça parada
-                self.server.set_actuator(Inputs.Esteira_Producao_2, False)
 
-                t_end = time.time() + (window_ms / 1000.0)
-                seen_blue = seen_green = 0
-                while time.time() < t_end and self.server.machine_state == "running":
-                    if self._read(Coils.Vision_Blue):
-                        seen_blue += 1
-                    if self._read(Coils.Vision_Green):
-                        seen_green += 1
-                    time.sleep(0.01)
-
-            # decisão com debounce
-            if seen_blue >= debounce:
-                klass = "BLUE"
-            elif seen_green >= debounce:
-                klass = "GREEN"
+                # decisão com debounce
+                if seen_blue >= debounce:
+                    klass = "BLUE"
+                elif seen_green >= debounce:
+                    klass = "GREEN"
+                else:
+                    klass = "OTHER"
+                print(f"[HAL] classificado: {klass} (blue={seen_blue}, green={seen_green})")
             else:
-                klass = "OTHER"
+                # para a esteira e espera as bordas da visão; o tempo de
+                # alinhamento vira parte da janela (a borda de subida já diz que
+                # a peça está debaixo da câmera)
+                self.server.set_actuator(Inputs.Esteira_Producao_2, False)
+                result = self.hal.classify((align_ms + window_ms) / 1000.0, debounce)
+                klass = result.klass
+                modo = "antecipado" if result.early else "janela cheia"
+                print(
+                    f"[HAL] classificado: {klass} ({modo}, {result.elapsed * 1e3:.0f} ms, "
+                    f"blue={result.samples['BLUE']}, green={result.samples['GREEN']})"
+                )
 
-            print(f"[HAL] classificado: {klass} (blue={seen_blue}, green={seen_green})")
+            self.server.tracker.classify(klass)
             self.on_hal_classified(klass)
+            return klass
 
         finally:
             self._hal_busy = False
@@ -489,10 +610,12 @@ class AutoController:
                 break
             try:
                 if isinstance(job, tuple) and job[0] == "ORDER":
-                    _, klass = job
-                    self._tt2_cycle_order(klass)
+                    _, klass, order = job
+                    with self.server.resources.acquire(TT2, f"tt2:order:{klass}"):
+                        self._tt2_cycle_order(klass, order)
                 elif job == "NO_ORDER":
-                    self._tt2_cycle_no_order()
+                    with self.server.resources.acquire(TT2, "tt2:no_order"):
+                        self._tt2_cycle_no_order()
             finally:
                 self.tt2_q.task_done()
 
@@ -513,29 +636,23 @@ class AutoController:
 
         # 2) entrada: discharge até sensor
         self.server.set_actuator(Inputs.Discharg_turn, True)
-        t0 = time.time()
-        while (not self.server.get_sensor(Coils.Discharg_Sensor)) and (
-            time.time() - t0
-        ) < self.TT2_ENTRADA_TOUT:
-            time.sleep(0.02)
+        self.server.wait_for(Coils.Discharg_Sensor, True, timeout=self.TT2_ENTRADA_TOUT)
         self.server.set_actuator(Inputs.Discharg_turn, False)
 
         # 3) giro
         self.server.set_actuator(Inputs.Turntable2_turn, True)
-        time.sleep(self.TT2_GIRO_S)
+        self.server.clock.sleep(self.TT2_GIRO_S)
 
         # 4) descarga
         self.server.set_actuator(Inputs.Discharg_turn, True)
-        t1 = time.time()
-        while (not self.server.get_sensor(Coils.Sensor_Final_Producao)) and (
-            time.time() - t1
-        ) < self.TT2_SAIDA_TOUT:
-            time.sleep(0.02)
+        self.server.wait_for(
+            Coils.Sensor_Final_Producao, True, timeout=self.TT2_SAIDA_TOUT
+        )
         self.server.set_actuator(Inputs.Discharg_turn, False)
 
         # 5) retorno
         self.server.set_actuator(Inputs.Turntable2_turn, False)
-        time.sleep(self.TT2_RETORNO_S)
+        self.server.clock.sleep(self.TT2_RETORNO_S)
         if self.verbose:
             print("[TT2] ciclo padrão concluído.")
 
@@ -563,89 +680,76 @@ class AutoController:
     def start_stock_belt(self):
         return self._start_stock_belt()
 
-    def _read_coil_safe(self, addr: int) -> int:
-        try:
-            return 1 if self.server.read_coil(addr) else 0
-        except Exception:
-            return 0
-
     def _wait_discharge_true_then_false(
         self, sensor_addr: int, timeout_s: float = 4.0
     ) -> bool:
-        t0 = time.time()
+        t0 = self.server.clock.time()
         # aguarda subir (True)
-        while time.time() - t0 < timeout_s:
-            if self._read_coil_safe(sensor_addr):
-                break
-            time.sleep(0.02)
-        else:
+        if not self.server.wait_for(sensor_addr, True, timeout=timeout_s):
             if self.verbose:
                 print("[ORDER] timeout aguardando Discharg_Sensor=1")
             return False
         # aguarda descer (False)
-        while time.time() - t0 < timeout_s:
-            if not self._read_coil_safe(sensor_addr):
-                if self.verbose:
-                    print("[ORDER] Discharg_Sensor ciclo True→False OK")
-                return True
-            time.sleep(0.02)
+        remaining = max(0.0, timeout_s - (self.server.clock.time() - t0))
+        if self.server.wait_for(sensor_addr, False, timeout=remaining):
+            if self.verbose:
+                print("[ORDER] Discharg_Sensor ciclo True→False OK")
+            return True
         if self.verbose:
             print("[ORDER] timeout aguardando Discharg_Sensor voltar a 0")
         return False
 
-    def _tt2_cycle_order(self, klass: str, *, belt_timeout_s: float = 3.0):
+    def _tt2_cycle_order(self, klass: str, order=None, *, belt_timeout_s: float = 3.0):
         if self.verbose:
             print(f"[TT2][ORDER] atendendo {klass}: discharge direto (sem giro)")
 
-        self.turntable2_busy = True
-        try:
+        self.lines._t2_set_turntable(
+            turn_on=None,  # sem giro
+            belt="forward",  # descarregar para esteira central
+            stop_limit=None,  # sem limite, pois não tem giro
+            belt_timeout_s=10,  # tempo até detectar Sensor_Discharge (ou timeout)
+        )
 
-            self.lines._t2_set_turntable(
-                turn_on=None,  # sem giro
-                belt="forward",  # descarregar para esteira central
-                stop_limit=None,  # sem limite, pois não tem giro
-                belt_timeout_s=10,  # tempo até detectar Sensor_Discharge (ou timeout)
-            )
+        # destino do pedido: Esteira_Central (CONFIRA o ID no addresses.py)
+        self.lines._activate(Inputs.Esteira_Central)
 
-            # destino do pedido: Esteira_Central (CONFIRA o ID no addresses.py)
-            self.lines._activate(Inputs.Esteira_Central)
-
-            # aguarda Discharg_Sensor subir e cair (true -> false)
-            was_high = False
-            t0 = time.time()
-            while (
-                time.time() - t0 < belt_timeout_s
-                # and self.server.machine_state == "running"
-            ):
-                val = self.server.get_sensor(Coils.Discharg_Sensor)
-                if val:
-                    was_high = True
-                elif was_high and not val:
-                    break
-                time.sleep(0.01)
+        # aguarda Discharg_Sensor subir e cair (true -> false)
+        self._wait_discharge_true_then_false(
+            Coils.Discharg_Sensor, timeout_s=belt_timeout_s
+        )
 
-            # baixa no pedido
-            if self.orders:
+        # baixa no pedido (o prometido no HAL; sem promessa, o primeiro compatível)
+        if self.orders:
+            if order is not None:
+                self.orders.complete(order)
+            else:
                 self.orders.consume(klass)
 
-            try:
-                if self.orders and klass in self.orders:
-                    self.orders[klass] = max(0, self.orders[klass] - 1)
-                    if self.server.verbose:
-                        print(
-                            f"[ORDER] baixa dada em {klass}. Restantes: {self.orders[klass]}"
-                        )
-            except Exception:
-                pass
+        try:
+            if self.orders and klass in self.orders:
+                self.orders[klass] = max(0, self.orders[klass] - 1)
+                if self.server.verbose:
+                    print(
+                        f"[ORDER] baixa dada em {klass}. Restantes: {self.orders[klass]}"
+                    )
+        except Exception:
+            pass
 
-            # Se NÃO há mais nenhum pedido aberto, muda para STOCK
-            if not self._has_any_open_order():
-                self._set_mode_stock()
+        # Se NÃO há mais nenhum pedido aberto, muda para STOCK
+        self.leave_order_mode_if_idle()
 
-            if self.verbose:
-                print("[TT2][ORDER] concluído.")
-        finally:
-            self.turntable2_busy = False
+        if self.verbose:
+            print("[TT2][ORDER] concluído.")
+
+    # -------- modo de atendimento (usado também pelo FulfillmentPlanner e pelo MES) --------
+    def enter_order_mode(self) -> None:
+        """Passa a atender pedidos (chamado quando um pedido é criado)."""
+        self._set_mode_order()
+
+    def leave_order_mode_if_idle(self) -> None:
+        """Volta para STOCK se não sobrou nenhum pedido aberto."""
+        if not self._has_any_open_order():
+            self._set_mode_stock()
 
     def _set_mode_order(self):
         if self.server.verbose:
@@ -0,0 +1,249 @@
+# crane.py
+import heapq
+import itertools
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from controllers.resources import CRANE
+from metrics import Histogram
+
+# tipos de tarefa do transelevador
+RETRIEVE_STORAGE = "retrieve_storage"  # estoque -> saída (botão / pedido)
+STORE_CLIENT = "store_client"  # entrada do cliente -> colunas do cliente
+STORE_STORAGE = "store_storage"  # entrada do estoque -> colunas de estoque
+
+# maior primeiro: o lado do cliente passa na frente da guarda no estoque
+PRIORITY = {RETRIEVE_STORAGE: 2, STORE_CLIENT: 1, STORE_STORAGE: 0}
+
+# ciclo duplo: uma guarda seguida de uma retirada na mesma viagem
+STORE_KINDS = (STORE_CLIENT, STORE_STORAGE)
+RETRIEVE_KINDS = (RETRIEVE_STORAGE,)
+
+
+@dataclass(order=True)
+class CraneJob:
+    sort_key: tuple = field(init=False, repr=False)
+    kind: str = field(compare=False)
+    priority: int = field(compare=False)
+    seq: int = field(compare=False)
+    created_at: float = field(compare=False)
+    source: str = field(default="", compare=False)  # quem pediu (log)
+    product: Optional[str] = field(default=None, compare=False)  # cor da retirada (None = cor do pedido no MES)
+    on_done: Optional[Callable[["CraneJob", bool], None]] = field(default=None, compare=False, repr=False)
+    started_at: Optional[float] = field(default=None, compare=False)
+    finished_at: Optional[float] = field(default=None, compare=False)
+    error: Optional[str] = field(default=None, compare=False)
+    result: object = field(default=None, compare=False)  # retorno do executor (retirada: cor entregue)
+    chained: Optional["CraneJob"] = field(default=None, compare=False, repr=False)  # retirada do ciclo duplo
+
+    def __post_init__(self):
+        self.sort_key = (-self.priority, self.seq)
+
+
+class CraneScheduler:
+    """
+    Fila de tarefas do transelevador (`lines.crane_jobs`).
+
+    Os pedidos de guarda e retirada viram tarefas explícitas (`submit`) em
+    vez de serem descartados quando o transelevador está ocupado. Uma thread
+    executa uma tarefa por vez, sempre a de maior prioridade (e, na mesma
+    prioridade, a mais antiga), e pega a próxima assim que a atual termina.
+    Durante a execução a tarefa é dona do recurso `CRANE` em `server.resources`.
+
+    Com `dual_command`, quando há guarda e retirada na fila ao mesmo tempo, as
+    duas viram um ciclo duplo: a guarda roda sem estacionar (`park=False`) e a
+    retirada sai direto da posição guardada, sem a viagem vazia até o ponto de
+    espera e de volta.
+
+    Args:
+        server: FactoryModbusEventServer (relógio e recursos)
+        executors: tipo da tarefa -> função `(park: bool) -> bool` que executa o
+            movimento; False = não concluiu (ex.: rack cheio, nada a retirar),
+            outro valor fica em `job.result` (a retirada devolve a cor
+            entregue). Tarefa com `product` também recebe `product=...`
+        dual_command: Encadeia guarda + retirada na mesma viagem
+        resource: Recurso do transelevador em `server.resources` (um por rack)
+    """
+
+    def __init__(
+        self,
+        server,
+        executors: Dict[str, Callable[..., Optional[bool]]],
+        verbose: bool = False,
+        dual_command: bool = False,
+        resource: str = CRANE,
+        name: str = "crane-scheduler",
+    ):
+        self.server = server
+        self.executors = dict(executors)
+        self.verbose = verbose
+        self.dual_command = dual_command
+        self.resource = resource
+        self.name = name
+
+        self._cond = threading.Condition()
+        self._queue: List[CraneJob] = []
+        self._seq = itertools.count(1)
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+        self.current: Optional[CraneJob] = None
+        self.done: Dict[str, int] = {k: 0 for k in self.executors}
+        self.failed = 0
+        self.dual_cycles = 0
+        self.queue_wait = Histogram()  # pedido -> início
+        self.idle_gap = Histogram()  # fim de uma tarefa -> início da seguinte, com fila
+        self.service_time: Dict[str, Histogram] = {k: Histogram() for k in self.executors}  # início -> fim
+
+    # -------- ciclo de vida --------
+    def start(self) -> None:
+        with self._cond:
+            self._stopping = False
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # -------- fila --------
+    def submit(
+        self,
+        kind: str,
+        source: str = "",
+        priority: Optional[int] = None,
+        unique: bool = False,
+        product: Optional[str] = None,
+        on_done: Optional[Callable[[CraneJob, bool], None]] = None,
+    ) -> Optional[CraneJob]:
+        """
+        Enfileira uma tarefa. `unique=True` não enfileira se já houver uma do
+        mesmo tipo aguardando (ex.: guarda pedida pela borda do sensor de
+        entrada: a tarefa na fila já atende a caixa que estiver lá).
+
+        `product` vai para o executor (ex.: cor da retirada de um pedido) e
+        `on_done(job, ok)` é chamado na thread do transelevador ao fim da
+        tarefa, tenha ela concluído ou não.
+        """
+        if kind not in self.executors:
+            raise ValueError(f"Tarefa de transelevador desconhecida: {kind}")
+        with self._cond:
+            if unique and any(j.kind == kind for j in self._queue):
+                return None
+            job = CraneJob(
+                kind=kind,
+                priority=PRIORITY.get(kind, 0) if priority is None else priority,
+                seq=next(self._seq),
+                created_at=self.server.clock.monotonic(),
+                source=source,
+                product=product,
+                on_done=on_done,
+            )
+            heapq.heappush(self._queue, job)
+            self._cond.notify_all()
+        if self.verbose:
+            print(f"[CRANE] tarefa #{job.seq} {kind} enfileirada ({source or '-'}; fila={len(self._queue)})")
+        return job
+
+    def pending(self) -> List[CraneJob]:
+        with self._cond:
+            return sorted(self._queue)
+
+    def pending_count(self, kind: Optional[str] = None) -> int:
+        with self._cond:
+            return sum(1 for j in self._queue if kind is None or j.kind == kind)
+
+    # -------- execução --------
+    def _next_job(self) -> Optional[CraneJob]:
+        """
+        Escolhe a próxima tarefa (com _cond adquirido). No ciclo duplo devolve
+        a guarda com a retirada em `chained`, qualquer que seja a da frente.
+        """
+        if not self._queue:
+            return None
+        job = heapq.heappop(self._queue)
+        if not self.dual_command:
+            return job
+        partners = RETRIEVE_KINDS if job.kind in STORE_KINDS else STORE_KINDS if job.kind in RETRIEVE_KINDS else ()
+        candidates = [j for j in self._queue if j.kind in partners]
+        if not candidates:
+            return job
+        other = min(candidates)
+        self._queue.remove(other)
+        heapq.heapify(self._queue)
+        store, retrieve = (job, other) if job.kind in STORE_KINDS else (other, job)
+        store.chained = retrieve
+        return store
+
+    def _run(self) -> None:
+        clock = self.server.clock
+        last_end: Optional[float] = None
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                job = self._next_job()
+            # a tarefa já esperava quando a anterior terminou: o intervalo é ocioso
+            backlog = last_end is not None and job.created_at <= last_end
+
+            crane = self.server.resources.acquire(self.resource, f"crane:{job.kind}#{job.seq}")
+            try:
+                if backlog:
+                    self.idle_gap.record(clock.monotonic() - last_end)
+                nxt = job.chained
+                ok = self._execute(job, park=nxt is None)
+                if nxt is not None:
+                    if ok:
+                        self.dual_cycles += 1
+                        self._execute(nxt, park=True)
+                    else:
+                        # a guarda não terminou no rack: a retirada volta para a fila
+                        with self._cond:
+                            heapq.heappush(self._queue, nxt)
+                    job.chained = None
+            finally:
+                crane.release()
+                last_end = clock.monotonic()
+
+    def _execute(self, job: CraneJob, park: bool) -> bool:
+        job.started_at = self.server.clock.monotonic()
+        self.queue_wait.record(job.started_at - job.created_at)
+        self.current = job
+        if self.verbose:
+            modo = "" if park else " (ciclo duplo)"
+            print(f"[CRANE] tarefa #{job.seq} {job.kind} iniciada{modo}")
+        ok = False
+        kwargs = {"park": park} if job.product is None else {"park": park, "product": job.product}
+        try:
+            job.result = self.executors[job.kind](**kwargs)
+            ok = job.result is not False
+            self.done[job.kind] = self.done.get(job.kind, 0) + 1
+        except Exception as e:
+            job.error = repr(e)
+            self.failed += 1
+            print(f"[CRANE] tarefa #{job.seq} {job.kind} falhou: {e}")
+        finally:
+            job.finished_at = self.server.clock.monotonic()
+            self.current = None
+        h = self.service_time.get(job.kind)
+        if h is not None:
+            h.record(job.finished_at - job.started_at)
+        if self.verbose:
+            print(
+                f"[CRANE] tarefa #{job.seq} {job.kind} concluída em "
+                f"{job.finished_at - job.started_at:.1f}s"
+            )
+        if job.on_done is not None:
+            try:
+                job.on_done(job, ok)
+            except Exception as e:
+                print(f"[CRANE] tarefa #{job.seq}: erro no on_done: {e}")
+        return ok
@@ -0,0 +1,238 @@
+# crane_steps.py
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+from controllers.slotting import TravelModel
+from metrics import Histogram
+
+
+class CraneStepTimeout(RuntimeError):
+    """Um passo do transelevador não confirmou no tempo limite."""
+
+
+@dataclass(frozen=True)
+class Step:
+    name: str  # rótulo nas estatísticas (ex.: "garfo_fora")
+    kind: str  # "move" | "fork_out" | "fork_in" | "lift"
+    value: Union[int, bool]  # endereço (move) ou nível do atuador
+
+
+# sequências de troca de caixa (garfo estende, levanta/baixa, recolhe)
+PICK_FROM_IO: Tuple[Step, ...] = (
+    Step("garfo_fora", "fork_out", True),
+    Step("levantar", "lift", True),
+    Step("recolher_fora", "fork_out", False),
+)
+PUT_ON_IO: Tuple[Step, ...] = (
+    Step("garfo_fora", "fork_out", True),
+    Step("baixar", "lift", False),
+    Step("recolher_fora", "fork_out", False),
+)
+PICK_FROM_RACK: Tuple[Step, ...] = (
+    Step("garfo_dentro", "fork_in", True),
+    Step("levantar", "lift", True),
+    Step("recolher_dentro", "fork_in", False),
+)
+PUT_IN_RACK: Tuple[Step, ...] = (
+    Step("garfo_dentro", "fork_in", True),
+    Step("baixar", "lift", False),
+    Step("recolher_dentro", "fork_in", False),
+)
+
+
+class CraneStepEngine:
+    """
+    Executa as sequências do transelevador de um rack passo a passo, cada
+    passo terminando na confirmação de um sensor em vez de um `sleep` fixo.
+
+    - `move`: escreve o `posicao_alvo`, espera o `moving_coil` subir (partida)
+      e descer (chegada). Destino igual à posição confirmada (`rack.crane_address`,
+      gravada só na chegada) não gera movimento e é pulado; qualquer outro que
+      não parta é um timeout. Com a posição desconhecida (início, ou depois de
+      um timeout) o destino é sempre comandado.
+    - garfo/elevação: liga/desliga o atuador e espera o fim de curso do
+      `RackConfig` (`fork_out_limit`, `fork_in_limit`, `fork_middle_limit`,
+      `lift_up_limit`, `lift_down_limit`). Sem sensor mapeado, o passo dura o
+      tempo nominal (`fork_s`, `lift_s`, `retract_s`).
+
+    O limite de cada espera é aprendido: depois de `min_samples` execuções,
+    vale `margin ×` o maior tempo observado (nunca abaixo de `floor_s`); antes
+    disso, o padrão. Na viagem o aprendido é a razão entre o tempo real e o
+    do `TravelModel`, para o limite acompanhar a distância. Estourar o limite
+    lança `CraneStepTimeout` (a tarefa falha no `CraneScheduler`).
+
+    Tempos por passo ficam em `timings[nome]` (Histogram); `estimate` e
+    `estimate_move` usam as médias para prever a duração de uma sequência
+    (ex.: prazo de uma retirada no `FulfillmentPlanner`).
+    """
+
+    def __init__(
+        self,
+        server,
+        rack,
+        verbose: bool = False,
+        margin: float = 1.5,
+        floor_s: float = 0.5,
+        min_samples: int = 5,
+        start_timeout_s: float = 1.0,
+        move_timeout_s: float = 30.0,
+        step_timeout_s: float = 10.0,
+    ):
+        self.server = server
+        self.rack = rack
+        self.verbose = verbose
+        self.margin = margin
+        self.floor_s = floor_s
+        self.min_samples = min_samples
+        self.start_timeout_s = start_timeout_s
+        self.move_timeout_s = move_timeout_s
+        self.step_timeout_s = step_timeout_s
+
+        cfg = rack.config
+        self.model = TravelModel(columns=cfg.columns, rows=cfg.rows, offset=cfg.address_offset)
+
+        self._lock = threading.Lock()
+        self.timings: Dict[str, Histogram] = {}
+        self.timeouts: Dict[str, int] = {}
+        self.skipped_moves = 0
+        self.loaded = False  # garfo levantado com caixa (último passo de elevação confirmado)
+        self._move_ratio = 0.0  # maior (tempo real / tempo do modelo) observado
+        self._move_ratio_sum = 0.0
+        self._move_samples = 0
+
+    # -------- limites aprendidos --------
+    def timeout_for(self, name: str, default: float) -> float:
+        h = self.timings.get(name)
+        if h is None or h.count < self.min_samples:
+            return default
+        return max(self.floor_s, h.summary()["max"] * self.margin)
+
+    def move_timeout(self, src: int, dst: int) -> float:
+        expected = self.model.time(src, dst)
+        if self._move_samples < self.min_samples or expected <= 0:
+            return self.move_timeout_s
+        return max(self.floor_s, expected * self._move_ratio * self.margin)
+
+    def _record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            h = self.timings.get(name)
+            if h is None:
+                h = self.timings[name] = Histogram()
+        h.record(seconds)
+
+    def _timed_out(self, name: str, limit: float) -> None:
+        with self._lock:
+            self.timeouts[name] = self.timeouts.get(name, 0) + 1
+        raise CraneStepTimeout(f"[{self.rack.name}] passo '{name}' sem confirmação em {limit:.1f}s")
+
+    # -------- previsão --------
+    def estimate_move(self, src: int, dst: int) -> float:
+        """Duração esperada da viagem: modelo × razão média observada (1 sem amostras)."""
+        if src == dst:
+            return 0.0
+        ratio = self._move_ratio_sum / self._move_samples if self._move_samples else 1.0
+        return self.model.time(src, dst) * ratio
+
+    def estimate(self, steps: Sequence[Step]) -> float:
+        """Duração esperada dos passos de garfo/elevação: média observada ou nominal."""
+        total = 0.0
+        for step in steps:
+            if step.kind == "move":
+                continue
+            h = self.timings.get(step.name)
+            total += h.summary()["mean"] if h is not None and h.count else self._plan(step)[2]
+        return total
+
+    # -------- execução --------
+    def run(self, steps: Sequence[Step]) -> None:
+        for step in steps:
+            if step.kind == "move":
+                self.move(int(step.value))
+            else:
+                self._actuate(step)
+
+    def move(self, address: int) -> None:
+        srv, cfg, clock = self.server, self.rack.config, self.server.clock
+        src = self.rack.crane_address
+        if src is not None and address == src:
+            self.skipped_moves += 1
+            return
+        t0 = clock.monotonic()
+        srv.write_input_register(address=cfg.target_register, value=address)
+        # até a chegada a posição é desconhecida: um timeout não deixa uma posição falsa
+        self.rack.crane_address = None
+
+        # destino novo sempre gera movimento: sem partida dentro do limite o
+        # comando não chegou ao transelevador (ou ele está travado)
+        start = self.timeout_for("partida", self.start_timeout_s)
+        if not srv.wait_for(cfg.moving_coil, True, start):
+            self._timed_out("partida", start)
+        self._record("partida", clock.monotonic() - t0)
+        limit = self.move_timeout(src, address) if src is not None else self.move_timeout_s
+        if not srv.wait_for(cfg.moving_coil, False, limit):
+            self._timed_out("mover", limit)
+        self.rack.crane_address = address
+        elapsed = clock.monotonic() - t0
+        self._record("mover", elapsed)
+        expected = self.model.time(src, address) if src is not None else 0.0
+        if expected > 0:
+            with self._lock:
+                self._move_ratio = max(self._move_ratio, elapsed / expected)
+                self._move_ratio_sum += elapsed / expected
+                self._move_samples += 1
+        if self.verbose:
+            print(f"[CRANE-STEP] {self.rack.name}: mover {src} -> {address} em {elapsed:.2f}s")
+
+    def _actuate(self, step: Step) -> None:
+        srv, clock = self.server, self.server.clock
+        actuator, sensor, nominal = self._plan(step)
+        t0 = clock.monotonic()
+        srv.set_actuator(actuator, bool(step.value))
+        if sensor is None:
+            clock.sleep(nominal)
+        else:
+            limit = self.timeout_for(step.name, self.step_timeout_s)
+            if not srv.wait_for(sensor, True, limit):
+                self._timed_out(step.name, limit)
+        elapsed = clock.monotonic() - t0
+        self._record(step.name, elapsed)
+        if step.kind == "lift":
+            self.loaded = bool(step.value)
+        if self.verbose:
+            modo = "nominal" if sensor is None else "sensor"
+            print(f"[CRANE-STEP] {self.rack.name}: {step.name} ({modo}) em {elapsed:.2f}s")
+
+    def _plan(self, step: Step) -> Tuple[int, Optional[int], float]:
+        """(atuador, fim de curso que confirma o passo, duração nominal sem sensor)."""
+        cfg = self.rack.config
+        if step.kind == "lift":
+            limit = cfg.lift_up_limit if step.value else cfg.lift_down_limit
+            return cfg.fork_lift, limit, cfg.lift_s
+        actuator = cfg.fork_out if step.kind == "fork_out" else cfg.fork_in
+        if step.value:
+            limit = cfg.fork_out_limit if step.kind == "fork_out" else cfg.fork_in_limit
+            return actuator, limit, cfg.fork_s
+        return actuator, cfg.fork_middle_limit, cfg.retract_s
+
+    # -------- relatório --------
+    def summary(self) -> dict:
+        with self._lock:
+            timings = dict(self.timings)
+            timeouts = dict(self.timeouts)
+        return {
+            "steps": {n: h.summary() for n, h in timings.items()},
+            "timeouts": timeouts,
+            "skipped_moves": self.skipped_moves,
+        }
+
+    def format_summary(self) -> str:
+        s = self.summary()
+        lines = [f"[CRANE-STEP] {self.rack.name}: movimentos pulados={s['skipped_moves']} timeouts={s['timeouts'] or '-'}"]
+        for name, h in sorted(s["steps"].items()):
+            if h["count"]:
+                lines.append(
+                    f"  {name:<16} n={h['count']:<5} média={h['mean']:.2f}s "
+                    f"p90={h['p90']:.2f}s max={h['max']:.2f}s"
+                )
+        return "\n".join(lines)
@@ -0,0 +1,138 @@
+import threading
+import traceback
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Set, Tuple
+
+
+class HandlerDispatcher:
+    """
+    Executa os handlers de borda fora da thread de scan.
+
+    - Pool de threads (daemon): `workers` no início e mais uma a cada estação
+      nova além disso, para um handler longo (sequência de pedido, ciclo da
+      TT3) nunca deixar outra estação (ex.: `arrival`) sem worker.
+    - Handlers com a mesma chave (estação) rodam em série, na ordem de chegada;
+      chaves diferentes rodam em paralelo.
+    - Fila sem limite por padrão (bordas de chegada/HAL não podem se perder).
+      Com `max_pending`, o excedente é descartado, contabilizado em `dropped`
+      e sempre impresso.
+    - `key=None` executa o handler na hora, na thread de quem chamou
+      (reservado para comandos curtos e críticos, como Emergency).
+    - Exceção em um handler não derruba o worker: é impressa com o traceback
+      (com ou sem `verbose`) e contada em `errors[estação]`.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_pending: Optional[int] = None,
+        verbose: bool = False,
+        name: str = "handler",
+    ):
+        if workers < 1:
+            raise ValueError(f"workers deve ser >= 1, recebido: {workers}")
+        self.workers = workers
+        self.max_pending = max_pending
+        self.verbose = verbose
+        self.name = name
+
+        self._cond = threading.Condition()
+        self._queues: Dict[str, Deque[Tuple[Callable, tuple, str]]] = {}
+        self._ready: Deque[str] = deque()  # chaves com trabalho e sem worker
+        self._active: Set[str] = set()  # chaves na fila de prontas ou executando
+        self._threads = []
+        self._stopping = False
+
+        self.dropped: Dict[str, int] = {}
+        self.errors: Dict[Optional[str], int] = {}
+
+    # -------- lifecycle --------
+    def start(self) -> None:
+        with self._cond:
+            if self._threads:
+                return
+            self._stopping = False
+            for _ in range(max(self.workers, len(self._queues))):
+                self._spawn()
+
+    def _spawn(self) -> None:
+        th = threading.Thread(
+            target=self._worker, name=f"{self.name}-{len(self._threads)}", daemon=True
+        )
+        self._threads.append(th)
+        th.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for th in self._threads:
+            th.join(timeout)
+        self._threads = []
+
+    # -------- API --------
+    def submit(
+        self, key: Optional[str], fn: Callable, *args, label: Optional[str] = None
+    ) -> bool:
+        """
+        Agenda `fn(*args)` na fila da estação `key`. Retorna False se descartado.
+        `label` identifica o handler nos logs (padrão: nome da função).
+        """
+        label = label or getattr(fn, "__name__", str(fn))
+        if key is None:
+            self._run(key, fn, args, label)
+            return True
+
+        with self._cond:
+            q = self._queues.get(key)
+            if q is None:
+                q = self._queues[key] = deque()
+                if self._threads and len(self._threads) < len(self._queues):
+                    self._spawn()
+            if self.max_pending is not None and len(q) >= self.max_pending:
+                self.dropped[key] = self.dropped.get(key, 0) + 1
+                print(f"[DISPATCH] fila '{key}' cheia ({len(q)}); handler {label} descartado")
+                return False
+            q.append((fn, args, label))
+            if key not in self._active:
+                self._active.add(key)
+                self._ready.append(key)
+                self._cond.notify()
+        return True
+
+    def pending(self, key: Optional[str] = None) -> int:
+        """Quantidade de handlers aguardando (de uma estação ou de todas)."""
+        with self._cond:
+            if key is not None:
+                return len(self._queues.get(key, ()))
+            return sum(len(q) for q in self._queues.values())
+
+    # -------- internos --------
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                while not self._ready and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                key = self._ready.popleft()
+                fn, args, label = self._queues[key].popleft()
+
+            self._run(key, fn, args, label)
+
+            with self._cond:
+                if self._queues[key]:
+                    # mantém a ordem da estação: volta para o fim da fila de prontas
+                    self._ready.append(key)
+                    self._cond.notify()
+                else:
+                    self._active.discard(key)
+
+    def _run(self, key: Optional[str], fn: Callable, args: tuple, label: str) -> None:
+        try:
+            fn(*args)
+        except Exception as e:
+            with self._cond:
+                self.errors[key] = self.errors.get(key, 0) + 1
+            print(f"[DISPATCH] erro no handler {label} (estação={key}): {e}")
+            traceback.print_exc()
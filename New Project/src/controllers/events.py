@@ -1,8 +1,13 @@
 import threading
-from typing import Callable, Dict, List, TYPE_CHECKING
+from functools import partial
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, TYPE_CHECKING
 from addresses import Coils, Inputs
 from controllers.lines import LineController
-import time
+from controllers.dispatch import HandlerDispatcher
+from controllers.accumulation import AccumulationConveyor, Zone
+from services.tracking import EMITTERS, TRANSITIONS
+from utils import pack_bits, iter_set_bits
 
 from services.DAO import MES, OrderConfig
 
@@ -15,11 +20,30 @@ DEFAULT_ORDER_BOXES = 5  # "Quantidade de caixas"
 DEFAULT_ORDER_RESOURCE = 5  # "Quantidade de caixas"
 DEFAULT_ORDER_CLIENT = "rafael_ltda"
 
+# endereço -> nome (o primeiro declarado em Coils, para endereços repetidos)
+_COIL_NAMES: Dict[int, str] = {}
+for _name, _addr in vars(Coils).items():
+    if not _name.startswith("_") and isinstance(_addr, int):
+        _COIL_NAMES.setdefault(_addr, _name)
+
+
+@dataclass(frozen=True)
+class EdgeBinding:
+    """Handler associado a uma coil: "rising" (0→1), "falling" (1→0) ou "toggle"."""
+
+    addr: int
+    edge: str
+    callback: Callable[[], None]
+    key: Optional[str] = None  # estação no HandlerDispatcher (None = executa no scan)
+    halts: bool = False  # adia as bordas de menor prioridade para o próximo scan
+    name: str = ""  # rótulo nas métricas de latência (ex.: "Sensor_Hall:rising")
+
 
 class EventProcessor:
     """
     Processa bordas de sensores e botões, chamando callbacks.
-    Mantém o estado anterior das coils relevantes.
+    Mantém o estado anterior das coils relevantes empacotado em um inteiro
+    e despacha apenas os endereços que mudaram entre dois scans.
     """
 
     def __init__(
@@ -31,34 +55,58 @@ class EventProcessor:
         self.server = server
         self.lines = lines_controller
         self.verbose = verbose
-        self._prev: Dict[int, int] = {}
-        self._hal_prev = False
-        self._hal_prev = 0
+
+        # handlers longos (sequências de estação) rodam fora da thread de scan;
+        # filas sem limite e um worker por estação (ver controllers/dispatch.py)
+        self.dispatcher = HandlerDispatcher(
+            workers=4, verbose=verbose, name="edge-handler"
+        )
+        self.dispatcher.start()
+
+        # cadeia de esteiras hall_1_0 → warehouse (reativa, roda na thread de scan)
+        self.storage_chain = AccumulationConveyor(
+            server,
+            zones=[
+                Zone(
+                    "conveyor_storage_1",
+                    Inputs.conveyor_storage_1,
+                    Coils.sensor_conveyor_storage_1,
+                    Coils.is_box_conveyor_1,
+                ),
+                Zone(
+                    "conveyor_storage_2",
+                    Inputs.conveyor_storage_2,
+                    Coils.sensor_conveyor_storage_2,
+                    Coils.is_box_conveyor_2,
+                ),
+                Zone(
+                    "conveyor_storage_3",
+                    Inputs.conveyor_storage_3,
+                    Coils.sensor_conveyor_storage_3,
+                    Coils.is_box_conveyor_3,
+                ),
+                Zone(
+                    "conveyor_storage_4",
+                    Inputs.conveyor_storage_4,
+                    Coils.sensor_storage_warehouse,
+                ),
+            ],
+            entry_sensor=Coils.sensor_hall_1_0,
+            name="STORAGE",
+            verbose=verbose,
+        )
+
+        # índice endereço → handlers, prioridade e máscara das coils vigiadas
+        self._bindings: Dict[int, List[EdgeBinding]] = {}
+        self._priority: Dict[int, int] = {}
+        self._watch_mask = 0
+        self._prev_word = 0  # estado anterior (bit i = coil i)
+        self._build_edge_index()
 
         self.config = MES()
         # contador para rotacionar clientes/cores entre invocações de Create_OP
         self._create_op_counter = 0
 
-        self.first_time = True
-
-        t_handle_storage = threading.Thread(target=self.handle_storage)
-        t_handle_storage.start()
-
-        # t_handle_conveyor_storage = threading.Thread(target = self.handle_conveyor_storage)
-        # t_handle_conveyor_storage.start()
-
-        t_conveyor_1 = threading.Thread(target=self.handle_conveyor_storage_1)
-        t_conveyor_1.start()
-
-        t_conveyor_2 = threading.Thread(target=self.handle_conveyor_storage_2)
-        t_conveyor_2.start()
-
-        t_conveyor_3 = threading.Thread(target=self.handle_conveyor_storage_3)
-        t_conveyor_3.start()
-
-        t_conveyor_4 = threading.Thread(target=self.handle_conveyor_storage_4)
-        t_conveyor_4.start()
-
         # --- threads client warehouse
 
         t_esteira_principal = threading.Thread(target=self.handle_esteira_principal, daemon=True)
@@ -73,20 +121,19 @@ class EventProcessor:
                 if self.server.get_sensor(Coils.SENSOR_TT2):
                     self.server.set_actuator(Inputs.Turntable3_forward, True)
 
-                time.sleep(0.1)
+                self.server.clock.sleep(0.1)
 
             except Exception as e:
                 if self.verbose:
                     print(f"[EVENTS] Erro no handle_esteira_principal: {e}")
-                time.sleep(0.5)
+                self.server.clock.sleep(0.5)
 
     def _on_tt3_detection(self):
         """Callback quando TT3 detecta caixa"""
-        # Só aciona se a mesa não estiver ocupada
-        if not self.lines.turntable3_busy:
-            if self.verbose:
-                print("📦 Caixa detectada na TT3 - iniciando sequência")
-            self.lines.ciclo_turntable3()
+        # com a mesa ocupada o ciclo espera na fila da TT3 (server.resources)
+        if self.verbose:
+            print("📦 Caixa detectada na TT3 - iniciando sequência")
+        self.lines.ciclo_turntable3()
 
     def _on_hall_1_6(self):
         """Callback para HALL 1_6 - pausa esteira de pedido"""
@@ -105,11 +152,11 @@ class EventProcessor:
        
         for i in range(num_resources):
             self.server.set_actuator(Inputs.Emitter_resource_box, True)
-            time.sleep(2)
+            self.server.clock.sleep(2)
             self.server.set_actuator(Inputs.Emitter_resource_box, False)
-            time.sleep(1)
+            self.server.clock.sleep(1)
 
-        time.sleep(1.5)
+        self.server.clock.sleep(1.5)
         self.server.set_actuator(Inputs.ESTEIRA_PEDIDO, True)
 
     def _on_hall_1_5(self):
@@ -122,10 +169,10 @@ class EventProcessor:
 
         print("acionando o pick")
         self.server.set_actuator(Inputs.PICK_PLACE, True)
-        time.sleep(5.0)
+        self.server.clock.sleep(5.0)
         self.server.set_actuator(Inputs.PICK_PLACE, False)
 
-        time.sleep(1)  # Pequena pausa para garantir que o pick/place iniciou
+        self.server.clock.sleep(1)  # Pequena pausa para garantir que o pick/place iniciou
 
         self.server.set_actuator(Inputs.ESTEIRA_PEDIDO, True)
 
@@ -143,408 +190,266 @@ class EventProcessor:
             print("Warehouse cheio - parando esteira de carregamento")
 
         self.lines.stop_esteira_carregamento()
-        time.sleep(3.0)
-
-    def handle_storage(self):
-
-        if self.first_time:
-            time.sleep(2)
-            self.first_time = False
-
-        # ---------------------------------------------
-        # ---------------------------------------------
-
-        # ----- eventos da warehouse
-
-        while True:
+        self.server.clock.sleep(3.0)
 
-            if self.server.get_sensor(Coils.sensor_client_warehouse) == True:
-                print("Sensor client é true")
-                self.lines._t_save_on_client_warehouse()
-
-            time.sleep(1)
-
-            if self.server.get_sensor(Coils.sensor_storage_warehouse) == True:
-                print("Sensor storage é true")
-                self.lines._t_save_on_storage_warehouse()
-
-            time.sleep(0.500)
-
-    def handle_conveyor_storage_1(self):
+    # ---------- índice endereço → handler (montado uma única vez) ----------
+    def _build_edge_index(self) -> None:
         """
-        Gerencia a ESTEIRA 1: Recebe do hall_1_0
-        Continua rodando se tiver caixa no meio (is_box_conveyor_1) até chegar na ponta
-        """
-        while True:
-            try:
-                hall_1_0 = self.server.get_sensor(Coils.sensor_hall_1_0)
-                sensor_1 = self.server.get_sensor(Coils.sensor_conveyor_storage_1)
-                is_box_1 = self.server.get_sensor(Coils.is_box_conveyor_1)
-
-                if hall_1_0 and not sensor_1:
-                    self.server.set_actuator(Inputs.conveyor_storage_1, True)
-
-                    while (
-                        self.server.get_sensor(Coils.sensor_conveyor_storage_1) == False
-                    ):
-                        # if self.verbose:
-                        #     print("preso aqui no 1")
-                        self.server.set_actuator(Inputs.conveyor_storage_1, True)
-                        time.sleep(0.1)
-
-                    time.sleep(1)
-                    self.server.set_actuator(Inputs.conveyor_storage_1, False)
-
-                elif is_box_1 and not sensor_1:
-                    self.server.set_actuator(Inputs.conveyor_storage_1, True)
-                    if self.verbose:
-                        print("Movendo caixa do meio da esteira 1 até a ponta")
-                    time.sleep(0.1)
-                else:
-                    self.server.set_actuator(Inputs.conveyor_storage_1, False)
-
-                time.sleep(2)
+        Registra as bordas monitoradas na ordem de prioridade do scan.
+        A ordem é a mesma do antigo encadeamento de `_handle_edge`:
+        os botões de máquina têm `halts=True` e adiam o restante do scan.
 
-            except Exception as e:
-                if self.verbose:
-                    print(f"[EVENTS] Erro no handle_conveyor_storage_1: {e}")
-                time.sleep(0.5)
-
-    def handle_conveyor_storage_2(self):
-        """
-        Gerencia a ESTEIRA 2: Recebe da esteira 1
-        Continua rodando se tiver caixa no meio (is_box_conveyor_2) até chegar na ponta
+        `key` é a estação no dispatcher: handlers da mesma estação rodam em
+        série (ex.: HALL 1_6 e 1_5 disputam a esteira de pedido); os botões
+        de máquina ficam com `key=None` e rodam na própria thread de scan.
         """
-        while True:
-            try:
-                sensor_1 = self.server.get_sensor(Coils.sensor_conveyor_storage_1)
-                sensor_2 = self.server.get_sensor(Coils.sensor_conveyor_storage_2)
-                is_box_2 = self.server.get_sensor(Coils.is_box_conveyor_2)
-
-                if sensor_1 and not sensor_2:
-                    self.server.set_actuator(Inputs.conveyor_storage_2, True)
-
-                    self.server.set_actuator(Inputs.conveyor_storage_1, True)
-                    time.sleep(2)
-                    self.server.set_actuator(Inputs.conveyor_storage_1, False)
-
-                    while (
-                        self.server.get_sensor(Coils.sensor_conveyor_storage_2) == False
-                    ):
-                        self.server.set_actuator(Inputs.conveyor_storage_2, True)
-                        if self.verbose:
-                            print("preso aqui no 2")
-                        time.sleep(0.1)
-
-                    time.sleep(1)
-                    self.server.set_actuator(Inputs.conveyor_storage_2, False)
-
-                elif is_box_2 and not sensor_2:
-                    self.server.set_actuator(Inputs.conveyor_storage_2, True)
-                    if self.verbose:
-                        print("Movendo caixa do meio da esteira 2 até a ponta")
-                    time.sleep(0.1)
-                else:
-                    self.server.set_actuator(Inputs.conveyor_storage_2, False)
-
-                time.sleep(2)
-
-            except Exception as e:
-                if self.verbose:
-                    print(f"[EVENTS] Erro no handle_conveyor_storage_2: {e}")
-                time.sleep(0.5)
-
-    def handle_conveyor_storage_3(self):
-        """
-        Gerencia a ESTEIRA 3: Recebe da esteira 2
-        Continua rodando se tiver caixa no meio (is_box_conveyor_3) até chegar na ponta
-        """
-        while True:
-            try:
-                sensor_2 = self.server.get_sensor(Coils.sensor_conveyor_storage_2)
-                sensor_3 = self.server.get_sensor(Coils.sensor_conveyor_storage_3)
-                is_box_3 = self.server.get_sensor(Coils.is_box_conveyor_3)
-
-                if sensor_2 and not sensor_3:
-                    self.server.set_actuator(Inputs.conveyor_storage_3, True)
-
-                    self.server.set_actuator(Inputs.conveyor_storage_2, True)
-                    time.sleep(2)
-                    self.server.set_actuator(Inputs.conveyor_storage_2, False)
-
-                    while (
-                        self.server.get_sensor(Coils.sensor_conveyor_storage_3) == False
-                    ):
-                        self.server.set_actuator(Inputs.conveyor_storage_3, True)
-                        if self.verbose:
-                            print("preso aqui no 3")
-                        time.sleep(0.1)
-
-                    time.sleep(0.3)
-                    self.server.set_actuator(Inputs.conveyor_storage_3, False)
-
-                elif is_box_3 and not sensor_3:
-                    self.server.set_actuator(Inputs.conveyor_storage_3, True)
-                    if self.verbose:
-                        print("Movendo caixa do meio da esteira 3 até a ponta")
-                    time.sleep(0.1)
-                else:
-                    self.server.set_actuator(Inputs.conveyor_storage_3, False)
-
-                time.sleep(2)
-
-            except Exception as e:
-                if self.verbose:
-                    print(f"[EVENTS] Erro no handle_conveyor_storage_3: {e}")
-                time.sleep(0.5)
-
-    def handle_conveyor_storage_4(self):
-        """
-        Gerencia a ESTEIRA 4 (FINAL): Recebe da esteira 3 e entrega no warehouse
-        Esta esteira não tem is_box sensor intermediário
-        """
-        while True:
-            try:
-                sensor_3 = self.server.get_sensor(Coils.sensor_conveyor_storage_3)
-                sensor_storage = self.server.get_sensor(Coils.sensor_storage_warehouse)
-
-                if sensor_3 and not sensor_storage:
-                    self.server.set_actuator(Inputs.conveyor_storage_4, True)
-
-                    self.server.set_actuator(Inputs.conveyor_storage_3, True)
-                    time.sleep(2)
-                    self.server.set_actuator(Inputs.conveyor_storage_3, False)
-
-                    while (
-                        self.server.get_sensor(Coils.sensor_storage_warehouse) == False
-                    ):
-
-                        if self.server.get_sensor(Coils.sensor_conveyor_storage_3):
-                            self.server.set_actuator(Inputs.conveyor_storage_3, True)
-                            time.sleep(0.7)
-                            self.server.set_actuator(Inputs.conveyor_storage_3, False)
-
-                        self.server.set_actuator(Inputs.conveyor_storage_4, True)
-                        if self.verbose:
-                            print("preso aqui no 4")
-                        time.sleep(0.1)
-
-                    self.server.set_actuator(Inputs.conveyor_storage_4, False)
-
-                time.sleep(1)
-
-            except Exception as e:
-                if self.verbose:
-                    print(f"[EVENTS] Erro no handle_conveyor_storage_4: {e}")
-                time.sleep(0.5)
-
-    def handle_scan(self, coils_snapshot: List[int]) -> None:
-
         # ---> Eventos da esteira do client
-
-        # TT3 - Turntable 3
-        self._handle_edge(
-            Coils.SENSOR_TT3, coils_snapshot, lambda: self._on_tt3_detection()
+        self._bind(Coils.SENSOR_TT3, "rising", self._on_tt3_detection, key="tt3")
+        self._bind(Coils.SENSOR_HALL_1_6, "rising", self._on_hall_1_6, key="pedido")
+        self._bind(Coils.SENSOR_HALL_1_5, "rising", self._on_hall_1_5, key="pedido")
+        self._bind(
+            Coils.SENSOR_HALL_1_4, "rising", self._on_hall_1_4, key="carregamento"
         )
-
-        # HALL 1_6 - Para esteira de pedido temporariamente
-        self._handle_edge(
-            Coils.SENSOR_HALL_1_6, coils_snapshot, lambda: self._on_hall_1_6()
+        self._bind(
+            Coils.SENSOR_WAREHOUSE,
+            "rising",
+            self._on_sensor_warehouse,
+            key="carregamento",
         )
-
-        # HALL 1_5 - Aciona pick and place
-        self._handle_edge(
-            Coils.SENSOR_HALL_1_5, coils_snapshot, lambda: self._on_hall_1_5()
-        )
-
-        # HALL 1_4 - Liga esteira de carregamento
-        self._handle_edge(
-            Coils.SENSOR_HALL_1_4, coils_snapshot, lambda: self._on_hall_1_4()
-        )
-
-        # SENSOR WAREHOUSE - Para esteira de carregamento
-        self._handle_edge(
-            Coils.SENSOR_WAREHOUSE, coils_snapshot, lambda: self._on_sensor_warehouse()
-        )
-        self._handle_edge(
+        self._bind(
             Coils.button_box_from_storage,
-            coils_snapshot,
+            "rising",
             lambda: self.lines.remove_from_storage_warehouse(),
+            key="crane",
         )
+        # caixa chegando nas entradas de cada rack: vira tarefa na fila do
+        # transelevador do rack (só enfileira, roda na própria thread de scan)
+        for rack in self.lines.racks.values():
+            if rack.config.client_sensor is not None:
+                self._bind(
+                    rack.config.client_sensor,
+                    "rising",
+                    partial(self.lines.save_on_client_warehouse, rack.name),
+                )
+            if rack.config.storage_sensor is not None:
+                self._bind(
+                    rack.config.storage_sensor,
+                    "rising",
+                    partial(self.lines.save_on_storage_warehouse, rack.name),
+                )
 
-        # ---> Eventos da esteira do estoque
-        # self._handle_edge( Coils.sensor_hall_1_0, coils_snapshot, lambda: self.lines.run_conveyor_client(), )
-
-        # ---------------------------------------------
-        # ---------------------------------------------
-
-        # Sensores que verificam a presença de caixotes no emmiter
-        self._handle_edge(
+        # Sensores que verificam a presença de caixotes no emmiter:
+        # partem de 1 e só acionam quando o caixote sai do sensor (1 -> 0)
+        self._bind(
             Coils.Sensor_1_Caixote_Azul,
-            coils_snapshot,
+            "falling",
             lambda: self.lines.run_blue_line(),
+            key="linhas",
+            initial=1,
         )
-
-        self._handle_edge(
+        self._bind(
             Coils.Sensor_1_Caixote_Verde,
-            coils_snapshot,
+            "falling",
             lambda: self.lines.run_green_line(),
+            key="linhas",
+            initial=1,
         )
-
-        self._handle_edge(
+        self._bind(
             Coils.Sensor_1_Caixote_Vazio,
-            coils_snapshot,
+            "falling",
             lambda: self.lines.run_empty_line(),
+            key="linhas",
+            initial=1,
         )
 
-        self._handle_edge(
+        self._bind(
             Coils.Sensor_2_Caixote_Azul,
-            coils_snapshot,
+            "rising",
             lambda: self._on_arrival(
                 "blue", Coils.Sensor_2_Caixote_Azul, self.lines.run_esteira_producao_2
             ),
+            key="arrival",
         )
-
-        self._handle_edge(
+        self._bind(
             Coils.Sensor_2_Caixote_Verde,
-            coils_snapshot,
+            "rising",
             lambda: self._on_arrival(
                 "green", Coils.Sensor_2_Caixote_Verde, self.lines.stop_green_line
             ),
+            key="arrival",
         )
-
-        self._handle_edge(
+        self._bind(
             Coils.Sensor_2_Caixote_Vazio,
-            coils_snapshot,
+            "rising",
             lambda: self._on_arrival(
                 "other", Coils.Sensor_2_Caixote_Vazio, self.lines.stop_empty_line
             ),
+            key="arrival",
         )
 
-        self._handle_edge(
+        self._bind(
             Coils.Load_Sensor,
-            coils_snapshot,
+            "rising",
             lambda: self.server.auto.arm_tt2_if_idle("Load_Sensor"),
+            key="tt2",
         )
+        self._bind(Coils.Create_OP, "rising", self._on_create_op, key="mes")
 
-        self._handle_edge(Coils.Create_OP, coils_snapshot, self._on_create_op)
+        # Botões (Emergency/Restart/Start/Stop)
+        self._bind(
+            Coils.Emergency, "toggle", self._on_emergency_edge, initial=1, halts=True
+        )
+        self._bind(Coils.RestartButton, "toggle", self.server._on_reset, halts=True)
+        self._bind(Coils.Start, "rising", self.server._on_start, halts=True)
+        self._bind(Coils.Stop, "rising", self.server._on_stop, halts=True)
 
-        # Botões (Start/Reset/Emergency)
-        if self._handle_edge(
-            Coils.Emergency, coils_snapshot, self.server._on_emergency_toggle
-        ):
-            return
-        if self._handle_edge(
-            Coils.RestartButton, coils_snapshot, self.server._on_reset
-        ):
-            return
-        if self._handle_edge(Coils.Start, coils_snapshot, self.server._on_start):
-            return
-        if self._handle_edge(Coils.Stop, coils_snapshot, self.server._on_stop):
+        # ---- HAL por BORDA de subida e delega ao AutoController ----
+        # (mesma estação das chegadas: ambos alimentam a arrival_q, em ordem)
+        self._bind(Coils.Sensor_Hall, "rising", self._on_hal_edge, key="arrival")
+
+        # ---- cadeia de acumulação até o warehouse: qualquer mudança de sensor
+        # recalcula as zonas (lógica curta, roda na própria thread de scan)
+        for coil in self.storage_chain.sensors:
+            self._bind(coil, "toggle", self.storage_chain.update)
+
+        # ---- sensores de visão: alimentam a janela de classificação do HAL
+        # (só registram o nº do scan, rodam na própria thread de scan)
+        self._bind(Coils.Vision_Blue, "toggle", lambda: self._on_vision_edge("BLUE", Coils.Vision_Blue))
+        self._bind(Coils.Vision_Green, "toggle", lambda: self._on_vision_edge("GREEN", Coils.Vision_Green))
+
+        # ---- rastreamento de caixas: cada borda move uma caixa de trecho
+        # (só mexe em filas em memória, roda na própria thread de scan)
+        tracker = self.server.tracker
+        for coil, origin in EMITTERS:
+            self._bind(coil, "falling", partial(self._on_emitter, origin), initial=1)
+        for coil, edge, src, dst in TRANSITIONS:
+            self._bind(coil, edge, partial(tracker.advance, src, dst))
+
+    def _bind(
+        self,
+        addr: int,
+        edge: str,
+        callback: Callable[[], None],
+        *,
+        key: Optional[str] = None,
+        initial: int = 0,
+        halts: bool = False,
+    ) -> None:
+        if edge not in ("rising", "falling", "toggle"):
+            raise ValueError(f"Borda inválida: {edge}")
+        bit = 1 << addr
+        if addr not in self._bindings:
+            self._bindings[addr] = []
+            self._priority[addr] = len(self._priority)
+            self._watch_mask |= bit
+            if initial:
+                self._prev_word |= bit
+        self._bindings[addr].append(
+            EdgeBinding(
+                addr=addr,
+                edge=edge,
+                callback=callback,
+                key=key,
+                halts=halts,
+                name=f"{_COIL_NAMES.get(addr, addr)}:{edge}",
+            )
+        )
+
+    # ---------- scan ----------
+    def handle_scan(
+        self,
+        coils_snapshot: Sequence[int],
+        word: Optional[int] = None,
+        timestamp: Optional[float] = None,
+    ) -> None:
+        """
+        Compara o snapshot com o anterior (XOR bit a bit) e despacha apenas os
+        endereços que mudaram. `word` é o snapshot já empacotado, se o chamador
+        tiver (evita empacotar duas vezes). `timestamp` é o instante da leitura
+        do scan (`server.clock`), base da latência borda→handler.
+        """
+        if word is None:
+            word = pack_bits(coils_snapshot)
+
+        changed = (word ^ self._prev_word) & self._watch_mask
+        if not changed:
             return
 
-        # ---- HAL por BORDA de subida e delega ao AutoController ----
-        try:
-            cur_hal = (
-                1
-                if (
-                    Coils.Sensor_Hall < len(coils_snapshot)
-                    and coils_snapshot[Coils.Sensor_Hall]
+        if timestamp is None:
+            timestamp = self.server.clock.monotonic()
+        committed = self._prev_word
+        for addr in sorted(iter_set_bits(changed), key=self._priority.__getitem__):
+            bit = 1 << addr
+            level = 1 if word & bit else 0
+            committed ^= bit
+
+            halt = False
+            for binding in self._bindings[addr]:
+                if binding.edge == "rising" and not level:
+                    continue
+                if binding.edge == "falling" and level:
+                    continue
+                if binding.edge == "toggle" and self.verbose:
+                    print(f"Coil {addr} mudou: {1 - level} → {level}")
+                self.dispatcher.submit(
+                    binding.key,
+                    self._run_timed,
+                    binding,
+                    timestamp,
+                    label=binding.name,
                 )
-                else 0
-            )
-            if (self._hal_prev == 0) and (cur_hal == 1):
-                # Delega ao AutoController — ele cuida da inibição e janela
-                if hasattr(self.server, "auto"):
-                    self.server.auto.enqueue_hal(Coils.Sensor_Hall)
-        except Exception as _e:
-            # opcional: log leve sem quebrar o loop
-            if getattr(self, "verbose", False):
-                print(f"[EVENTS] HAL edge err: {_e}")
-        finally:
-            self._hal_prev = cur_hal
-
-    # ---------- detecção de borda (idêntica à lógica original, com casos especiais) ----------
-    def _handle_edge(
-        self, addr: int, coils: List[int], callback: Callable[[], None]
-    ) -> bool:
-        acionou = False
-        cur = int(bool(coils[addr])) if addr < len(coils) else 0
-
-        # Casos especiais (sensores 1 das três linhas): detectar transição e acionar apenas quando cur==0
-        if addr in (
-            Coils.Sensor_1_Caixote_Vazio,
-            Coils.Sensor_1_Caixote_Azul,
-            Coils.Sensor_1_Caixote_Verde,
-        ):
-            prev = self._prev.get(addr, 1)
-            if cur != prev:
-                if self.verbose:
-                    nome = {
-                        Coils.Sensor_1_Caixote_Vazio: "vazio",
-                        Coils.Sensor_1_Caixote_Azul: "azul",
-                        Coils.Sensor_1_Caixote_Verde: "verde",
-                    }[addr]
-                    # print(f"Sensor {nome} mudou de estado: {prev} → {cur}")
-                if cur == 0:
-                    callback()
-                acionou = True
-            self._prev[addr] = cur
-            return acionou
-
-        # Emergência: sempre chama no toggle
-        if addr == Coils.Emergency:
-            prev = self._prev.get(addr, 1)
-            if cur != prev:
-                if self.verbose:
-                    print(f"Emergência mudou: {prev} → {cur}")
-                callback()
-                acionou = True
-            self._prev[addr] = cur
+                halt = halt or binding.halts
+
+            if halt:
+                # as demais bordas continuam pendentes e são vistas no próximo scan
+                break
+
+        self._prev_word = committed
 
+    def _run_timed(self, binding: EdgeBinding, detected_at: float) -> None:
+        self.server.metrics.record_edge(
+            binding.name, self.server.clock.monotonic() - detected_at
+        )
+        binding.callback()
+
+    def _on_emergency_edge(self) -> None:
+        # guarda o estado das esteiras da TT1 antes do desligamento geral,
+        # para que o Restart (`_all_on`) consiga restaurá-lo. Só no acionamento
+        # (1 -> 0): na liberação as esteiras já estão desligadas e o estado
+        # guardado seria sobrescrito com False
+        if self.server.get_sensor(Coils.Emergency) is False:
             self.server.turntable_state1 = self.server.get_actuator(
                 Inputs.Turntable1_Esteira_EntradaSaida
             )
             self.server.turntable_state2 = self.server.get_actuator(
                 Inputs.Turntable1_Esteira_SaidaEntrada
             )
-            return acionou
+        self.server._on_emergency_toggle()
 
-        if addr == Coils.RestartButton:
-            prev = self._prev.get(addr, 0)
-            if cur != prev:
-                if self.verbose:
-                    print(f"Restart process mudou: {prev} → {cur}")
-                callback()
-                acionou = True
-            self._prev[addr] = cur
-            return acionou
-
-        # Demais: borda de subida
-        prev = self._prev.get(addr, 0)
-        if cur == 1 and prev == 0:
-            callback()
-            acionou = True
-        self._prev[addr] = cur
-        return acionou
+    def _on_hal_edge(self) -> None:
+        try:
+            # Delega ao AutoController — ele cuida da inibição e janela
+            if hasattr(self.server, "auto"):
+                self.server.auto.enqueue_hal(Coils.Sensor_Hall)
+        except Exception as _e:
+            # opcional: log leve sem quebrar o loop
+            if getattr(self, "verbose", False):
+                print(f"[EVENTS] HAL edge err: {_e}")
+
+    def _on_vision_edge(self, klass: str, coil: int) -> None:
+        if hasattr(self.server, "auto"):
+            self.server.auto.hal.on_edge(klass, self.server.get_sensor(coil))
+
+    def _on_emitter(self, origin: str) -> None:
+        # na partida (planta parada/em emergência) o Sensor_1 pode cair sem
+        # caixa nenhuma: só conta caixote com a máquina rodando
+        if self.server.machine_state.lower() == "running":
+            self.server.tracker.emit(origin)
 
     def _on_arrival(self, tipo: str, sensor_addr: int, stop_fn) -> None:
         stop_fn()
         self.server.auto.enqueue_arrival(tipo, sensor_addr)
 
-    def _handle_edge_fall(
-        self, addr: int, coils: List[int], callback: Callable[[], None]
-    ) -> bool:
-        """Aciona callback na borda de QUEDA (1->0)."""
-        acionou = False
-        cur = int(bool(coils[addr])) if addr < len(coils) else 0
-        prev = self._prev.get(addr, cur)
-        if cur == 0 and prev == 1:
-            callback()
-            acionou = True
-        self._prev[addr] = cur
-        return acionou
-
     def _on_create_op(self):
         if self.verbose:
             print("[EVENTS] Create_OP → cadastrando pedidos…")
@@ -585,4 +490,4 @@ class EventProcessor:
                 print(f"[EVENTS] Erro ao persistir orders: {e}")
 
         # mudar o modo no AutoController (passa a atender pedidos)
-        self.server.auto._set_mode_order()
+        self.server.auto.enter_order_mode()
@@ -0,0 +1,310 @@
+# fulfillment.py
+import math
+import threading
+from collections import deque
+from dataclasses import dataclass
+from functools import partial
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional, Tuple
+
+from controllers.crane import CraneJob, RETRIEVE_STORAGE, STORE_KINDS
+from controllers.crane_steps import PICK_FROM_RACK, PUT_ON_IO
+from metrics import Histogram
+from services.orders import Order
+from services.tracking import (
+    CENTRAL,
+    FILA_TT1,
+    HAL,
+    LINE_STAGES,
+    PEDIDO,
+    PRODUCAO_2,
+    TT1,
+    TT2,
+    TT3,
+)
+
+if TYPE_CHECKING:
+    from controllers.auto import AutoController
+    from controllers.racks import Rack
+
+# produtos que o estoque guarda e o transelevador sabe retirar
+STOCKED = ("BLUE", "GREEN")
+
+# caminho de uma caixa de pedido depois da linha de origem, até chegar ao ponto
+# de E/S do cliente no rack (fim de PEDIDO). A retirada do estoque é medida até
+# o ponto de E/S do estoque (PUT_ON_IO): os dois prazos terminam com a caixa
+# entregue em um ponto de E/S, sem a guarda na coluna do cliente
+ORDER_ROUTE = (FILA_TT1, TT1, HAL, PRODUCAO_2, TT2, CENTRAL, TT3, PEDIDO)
+
+# trechos antes da classificação do HAL: a caixa ainda pode ir para a Central
+UNCLASSIFIED = tuple(LINE_STAGES.values()) + (FILA_TT1, TT1, HAL)
+
+ORIGIN_COLORS = {origin: origin.upper() for origin in LINE_STAGES}
+
+
+@dataclass
+class Decision:
+    at: float
+    color: str
+    stock_s: float  # prazo previsto puxando do rack
+    production_s: float  # prazo previsto esperando a produção (inf = nenhuma caixa a caminho)
+    rack: str
+    job: Optional[int] = None  # tarefa do transelevador
+
+
+class FulfillmentPlanner:
+    """
+    Atende pedidos do `OrderManager` pelo estoque quando isso for mais rápido
+    que esperar uma caixa nova da produção (`auto.fulfillment`).
+
+    A cada pedido criado (`OrderManager.on_created`) e a cada `interval_s`,
+    `plan()` olha as caixas dos pedidos abertos ainda sem origem, na ordem da
+    fila, e compara dois prazos para cada uma:
+
+    - produção: a próxima caixa da cor ainda não classificada (linhas, fila e
+      TT1, HAL) no `BoxTracker`, mais as médias de permanência dos trechos que
+      faltam no caminho ORDER até o ponto de E/S do cliente (`nominal_stage_s`
+      para trecho sem amostra). Sem caixa a caminho, infinito. Cada caixa da
+      produção atende uma caixa de pedido só.
+    - estoque: a tarefa atual e as retiradas já na fila do rack pela duração
+      média de cada tipo no `CraneScheduler` (no ciclo duplo, mais uma guarda
+      por retirada enquanto houver guarda na fila), mais o ciclo desta
+      retirada pelo `CraneStepEngine` (viagens pelo `TravelModel` + passos do
+      garfo) até o ponto de E/S do estoque, no rack de menor prazo.
+
+    Se o estoque ganha por mais de `margin_s`, a caixa é reservada no
+    `InventoryService`, prometida ao pedido (`OrderManager.allocate`) e vira
+    uma tarefa `RETRIEVE_STORAGE` com a cor do pedido. Ao fim da retirada o
+    pedido é baixado (`complete`) se a caixa entregue (`job.result`) é da cor
+    do pedido; senão a promessa é desfeita (`release`). A reserva é sempre
+    devolvida. Caixas deixadas para a produção seguem o caminho ORDER
+    de sempre (HAL -> TT2 -> Central).
+
+    Args:
+        auto: AutoController (pedidos e modo de atendimento)
+        interval_s: Intervalo entre replanejamentos sem pedido novo
+        margin_s: Vantagem mínima do estoque sobre a produção
+        nominal_stage_s: Permanência assumida em trecho ainda sem amostra
+        enabled: False = só a rota ORDER (comportamento anterior)
+    """
+
+    def __init__(
+        self,
+        auto: "AutoController",
+        verbose: bool = False,
+        interval_s: float = 2.0,
+        margin_s: float = 0.0,
+        nominal_stage_s: float = 10.0,
+        enabled: bool = True,
+    ):
+        self.auto = auto
+        self.server = auto.server
+        self.verbose = verbose
+        self.interval_s = interval_s
+        self.margin_s = margin_s
+        self.nominal_stage_s = nominal_stage_s
+        self.enabled = enabled
+
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._wake = False
+
+        self.from_stock = 0  # caixas de pedido entregues pelo estoque
+        self.failed = 0  # retiradas que não entregaram a cor do pedido (pedido volta a esperar)
+        self.waiting = 0  # caixas deixadas para a produção no último plano
+        self.stock_lead = Histogram()  # pedido da retirada -> caixa na saída
+        self.decisions: Deque[Decision] = deque(maxlen=100)
+
+        auto.orders.on_created.append(lambda order: self.wake())
+
+    # -------- ciclo de vida --------
+    def start(self) -> None:
+        with self._cond:
+            self._stopping = False
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="fulfillment", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def wake(self) -> None:
+        with self._cond:
+            self._wake = True
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        clock = self.server.clock
+        while True:
+            with self._cond:
+                if not self._wake and not self._stopping:
+                    clock.wait_condition(self._cond, self.interval_s)
+                if self._stopping:
+                    return
+                self._wake = False
+            if not (self.enabled and self.auto.running):
+                continue
+            try:
+                self.plan()
+            except Exception as e:
+                print(f"[FULFILL] erro no planejamento: {e}")
+
+    # -------- prazos --------
+    def _stage_mean(self, stage: str) -> float:
+        h = self.server.tracker.dwell.get(stage)
+        return h.summary()["mean"] if h is not None and h.count else self.nominal_stage_s
+
+    def production_eta(self, color: str) -> List[float]:
+        """Prazos (s) das caixas `color` ainda não classificadas, da mais próxima para a mais distante."""
+        tracker, now = self.server.tracker, self.server.clock.monotonic()
+        means = {stage: self._stage_mean(stage) for stage in ORDER_ROUTE}
+        etas = []
+        for stage in UNCLASSIFIED:
+            after = ORDER_ROUTE[ORDER_ROUTE.index(stage) + 1:] if stage in ORDER_ROUTE else ORDER_ROUTE
+            rest = sum(means[s] for s in after)
+            spent_mean = means[stage] if stage in means else self._stage_mean(stage)
+            for box in tracker.queue(stage):
+                if (box.klass or ORIGIN_COLORS.get(box.origin)) != color:
+                    continue
+                left = max(0.0, spent_mean - (now - box.history[-1][1]))
+                etas.append(left + rest)
+        return sorted(etas)
+
+    def stock_eta(self, color: str) -> Optional[Tuple[float, "Rack"]]:
+        """Menor prazo (s) de uma retirada `color` e o rack que a faria; None sem estoque livre."""
+        if self.server.inventory.available(color) <= 0:
+            return None
+        best: Optional[Tuple[float, "Rack"]] = None
+        for rack in self.server.lines.racks.values():
+            wh, steps, jobs = rack.warehouse, rack.steps, rack.jobs
+            origin = rack.crane_origin
+            with wh._warehouse_lock:
+                cell = wh.slotting.choose_retrieve(wh, color, origin)
+            if cell is None:
+                continue
+            address = rack.config.address(*cell)
+            cycle = (
+                steps.estimate_move(origin, address)
+                + steps.estimate(PICK_FROM_RACK)
+                + steps.estimate_move(address, rack.config.storage_io)
+                + steps.estimate(PUT_ON_IO)
+            )
+            # retirada tem a maior prioridade: espera só a tarefa atual e as
+            # outras retiradas; no ciclo duplo cada uma sai junto com uma guarda
+            retrieve = self._service_mean(jobs, (RETRIEVE_STORAGE,), cycle)
+            ahead = jobs.pending_count(RETRIEVE_STORAGE)
+            eta = ahead * retrieve + cycle
+            if jobs.current is not None:
+                eta += self._service_mean(jobs, (jobs.current.kind,), retrieve)
+            if jobs.dual_command:
+                stores = sum(jobs.pending_count(kind) for kind in STORE_KINDS)
+                eta += min(stores, ahead + 1) * self._service_mean(jobs, STORE_KINDS, retrieve)
+            if best is None or eta < best[0]:
+                best = (eta, rack)
+        return best
+
+    @staticmethod
+    def _service_mean(jobs, kinds, default: float) -> float:
+        """Duração média das tarefas `kinds` no `CraneScheduler` (`default` sem amostra)."""
+        hs = [jobs.service_time[k] for k in kinds if k in jobs.service_time and jobs.service_time[k].count]
+        if not hs:
+            return default
+        n = sum(h.count for h in hs)
+        return sum(h.summary()["mean"] * h.count for h in hs) / n
+
+    # -------- plano --------
+    def plan(self) -> List[Decision]:
+        """Decide a origem das caixas sem origem dos pedidos abertos; devolve as retiradas pedidas."""
+        pending: Dict[str, int] = {}
+        for order in self.auto.orders.open_orders():
+            pending[order.color] = pending.get(order.color, 0) + order.open_boxes
+
+        pulled: List[Decision] = []
+        waiting = 0
+        for color, boxes in pending.items():
+            if color not in STOCKED:
+                waiting += boxes
+                continue
+            production = self.production_eta(color)
+            k = 0  # próxima caixa da produção ainda livre
+            for _ in range(boxes):
+                production_s = production[k] if k < len(production) else math.inf
+                stock = self.stock_eta(color)
+                if stock is not None and stock[0] + self.margin_s < production_s:
+                    decision = self._pull(color, stock[1], stock[0], production_s)
+                    if decision is not None:
+                        pulled.append(decision)
+                        continue
+                k += 1
+                waiting += 1
+        self.waiting = waiting
+        return pulled
+
+    def _pull(self, color: str, rack: "Rack", stock_s: float, production_s: float) -> Optional[Decision]:
+        inventory = self.server.inventory
+        if not inventory.reserve(color):
+            return None
+        order = self.auto.orders.allocate(color)
+        if order is None:
+            inventory.release(color)
+            return None
+        decision = Decision(
+            at=self.server.clock.monotonic(),
+            color=color,
+            stock_s=stock_s,
+            production_s=production_s,
+            rack=rack.name,
+        )
+        job = self.server.lines.retrieve_product(
+            color, rack=rack, source="pedido", on_done=partial(self._retrieved, order)
+        )
+        decision.job = job.seq if job is not None else None
+        self.decisions.append(decision)
+        if self.verbose:
+            prod = "sem caixa a caminho" if math.isinf(production_s) else f"{production_s:.1f}s"
+            print(
+                f"[FULFILL] pedido {color}: estoque em {rack.name} ({stock_s:.1f}s) "
+                f"x produção ({prod}) -> retirada #{decision.job}"
+            )
+        return decision
+
+    def _retrieved(self, order: Order, job: CraneJob, ok: bool) -> None:
+        """Fim da retirada (thread do transelevador)."""
+        orders = self.auto.orders
+        self.server.inventory.release(job.product)
+        delivered = job.result if ok else None
+        if delivered == order.color:
+            orders.complete(order, enqueue_client=False)
+            self.from_stock += 1
+            self.stock_lead.record(job.finished_at - job.created_at)
+        else:
+            if ok:
+                print(f"[FULFILL] retirada #{job.seq} entregou {delivered} para o pedido {order.color}; pedido volta a esperar")
+            orders.release(order)
+            self.failed += 1
+            self.wake()
+        if self.verbose:
+            print(f"[FULFILL] retirada #{job.seq} ({job.product}) {'entregue' if delivered == order.color else 'falhou'}")
+        self.auto.leave_order_mode_if_idle()
+
+    # -------- relatório --------
+    def summary(self) -> dict:
+        return {
+            "from_stock": self.from_stock,
+            "failed": self.failed,
+            "waiting": self.waiting,
+            "stock_lead": self.stock_lead.summary(),
+        }
+
+    def format_summary(self) -> str:
+        s = self.summary()
+        line = f"[FULFILL] do estoque={s['from_stock']} falhas={s['failed']} esperando produção={s['waiting']}"
+        h = s["stock_lead"]
+        if h["count"]:
+            line += f" | retirada média={h['mean']:.1f}s p90={h['p90']:.1f}s"
+        return line
@@ -1,9 +1,20 @@
 import threading
-import time
-from addresses import Coils, Inputs, Holding_Registers
+from addresses import Coils, Inputs
 from typing import TYPE_CHECKING
-from typing import Optional, Dict, Tuple
+from typing import Optional, Dict, List, Tuple, Union
+from functools import partial
 from services.DAO import MES, OrderConfig
+from clock import Clock, RealClock
+from controllers.resources import TT3, Signal
+from controllers.crane import CraneScheduler, RETRIEVE_STORAGE, STORE_CLIENT, STORE_STORAGE
+from controllers.crane_steps import CraneStepEngine, PICK_FROM_IO, PICK_FROM_RACK, PUT_IN_RACK, PUT_ON_IO
+from controllers.slotting import SlotStrategy, TravelModel, TravelTimeStrategy
+from controllers.occupancy import OccupancyGrid
+from controllers.racks import Rack, RackConfig, default_rack
+from controllers.warehouse_map import WarehouseMapRenderer
+from services.inventory_journal import InventoryJournal
+from services.tracking import ENTRADA_STORAGE
+from collections import Counter
 
 if TYPE_CHECKING:
     from server import FactoryModbusEventServer
@@ -11,33 +22,68 @@ if TYPE_CHECKING:
 
 class WarehouseExtension():
     
-    def __init__(self, verbose: bool):
+    def __init__(
+        self,
+        verbose: bool,
+        clock: Optional[Clock] = None,
+        config: Optional[RackConfig] = None,
+        journal: Optional[InventoryJournal] = None,
+    ):
         
         self._warehouse_lock = threading.Lock()
         self.verbose = verbose
+        self.clock = clock or RealClock()
+
+        # geometria, papéis das colunas e E/S do rack (ver controllers/racks.py)
+        self.rack_config = config or RackConfig()
+        cfg = self.rack_config
 
-        self.client_columns = {
-            "rafael_ltda": 1,   
-            "maria_sa": 2,
-            "joao_corp": 3,
-            "ana_ind": 4
-        }
+        self.client_columns = dict(cfg.client_columns)
         
-        self.client_column_number = 1
-        self.storage_column_number = 8
+        self.client_column_number = cfg.client_io
+        self.storage_column_number = cfg.storage_io
 
-        self.storage_columns = [5, 6, 7, 8, 9]
+        self.storage_columns = list(cfg.storage_columns)
+
+        # escolha de posição no estoque (ver controllers/slotting.py) e
+        # pedidos de retirada por cor (alimenta a armazenagem por classe)
+        self.slotting: SlotStrategy = TravelTimeStrategy(
+            TravelModel(columns=cfg.columns, rows=cfg.rows, offset=cfg.address_offset),
+            io_address=cfg.storage_io,
+            park_address=cfg.park_store,
+        )
+        self.demand: Counter = Counter()
         
-        self.warehouse = {}
-        for col in range(1, 10):
-            self.warehouse[col] = {}
-            for row in range(1, 7):
-                self.warehouse[col][row] = {
-                    "occupied": False,
-                    "product_type": None,
-                    "timestamp": None,
-                    "order_id": None
-                }
+        # ocupação em vetores + índices (ver controllers/occupancy.py)
+        self.grid = OccupancyGrid(
+            columns=cfg.columns,
+            rows=cfg.rows,
+            groups={c: cfg.column_role(c) for c in range(1, cfg.columns + 1)},
+        )
+
+        # versão da ocupação (muda a cada occupy/free) e mapa impresso fora da
+        # thread do transelevador (ver controllers/warehouse_map.py)
+        self.version = 0
+        self.map = WarehouseMapRenderer(self)
+
+        # ocupação persistida (ver services/inventory_journal.py): com diário,
+        # a ocupação da última execução é reconstruída aqui
+        self.journal = journal
+        if journal is not None:
+            restored = journal.exists()
+            replayed = journal.load(self.grid)
+            if self.verbose and restored:
+                print(
+                    f"[WAREHOUSE] inventário restaurado de {journal.directory}: "
+                    f"{len(self.grid.occupied())} posições ocupadas, {replayed} registros do diário "
+                    f"em {journal.load_ms:.1f}ms"
+                )
+
+    def checkpoint(self) -> None:
+        """Grava o snapshot do inventário e zera o diário (se houver diário)."""
+        if self.journal is not None:
+            with self._warehouse_lock:
+                self.journal.snapshot()
 
 
     # ================= WAREHOUSE MANAGEMENT METHODS =================
@@ -50,12 +96,12 @@ class WarehouseExtension():
         - Coluna 1 = mais à DIREITA
         - Linha 1 = mais EMBAIXO
         
-        A fórmula permanece a mesma: address = column + ((row - 1) * 9)
-        O que muda é apenas a interpretação visual.
+        Fórmula (ver `RackConfig.address`):
+        address = address_offset + column + ((row - 1) * columns)
         
         Args:
-            column: Número da coluna (1-9, onde 1 é a mais à direita)
-            row: Número da linha (1-6, onde 1 é a mais embaixo)
+            column: Número da coluna (1-columns, onde 1 é a mais à direita)
+            row: Número da linha (1-rows, onde 1 é a mais embaixo)
         
         Returns:
             Endereço Modbus calculado
@@ -68,13 +114,7 @@ class WarehouseExtension():
             >>> _calculate_position_address(9, 6)  # Esquerda-Topo
             54
         """
-        if not (1 <= column <= 9):
-            raise ValueError(f"Coluna deve estar entre 1 e 9, recebido: {column}")
-        
-        if not (1 <= row <= 6):
-            raise ValueError(f"Linha deve estar entre 1 e 6, recebido: {row}")
-        
-        address = column + ((row - 1) * 9)
+        address = self.rack_config.address(column, row)
         
         if self.verbose:
             position_desc = self._get_position_description(column, row)
@@ -95,15 +135,15 @@ class WarehouseExtension():
         """
         if column == 1:
             col_desc = "Coluna 1 (extrema direita)"
-        elif column == 9:
-            col_desc = "Coluna 9 (extrema esquerda)"
+        elif column == self.rack_config.columns:
+            col_desc = f"Coluna {column} (extrema esquerda)"
         else:
             col_desc = f"Coluna {column}"
         
         if row == 1:
             row_desc = "Linha 1 (embaixo)"
-        elif row == 6:
-            row_desc = "Linha 6 (topo)"
+        elif row == self.rack_config.rows:
+            row_desc = f"Linha {row} (topo)"
         else:
             row_desc = f"Linha {row}"
         
@@ -120,24 +160,22 @@ class WarehouseExtension():
         Returns:
             Número da linha disponível (1-6) ou None se coluna estiver cheia
         """
-        for row in range(1, 7):  
-            if not self.warehouse[column][row]["occupied"]:
-                return row
-        return None
+        return self.grid.next_free_row(column)
     
-    def _find_next_available_storage_column(self) -> Optional[Tuple[int, int]]:
+    def _find_next_available_storage_column(self, product: Optional[str] = None) -> Optional[Tuple[int, int]]:
         """
-        Encontra a próxima posição disponível nas colunas de storage (5-9).
+        Escolhe a posição livre nas colunas de storage (5-9) pela estratégia
+        `self.slotting` (padrão: menor tempo de ciclo do transelevador).
         Storage fica do lado ESQUERDO do warehouse.
         
+        Args:
+            product: Cor da caixa a guardar, se conhecida (usada na armazenagem por classe)
+        
         Returns:
-            Tupla (column, row) com próxima posição disponível ou None se storage estiver cheio
+            Tupla (column, row) com a posição escolhida ou None se storage estiver cheio
         """
-        for col in self.storage_columns: 
-            row = self._find_next_available_position_in_column(col)
-            if row is not None:
-                return (col, row)
-        return None
+        with self._warehouse_lock:
+            return self.slotting.choose_store(self, product)
     
     def _occupy_position(self, column: int, row: int, product_type: str, order_id: Optional[str] = None) -> bool:
         """
@@ -146,30 +184,27 @@ class WarehouseExtension():
         Args:
             column: Número da coluna (1-9, onde 1 é a mais à direita)
             row: Número da linha (1-6, onde 1 é a mais embaixo)
-            product_type: Tipo do produto ("BLUE" | "GREEN")
+            product_type: Tipo do produto ("BLUE" | "GREEN" | "OTHER" = caixote vazio)
             order_id: ID do pedido (opcional)
         
         Returns:
             True se posição foi ocupada com sucesso, False se já estava ocupada
         """
-        if product_type not in ["BLUE", "GREEN"]:
-            raise ValueError(f"Tipo de produto inválido: {product_type}. Deve ser 'BLUE' ou 'GREEN'")
+        if product_type not in ["BLUE", "GREEN", "OTHER"]:
+            raise ValueError(f"Tipo de produto inválido: {product_type}. Deve ser 'BLUE', 'GREEN' ou 'OTHER'")
         
-        if not (1 <= column <= 9) or not (1 <= row <= 6):
+        if not (1 <= column <= self.rack_config.columns) or not (1 <= row <= self.rack_config.rows):
             raise ValueError(f"Posição inválida: coluna={column}, linha={row}")
         
         with self._warehouse_lock:
-            if self.warehouse[column][row]["occupied"]:
+            ts = self.clock.time()
+            if not self.grid.occupy(column, row, product_type, ts, order_id):
                 if self.verbose:
                     print(f"[WAREHOUSE] AVISO: Posição coluna={column} linha={row} já está ocupada")
                 return False
-            
-            self.warehouse[column][row] = {
-                "occupied": True,
-                "product_type": product_type,
-                "timestamp": time.time(),
-                "order_id": order_id
-            }
+            self.version += 1
+            if self.journal is not None:
+                self.journal.occupy(column, row, product_type, ts, order_id)
             
             if self.verbose:
                 pos_desc = self._get_position_description(column, row)
@@ -222,32 +257,29 @@ class WarehouseExtension():
         Libera uma posição no warehouse a partir do endereço Modbus.
         
         Args:
-            address: Endereço Modbus da posição (1-54)
+            address: Endereço Modbus da posição (no esquema do rack)
         
         Returns:
             True se posição foi liberada, False se já estava livre
         """
         
-        if not (1 <= address <= 54):
+        cell = self.rack_config.cell(address)
+        if cell is None:
             if self.verbose:
-                print(f"[WAREHOUSE] ERRO: Endereço inválido: {address}. Deve estar entre 1 e 54.")
+                first = self.rack_config.address(1, 1)
+                print(f"[WAREHOUSE] ERRO: Endereço inválido: {address}. Deve estar entre {first} e {first + self.rack_config.size - 1}.")
             return False
         
-        column = ((address - 1) % 9) + 1
-        row = ((address - 1) // 9) + 1
+        column, row = cell
         
         with self._warehouse_lock:
-            if not self.warehouse[column][row]["occupied"]:
+            if not self.grid.free(column, row):
                 if self.verbose:
                     print(f"[WAREHOUSE] AVISO: Posição endereço={address} (coluna={column} linha={row}) já está livre")
                 return False
-            
-            self.warehouse[column][row] = {
-                "occupied": False,
-                "product_type": None,
-                "timestamp": None,
-                "order_id": None
-            }
+            self.version += 1
+            if self.journal is not None:
+                self.journal.free(column, row)
             
             if self.verbose:
                 pos_desc = self._get_position_description(column, row)
@@ -255,12 +287,15 @@ class WarehouseExtension():
             
             return True
         
-    def _find_available_product(self, product: str) -> int:
+    def _find_available_product(self, product: str, origin: int = 5) -> int:
         """
-        Busca um produto disponível no storage (colunas 5-9).
+        Busca um produto disponível no storage (colunas 5-9). Entre as posições
+        com o produto, a estratégia `self.slotting` escolhe a de menor tempo de
+        ciclo a partir de `origin`.
         
         Args:
             product: Tipo do produto a buscar ("green" ou "blue")
+            origin: Endereço onde o transelevador está
         
         Returns:
             Endereço Modbus da posição encontrada ou -1 se não houver produto disponível
@@ -271,21 +306,20 @@ class WarehouseExtension():
             if self.verbose:
                 print(f"[WAREHOUSE] ERRO: Tipo de produto inválido: {product}")
             return -1
+
+        self.demand[product_type] += 1
         
         with self._warehouse_lock:
-            for col in self.storage_columns:
-
-                for row in range(1, 7):
-                    position = self.warehouse[col][row]
-                    
-                    if position["occupied"] and position["product_type"] == product_type:
-                        address = self._calculate_position_address(col, row)
-                        
-                        if self.verbose:
-                            pos_desc = self._get_position_description(col, row)
-                            print(f"[WAREHOUSE] Produto {product_type} encontrado em {pos_desc} (endereço {address})")
-
-                        return address
+            cell = self.slotting.choose_retrieve(self, product_type, origin)
+            if cell is not None:
+                col, row = cell
+                address = self._calculate_position_address(col, row)
+                
+                if self.verbose:
+                    pos_desc = self._get_position_description(col, row)
+                    print(f"[WAREHOUSE] Produto {product_type} encontrado em {pos_desc} (endereço {address})")
+
+                return address
         
         # Se chegou aqui, não encontrou o produto
         if self.verbose:
@@ -297,77 +331,21 @@ class WarehouseExtension():
     
     def print_warehouse_map(self) -> None:
         """
-        Imprime um mapa visual do warehouse com orientação correta.
-        
-        VISTA FRONTAL:
-        - Esquerda do mapa = Coluna 9 (esquerda física)
-        - Direita do mapa = Coluna 1 (direita física)
-        - Topo do mapa = Linha 6 (topo físico)
-        - Base do mapa = Linha 1 (base física)
+        Imprime agora o mapa visual do warehouse (vista frontal, ver
+        `controllers/warehouse_map.py`). Na thread do transelevador use
+        `self.map.request()`, que imprime em segundo plano.
         """
-        print("\n" + "="*95)
-        print(" WAREHOUSE MAP - VISTA FRONTAL ".center(95, "="))
-        print("="*95)
-        
-        print(f"{'Posição':>10} | ", end="")
-        for c in range(9, 0, -1):
-            print(f" Col {c} ", end=" | ")
-        print()
-        
-        print(f"{'':>10} | ", end="")
-        for c in range(9, 0, -1):
-            if c in self.storage_columns:
-                print(" (Stor)", end=" | ")
-            else:
-                client_name = ""
-                for name, col_num in self.client_columns.items():
-                    if col_num == c:
-                        client_name = name[:6] 
-                        break
-                print(f" ({client_name:^6})", end=" | ")
-        print()
-        
-        print("-" * 95)
-        
-        for row in range(6, 0, -1):
-
-            if row == 6:
-                row_label = f"L{row} (topo)"
-            elif row == 1:
-                row_label = f"L{row} (base)"
-            else:
-                row_label = f"L{row}"
-            
-            print(f"{row_label:>10} | ", end="")
-            
-            for col in range(9, 0, -1):
-                pos = self.warehouse[col][row]
-                if pos["occupied"]:
-                    symbol = "B" if pos["product_type"] == "BLUE" else "G"
-                    print(f"  [{symbol}]  ", end=" | ")
-                else:
-                    print(f"  [ ]  ", end=" | ")
-            print()
-        
-        print("-" * 95)
-        
-        # Legenda
-        print("\nLEGENDA:")
-        print("  [B] = Produto BLUE  |  [G] = Produto GREEN  |  [ ] = Vazio")
-        print("\nCLIENTES (Colunas 1-4, lado DIREITO):")
-        for name, col in sorted(self.client_columns.items(), key=lambda x: x[1]):
-            print(f"  • {name:15} = Coluna {col}")
-        print(f"\nSTORAGE (Colunas 5-9, lado ESQUERDO): {self.storage_columns}")
-        print("\nORIENTAÇÃO:")
-        print("  • Coluna 1 = Extrema DIREITA")
-        print("  • Coluna 9 = Extrema ESQUERDA")
-        print("  • Linha 1 = BASE (embaixo)")
-        print("  • Linha 6 = TOPO (em cima)")
-        print("="*95 + "\n")
+        print(self.map.full_text())
 
 
 class LineController:
-    def __init__(self, server: "FactoryModbusEventServer", verbose: bool = True):
+    def __init__(
+        self,
+        server: "FactoryModbusEventServer",
+        verbose: bool = True,
+        racks: Optional[List[RackConfig]] = None,
+        inventory_dir: Optional[str] = None,
+    ):
         self.server = server
         self.verbose = verbose
         self._blue_running = False
@@ -375,10 +353,9 @@ class LineController:
         self._empty_running = False
         self._production_running = False
 
-        self.turntable3_busy = False
-
 
         self._lock = threading.Lock()
+        self.store_retry_s = 5.0  # nova guarda depois de uma que falhou com a caixa na entrada
 
         self.config = MES()
 
@@ -388,30 +365,83 @@ class LineController:
         # self.DEFAULT_ORDER_RESOURCE  = 5
         # self.DEFAULT_ORDER_CLIENT = "rafael_ltda"
 
-        # --- construção da classe de controle da warehouse
-        self.warehouse_data_structure = WarehouseExtension(verbose=verbose)
-
-            # -- definindo algumas caixas alocadas no cliente 1 e 2
-        self.warehouse_data_structure._occupy_position(1, 2, 'BLUE', f'column_free_row_free_order')
-        self.warehouse_data_structure._occupy_position(2, 2, 'BLUE', f'column_free_row_free_order')
-
-            # -- definindo algumas caixas alocadas no estoque
-        self.warehouse_data_structure._occupy_position(9, 1, 'BLUE', f'column_free_row_free_order')
-        self.warehouse_data_structure._occupy_position(9, 2, 'BLUE', f'column_free_row_free_order')
-        self.warehouse_data_structure._occupy_position(8, 2, 'BLUE', f'column_free_row_free_order')
-        self.warehouse_data_structure._occupy_position(9, 4, 'BLUE', f'column_free_row_free_order')
+        # --- construção da classe de controle da warehouse: um WarehouseExtension
+        # por rack; o primeiro é o rack padrão (o warehouse atual)
+        self.racks: Dict[str, Rack] = {}
+        for cfg in racks or [default_rack()]:
+            if cfg.name in self.racks:
+                raise ValueError(f"Rack duplicado: {cfg.name}")
+            for other in self.racks.values():
+                shared = cfg.shared_io(other.config)
+                if shared:
+                    raise ValueError(f"Racks {other.name} e {cfg.name} dividem E/S: {', '.join(shared)}")
+            # com `inventory_dir`, a ocupação vem do diário da execução anterior;
+            # a carga inicial só entra na primeira partida (e também é gravada)
+            journal = InventoryJournal(inventory_dir, cfg.name) if inventory_dir else None
+            seeded = journal is None or not journal.exists()
+            wh = WarehouseExtension(verbose=verbose, clock=server.clock, config=cfg, journal=journal)
+            if seeded:
+                for column, row, product in cfg.initial_stock:
+                    wh._occupy_position(column, row, product, 'column_free_row_free_order')
+            self.racks[cfg.name] = Rack(cfg, wh)
+        self.rack = next(iter(self.racks.values()))
+        self.warehouse_data_structure = self.rack.warehouse
 
 
         # --- Estados da mesa ---
         self._turntable_turn = False  # False = giro OFF/centro
         self._turntable_belt = "stop"  # "forward" | "backward" | "stop"
         self._belt_watch_th = None  # thread do watcher
-        self._belt_watching = False  # flag do watcher
+        self._belt_watching = Signal(server.clock)  # watcher de limite da TT1 ativo
         self.turntable_busy = False
         self.active_job = None
-        self.turntable1_busy = False
-
-        self.is_warehouse_free = True
+        self.turntable1_busy = Signal(server.clock)  # comando da TT1 em execução
+
+        # --- fila de tarefas de cada transelevador (uma execução por vez, por
+        # prioridade) e sequências confirmadas por sensor; racks diferentes
+        # operam em paralelo
+        for rack in self.racks.values():
+            server.resources.add(rack.config.resource)
+            rack.steps = CraneStepEngine(server, rack, verbose=verbose)
+            rack.jobs = CraneScheduler(
+                server,
+                {
+                    STORE_STORAGE: partial(self._save_on_storage_warehouse, rack=rack),
+                    STORE_CLIENT: partial(self._save_on_client_warehouse, rack=rack),
+                    RETRIEVE_STORAGE: partial(self._remove_from_storage_warehouse, rack=rack),
+                },
+                verbose=verbose,
+                dual_command=True,
+                resource=rack.config.resource,
+                name=f"crane-{rack.name}",
+            )
+            rack.jobs.start()
+        self.crane_jobs = self.rack.jobs
+
+    # estado dos recursos (a posse fica no server.resources)
+    @property
+    def is_warehouse_free(self) -> bool:
+        return not self.server.resources.busy(self.rack.config.resource)
+
+    def _rack(self, rack: Union[None, str, Rack]) -> Rack:
+        """Rack pelo nome (None = rack padrão)."""
+        if rack is None:
+            return self.rack
+        if isinstance(rack, Rack):
+            return rack
+        return self.racks[rack]
+
+    def _rack_for_retrieval(self, color: Optional[str] = None) -> Rack:
+        """Rack com a cor (padrão: a do pedido no MES) em estoque e menos tarefas na fila (padrão se nenhum tiver)."""
+        color = (color or self.config.get_config().order_color or "").upper()
+        if color not in ("BLUE", "GREEN"):
+            return self.rack
+        stocked = [r for r in self.racks.values() if r.warehouse.grid.count(color, "storage")]
+        return min(stocked, key=lambda r: r.jobs.pending_count(), default=self.rack)
+
+    @property
+    def turntable3_busy(self) -> bool:
+        return self.server.resources.busy(TT3)
 
     def whichProductIs(self):
         if(self.config.get_config().order_color == 'BLUE'):
@@ -442,7 +472,7 @@ class LineController:
         try:
             print('acionando o pick')
             self.server.set_actuator(Inputs.PICK_PLACE, True)
-            time.sleep(2.0)
+            self.server.clock.sleep(2.0)
             self.server.set_actuator(Inputs.PICK_PLACE, False)
             
             if self.verbose:
@@ -462,28 +492,31 @@ class LineController:
     def _t_ciclo_turntable3(self):
         """Thread que executa o ciclo completo da turntable 3"""
         print('entrei na thread')
-        # Marca mesa como ocupada
-        with self._lock:
-            if self.turntable3_busy:
-                if self.verbose:
-                    print("[TT3] Mesa já ocupada, ignorando novo ciclo")
-                return
-            self.turntable3_busy = True
-        
+        # Reserva a mesa: com um ciclo em andamento, este entra na fila (FIFO)
+        # em vez de ser descartado
+        tt3 = self.server.resources.acquire(TT3, "tt3:ciclo", timeout=60.0)
+        if tt3 is None:
+            if self.verbose:
+                print("[TT3] Mesa ocupada há mais de 60 s, ignorando novo ciclo")
+            return
+
         try:
+            # a caixa da fila só entra na mesa depois que o ciclo anterior a liberou
+            self.server.wait_for(Coils.SENSOR_TT3, True, timeout=10.0)
+
             if self.verbose:
                 print("📦 Iniciando ciclo da Turntable 3")
             
             # Para a esteira forward
-            time.sleep(1)
+            self.server.clock.sleep(1)
             self.server.set_actuator(Inputs.Turntable3_forward, False)
-            time.sleep(1.5)
+            self.server.clock.sleep(1.5)
             
             # Gira 90°
             if self.verbose:
                 print("Girando 90°...")
             self.server.set_actuator(Inputs.Turntable3_turn, True)
-            time.sleep(2.5)
+            self.server.clock.sleep(2.5)
             
             # Liga esteira forward e esteira de pedido
             if self.verbose:
@@ -492,11 +525,11 @@ class LineController:
             self.server.set_actuator(Inputs.ESTEIRA_PEDIDO, True)
             self.server.set_actuator(Inputs.Turntable3_forward, True)
 
-            time.sleep(3)
+            self.server.clock.sleep(3)
             
             # Desliga esteira forward
             self.server.set_actuator(Inputs.Turntable3_forward, False)
-            time.sleep(3)
+            self.server.clock.sleep(3)
             
             # Volta turntable para posição original
             self.server.set_actuator(Inputs.Turntable3_turn, False)
@@ -509,8 +542,7 @@ class LineController:
             if self.verbose:
                 print(f"[ERRO] Ciclo TT3 falhou: {e}")
         finally:
-            with self._lock:
-                self.turntable3_busy = False
+            tt3.release()
 
 
     def start_esteira_carregamento(self):
@@ -532,177 +564,176 @@ class LineController:
     # ================= warehouse space =====================
 
     # ------------ storage ------------
-    def save_on_storage_warehouse(self):
+    def save_on_storage_warehouse(self, rack: Union[None, str, Rack] = None):
         # if self.server.machine_state != "running":
         #     if(self.verbose):
         #         print('\n\n \t\t [LOG STORAGE WAREHOUSE] === Impossível executar este evento pois a máquina não está em execução. \n\n')
         #     return
 
-        threading.Thread(target=self._t_save_on_storage_warehouse, name="T_save_on_storage_warehouse", daemon=True).start()
+        self._t_save_on_storage_warehouse(rack)
 
-    def _t_save_on_storage_warehouse(self):
-        if(self.is_warehouse_free == False):
-            return
+    def _t_save_on_storage_warehouse(self, rack: Union[None, str, Rack] = None):
+        """Pede a guarda da caixa da entrada do estoque (executada pela fila do rack)."""
+        rack = self._rack(rack)
+        self._submit_store(rack, STORE_STORAGE, "storage", rack.config.storage_sensor)
 
+    def _save_on_storage_warehouse(self, park: bool = True, rack: Optional[Rack] = None) -> bool:
+        """
+        Guarda a caixa da entrada do estoque. Com `park=False` o transelevador
+        fica na posição guardada (ciclo duplo: a retirada sai dali).
+
+        Returns:
+            True se a caixa foi deixada no rack
+        """
+        rack = self._rack(rack)
+        wh, cfg = rack.warehouse, rack.config
+        if not self._entry_occupied(rack, cfg.storage_sensor) or self._crane_loaded(rack, "guarda"):
+            return False
         if(self.verbose):
             print('\n\n \t\t [LOG storage WAREHOUSE] === writing in target position. \n\n')
-        
-        self.is_warehouse_free = False
 
         try:
         
-            self.server.write_input_register(address = Holding_Registers.posicao_alvo, value = self.warehouse_data_structure.storage_column_number)
-            time.sleep(2)
-            print('\t\t', Coils.sensor_move_warehouse)
-            
-            while(self.server.get_sensor(Coils.sensor_move_warehouse)): time.sleep(0.2)
-
-            self.server.set_actuator(Inputs.manejador_fora, True)
-            time.sleep(2)
-            
-            self.server.set_actuator(Inputs.manejador_levantar, True)
-            time.sleep(2)
-            
-            self.server.set_actuator(Inputs.manejador_fora, False)
-            time.sleep(1)
+            # cor da caixa parada na entrada (rastreada desde o HAL, só no rack
+            # padrão); sem rastreamento, cai na fila de storage do MES
+            box = self.server.tracker.head(ENTRADA_STORAGE) if rack is self.rack else None
+            color_box = box.klass if box is not None and box.klass else self.get_current_color_storage()
 
-            print('momento de mandar para a proxima coluna disponível')
-            storage_position = self.warehouse_data_structure._find_next_available_storage_column()
+            # a posição é escolhida antes de pegar a caixa: sem vaga ela fica
+            # na entrada e o garfo não sai vazio nem carregado
+            if self.verbose:
+                print('momento de mandar para a proxima coluna disponível')
+            storage_position = wh._find_next_available_storage_column(color_box)
 
             if storage_position is None:
                 print('[ERRO] Storage está completamente cheio! Impossível armazenar.')
-                return
+                return False
             
             column_free, row_free = storage_position
 
-            print(column_free, row_free)
-
-            free_position = column_free + (9 * (row_free - 1))
-            print('\t\tposição disponível atualmente: ', free_position)
-
-            self.server.write_input_register(address=Holding_Registers.posicao_alvo, value = free_position)
-
-            time.sleep(1)
-            while(self.server.get_sensor(Coils.sensor_move_warehouse)): time.sleep(0.2)
-
-            self.server.set_actuator(Inputs.manejador_dentro, True)
-            time.sleep(2)
-            self.server.set_actuator(Inputs.manejador_levantar, False)
-            time.sleep(2)
-            self.server.set_actuator(Inputs.manejador_dentro, False)
-            time.sleep(1)
+            free_position = cfg.address(column_free, row_free)
+            if self.verbose:
+                print(f'\t\tposição disponível atualmente: {free_position} (coluna {column_free}, linha {row_free})')
 
-            self.server.write_input_register(address=Holding_Registers.posicao_alvo, value = 5)
+            self._crane_move(rack, wh.storage_column_number)
+            self._crane_pick_from_io(rack)
 
-            time.sleep(1)
-            while(self.server.get_sensor(Coils.sensor_move_warehouse)): time.sleep(0.2)
+            self._crane_move(rack, free_position)
+            self._crane_put_in_rack(rack)
 
-            color_box = self.get_current_color_storage()
+            if park:
+                self._crane_move(rack, cfg.park_store)
 
-            self.warehouse_data_structure._occupy_position(column_free, row_free, color_box, f'{column_free}_{row_free}_order')
-            time.sleep(0.1)
-            self.warehouse_data_structure.print_warehouse_map()
+            if rack is self.rack:
+                self.server.tracker.store(free_position)
+            wh._occupy_position(column_free, row_free, color_box, f'{column_free}_{row_free}_order')
+            self.server.clock.sleep(0.1)
+            wh.map.request()
+            return True
 
         except ValueError as e:
             print('[ERRO ao executar a função write_input_register - posicao_alvo]: ', e)
+            return False
 
-        self.is_warehouse_free = True
-
-    def remove_from_storage_warehouse(self):
+    def remove_from_storage_warehouse(self, rack: Union[None, str, Rack] = None):
         # if self.server.machine_state != "running":
         #     if(self.verbose):
         #         print('\n\n \t\t [LOG STORAGE WAREHOUSE] === Impossível executar este evento pois a máquina não está em execução. \n\n')
         #     return
 
-        threading.Thread(target=self._t_remove_from_storage_warehouse, name="T_remove_from_storage_warehouse", daemon=True).start()
+        self._t_remove_from_storage_warehouse(rack)
 
-    def _t_remove_from_storage_warehouse(self,):
-        if(self.is_warehouse_free == False):
-            print('A thread de remoção do estoque não foi executada pois o robô não está livre!')
-            return
+    def _t_remove_from_storage_warehouse(self, rack: Union[None, str, Rack] = None):
+        """Pede a retirada de uma caixa do estoque (sem rack: o que tem a cor do pedido)."""
+        rack = self._rack(rack) if rack is not None else self._rack_for_retrieval()
+        rack.jobs.submit(RETRIEVE_STORAGE, "retirada")
+
+    def retrieve_product(self, product: str, rack: Union[None, str, Rack] = None, source: str = "pedido", on_done=None):
+        """
+        Pede a retirada de uma caixa `product` (independente da cor do pedido
+        no MES). Sem rack: o que tem a cor em estoque e a menor fila.
+        `on_done(job, ok)` segue para o `CraneScheduler`.
+        """
+        rack = self._rack(rack) if rack is not None else self._rack_for_retrieval(product)
+        return rack.jobs.submit(RETRIEVE_STORAGE, source, product=product.upper(), on_done=on_done)
 
+    def _remove_from_storage_warehouse(
+        self, park: bool = True, rack: Optional[Rack] = None, product: Optional[str] = None
+    ) -> Union[bool, str]:
+        """
+        Retira uma caixa `product` (padrão: a cor do pedido no MES) e a entrega
+        na saída. Parte de onde o transelevador estiver (no ciclo duplo, da
+        posição que acabou de guardar). Com o garfo carregado não começa: a
+        caixa entregue seria a que está no garfo.
+
+        Returns:
+            A cor da caixa entregue (a da posição retirada), ou False
+        """
+        rack = self._rack(rack)
+        wh, cfg = rack.warehouse, rack.config
+        delivered: Union[bool, str] = False
+        if self._crane_loaded(rack, "retirada"):
+            return False
         if(self.verbose):
             print('\n\n \t\t [LOG storage WAREHOUSE] === writing in target position. \n\n')
-        
-        self.is_warehouse_free = False
 
         self.server.set_actuator(Inputs.light_button_box_from_storage, True)
         
         try:
         
             #como é uma retirada, garanto que o Z está baixo
-            self.server.set_actuator(Inputs.manejador_levantar, False)
+            self.server.set_actuator(cfg.fork_lift, False)
 
             #encontrando onde tem um produto disponível
             
-            order_color = self.config.get_config().order_color 
-            position_of_item = self.warehouse_data_structure._find_available_product(order_color)
+            order_color = product or self.config.get_config().order_color
+            position_of_item = wh._find_available_product(order_color, origin=rack.crane_origin)
 
             if(position_of_item == -1):
                 if(self.verbose):
                     print('Não foi encontrado nada no estoque!')
-                    self.server.set_actuator(Inputs.light_not_in_store, True)
+                self.server.set_actuator(Inputs.light_not_in_store, True)
 
-                    time.sleep(3)
+                self.server.clock.sleep(3)
 
-                    self.server.set_actuator(Inputs.light_not_in_store, False)
-                    self.is_warehouse_free = True
+                self.server.set_actuator(Inputs.light_not_in_store, False)
+                self.server.set_actuator(Inputs.light_button_box_from_storage, False)
 
-                    return
+                return False
             self.server.set_actuator(Inputs.light_have_in_store, True)
             
             
             #vou ate a coluna a qual eu quero remover
-            self.server.write_input_register(address=Holding_Registers.posicao_alvo, value = position_of_item)
-
-            time.sleep(2)
-            print('\t\t', Coils.sensor_move_warehouse)
-            while(self.server.get_sensor(Coils.sensor_move_warehouse)): time.sleep(0.2)
-
-            self.server.set_actuator(Inputs.manejador_dentro, True)
-            time.sleep(2)
-            self.server.set_actuator(Inputs.manejador_levantar, True)
-            time.sleep(2)
-            self.server.set_actuator(Inputs.manejador_dentro, False)
-            time.sleep(1)
-
-            self.server.write_input_register(address=Holding_Registers.posicao_alvo, value = 8)
-
-            time.sleep(1)
-            while(self.server.get_sensor(Coils.sensor_move_warehouse)): time.sleep(0.2)
-
-            self.server.set_actuator(Inputs.manejador_fora, True)
-            time.sleep(2)
-            self.server.set_actuator(Inputs.manejador_levantar, False)
-            time.sleep(2)
-            self.server.set_actuator(Inputs.manejador_fora, False)
-            time.sleep(1)
+            picked = wh.grid.product_at(*cfg.cell(position_of_item))
+            self._crane_move(rack, position_of_item)
+            self._crane_pick_from_rack(rack)
 
-            self.server.write_input_register(address=Holding_Registers.posicao_alvo, value = 300)
+            self._crane_move(rack, wh.storage_column_number)
+            self._crane_put_on_io(rack)
 
-            time.sleep(1)
-            while(self.server.get_sensor(Coils.sensor_move_warehouse)): time.sleep(0.2)
+            if park:
+                self._crane_move(rack, cfg.park_retrieve)
 
-            self.warehouse_data_structure._free_position(address=position_of_item)
+            wh._free_position(address=position_of_item)
+            delivered = picked or False
 
-            time.sleep(0.1)
-            self.warehouse_data_structure.print_warehouse_map()
+            self.server.clock.sleep(0.1)
+            wh.map.request()
 
         except ValueError as e:
             print('[ERRO ao executar a função write_input_register - posicao_alvo]: ', e)
             
         self.server.set_actuator(Inputs.light_button_box_from_storage, False)
         self.server.set_actuator(Inputs.light_have_in_store, False)
-
-        self.is_warehouse_free = True
+        return delivered
 
     
     # ------------ client ------------
 
-    def get_current_client_storage(self) -> str:
+    def get_current_client_storage(self, consume: bool = True) -> str:
         """
         Retorna e remove o primeiro cliente da fila de storage.
-        Consome a fila (FIFO - First In, First Out).
+        Consome a fila (FIFO - First In, First Out); `consume=False` só consulta.
         
         Cada objeto da fila tem o formato:
         {"client": None, "color_box": "BLUE", "resources": None}
@@ -716,7 +747,7 @@ class LineController:
                     print("[STORAGE] Fila de storage está vazia!")
                 return None
             
-            first_item = self.config.queue_orders.pop(0)
+            first_item = self.config.queue_orders.pop(0) if consume else self.config.queue_orders[0]
             
             client_name = first_item.get("client", None)
             
@@ -781,90 +812,154 @@ class LineController:
             
             return None
 
-    def save_on_client_warehouse(self):
+    def save_on_client_warehouse(self, rack: Union[None, str, Rack] = None):
         
         # if self.server.machine_state != "running":
         #     if(self.verbose):
         #         print('\n\n \t\t [LOG client WAREHOUSE] === Impossível executar este evento pois a máquina não está em execução. \n\n')
         #     return
 
-        threading.Thread(target=self._t_save_on_client_warehouse, name="T_save_on_client_warehouse", daemon=True).start()
+        self._t_save_on_client_warehouse(rack)
+
+    def _t_save_on_client_warehouse(self, rack: Union[None, str, Rack] = None):
+        """Pede a guarda da caixa da entrada do cliente (executada pela fila do rack)."""
+        rack = self._rack(rack)
+        self._submit_store(rack, STORE_CLIENT, "cliente", rack.config.client_sensor)
+
+    def _submit_store(self, rack: Rack, kind: str, source: str, sensor: Optional[int]) -> None:
+        """
+        Enfileira a guarda da caixa parada no sensor de entrada `sensor`. A
+        borda de subida só chega uma vez por caixa: se a tarefa terminar com o
+        sensor ainda ocupado (guarda que falhou), ela é pedida de novo depois
+        de `store_retry_s`.
+        """
+        rack.jobs.submit(
+            kind, source, unique=True, on_done=partial(self._store_done, rack, kind, source, sensor)
+        )
 
-    def _t_save_on_client_warehouse(self):
-        if(self.is_warehouse_free == False):
+    def _store_done(self, rack: Rack, kind: str, source: str, sensor: Optional[int], job, ok: bool) -> None:
+        if sensor is None or not self.server.get_sensor(sensor):
             return
+        if ok:
+            # outra caixa já chegou: a borda dela pode ter caído no `unique`
+            self._submit_store(rack, kind, source, sensor)
+            return
+        print(f"[CRANE] {rack.name}: caixa ainda na entrada depois da tarefa #{job.seq}, nova guarda em {self.store_retry_s:.0f}s")
+        threading.Thread(
+            target=self._retry_store,
+            args=(rack, kind, source, sensor),
+            name=f"store-retry-{rack.name}",
+            daemon=True,
+        ).start()
+
+    def _retry_store(self, rack: Rack, kind: str, source: str, sensor: int) -> None:
+        self.server.clock.sleep(self.store_retry_s)
+        if self.server.get_sensor(sensor):
+            self._submit_store(rack, kind, source, sensor)
+
+    def _crane_loaded(self, rack: Rack, kind: str) -> bool:
+        """Garfo ainda com caixa (tarefa anterior que falhou depois de pegar): a tarefa não começa."""
+        if not rack.steps.loaded:
+            return False
+        print(f"[ERRO] {rack.name}: transelevador carregado, {kind} recusada até a caixa ser retirada do garfo")
+        return True
+
+    def _entry_occupied(self, rack: Rack, sensor: Optional[int]) -> bool:
+        """Nível do sensor de entrada no início da guarda (sem sensor mapeado: ocupado)."""
+        if sensor is None or self.server.get_sensor(sensor):
+            return True
+        if self.verbose:
+            print(f"[CRANE] {rack.name}: nenhuma caixa na entrada, guarda ignorada")
+        return False
 
+    def _save_on_client_warehouse(self, park: bool = True, rack: Optional[Rack] = None) -> bool:
+        """
+        Guarda a caixa da entrada do cliente na coluna dele. Com `park=False`
+        o transelevador fica na posição guardada (ciclo duplo).
+
+        Returns:
+            True se a caixa foi deixada no rack
+        """
+        rack = self._rack(rack)
+        wh, cfg = rack.warehouse, rack.config
+        if not self._entry_occupied(rack, cfg.client_sensor) or self._crane_loaded(rack, "guarda"):
+            return False
         if(self.verbose):
             print('\n\n \t\t [LOG client WAREHOUSE] === writing in target position. \n\n')
-        
-        self.is_warehouse_free = False
 
         try:
         
-            self.server.write_input_register(address=Holding_Registers.posicao_alvo, value = self.warehouse_data_structure.client_column_number)
-            time.sleep(2)
-            print('\t\t', Coils.sensor_move_warehouse)
-            while(self.server.get_sensor(Coils.sensor_move_warehouse)): time.sleep(0.2)
-            self.server.set_actuator(Inputs.manejador_fora, True)
-            time.sleep(2)
-            self.server.set_actuator(Inputs.manejador_levantar, True)
-            time.sleep(2)
-            self.server.set_actuator(Inputs.manejador_fora, False)
-            time.sleep(1)
-
-            print('momento de mandar para a proxima coluna disponível')
-            client, color_box = self.get_current_client_storage()
-            client_position = self.warehouse_data_structure._find_next_available_client_position(client)
+            # a posição é escolhida antes de pegar a caixa (e sem consumir a
+            # fila do MES): sem vaga ela fica na entrada
+            if self.verbose:
+                print('momento de mandar para a proxima coluna disponível')
+            current = self.get_current_client_storage(consume=False)
+            if current is None:
+                # a entrada do MES pode chegar depois da caixa: a guarda é pedida de novo
+                print('[ERRO] Nenhum cliente na fila do MES para a caixa da entrada do cliente.')
+                return False
+            client, color_box = current
+            client_position = wh._find_next_available_client_position(client)
 
             if client_position is None:
                 print('[ERRO] client está completamente cheio! Impossível armazenar.')
-                return
+                return False
             
             column_free, row_free = client_position
 
-            print(column_free, row_free)
+            free_position = cfg.address(column_free, row_free)
+            if self.verbose:
+                print(f'\t\tposição disponível atualmente: {free_position} (coluna {column_free}, linha {row_free})')
 
-            free_position = column_free + (9 * (row_free - 1))
-            print('\t\tposição disponível atualmente: ', free_position)
+            self._crane_move(rack, wh.client_column_number)
+            self._crane_pick_from_io(rack)
+            self.get_current_client_storage()
 
-            self.server.write_input_register(address=Holding_Registers.posicao_alvo, value = free_position)
+            self._crane_move(rack, free_position)
+            self._crane_put_in_rack(rack)
 
-            time.sleep(1)
-            while(self.server.get_sensor(Coils.sensor_move_warehouse)): time.sleep(0.2)
+            if park:
+                self._crane_move(rack, cfg.park_store)
 
-            self.server.set_actuator(Inputs.manejador_dentro, True)
-            time.sleep(2)
-            self.server.set_actuator(Inputs.manejador_levantar, False)
-            time.sleep(2)
-            self.server.set_actuator(Inputs.manejador_dentro, False)
-            time.sleep(1)
+            if rack is self.rack:
+                self.server.tracker.store(free_position)
+            wh._occupy_position(column_free, row_free, color_box, f'{column_free}_{row_free}_order')
+            self.server.clock.sleep(0.1)
+            wh.map.request()
+            return True
 
-            self.server.write_input_register(address=Holding_Registers.posicao_alvo, value = 5)
+        except ValueError as e:
+            print('[ERRO ao executar a função write_input_register - posicao_alvo]: ', e)
+            return False
 
-            time.sleep(1)
-            while(self.server.get_sensor(Coils.sensor_move_warehouse)): time.sleep(0.2)
+    # ------------ movimentos do transelevador ------------
 
-            self.warehouse_data_structure._occupy_position(column_free, row_free, color_box, f'{column_free}_{row_free}_order')
-            time.sleep(0.1)
-            self.warehouse_data_structure.print_warehouse_map()
+    def _crane_move(self, rack: Rack, address: int):
+        """Leva o transelevador do rack até `address` (confirmado pelo sensor de movimento)."""
+        rack.steps.move(address)
 
-        except ValueError as e:
-            print('[ERRO ao executar a função write_input_register - posicao_alvo]: ', e)
+    def _crane_pick_from_io(self, rack: Rack):
+        rack.steps.run(PICK_FROM_IO)
+
+    def _crane_put_on_io(self, rack: Rack):
+        rack.steps.run(PUT_ON_IO)
 
-        self.is_warehouse_free = True
+    def _crane_pick_from_rack(self, rack: Rack):
+        rack.steps.run(PICK_FROM_RACK)
+
+    def _crane_put_in_rack(self, rack: Rack):
+        rack.steps.run(PUT_IN_RACK)
 
 
 
     # ---------------- Helpers IO ----------------
     def _activate(self, *actuators):
         with self._lock:
-            for a in actuators:
-                self.server.set_actuator(a, True)
+            self.server.set_actuators({a: True for a in actuators})
 
     def _deactivate(self, *actuators):
         with self._lock:
-            for a in actuators:
-                self.server.set_actuator(a, False)
+            self.server.set_actuators({a: False for a in actuators})
 
     # ================= BLUE =================
     def run_blue_line(self):
@@ -1077,13 +1172,12 @@ class LineController:
         #   - uma operação anterior marcou busy (turntable1_busy=True), ou
         #   - o watcher da TT1 ainda está ativo (_belt_watching=True).
         # Obs.: Se preferir não BLOQUEAR, você pode apenas "return" quando ocupado.
-        wait_deadline = time.time() + 10.0  # timeout de segurança para não travar
-        while (
-            self.turntable1_busy or getattr(self, "_belt_watching", False)
-        ) and time.time() < wait_deadline:
-            time.sleep(0.01)
+        # espera as duas flags caírem (sem polling), com timeout de segurança para não travar
+        wait_deadline = self.server.clock.time() + 10.0
+        self.turntable1_busy.wait(False, timeout=10.0)
+        self._belt_watching.wait(False, timeout=max(0.0, wait_deadline - self.server.clock.time()))
 
-        if self.turntable1_busy or getattr(self, "_belt_watching", False):
+        if self.turntable1_busy or self._belt_watching:
             # Ainda ocupado após timeout, não agenda nova operação.
             if self.verbose:
                 print(
@@ -1122,7 +1216,7 @@ class LineController:
         stop_limit: str | None,
         belt_timeout_s: float,
     ):
-        self.turntable1_busy = True
+        self.turntable1_busy.set()
         TURN_COIL = Inputs.Turntable1_turn
         BELT_FWD = Inputs.Turntable1_Esteira_SaidaEntrada
         BELT_REV = Inputs.Turntable1_Esteira_EntradaSaida
@@ -1188,12 +1282,12 @@ class LineController:
                     f"[turntable] turn_on={turn_on} belt={belt} stop_limit={stop_limit} -> turn={getattr(self,'_turntable_turn',None)} belt_state={self._turntable_belt}"
                 )
         finally:
-            self.turntable1_busy = False
+            self.turntable1_busy.clear()
 
     # ---------------- watcher da esteira da mesa ----------------
     def _stop_belt_watcher(self):
         """Solicita parada do watcher atual (se existir) e aguarda um pouco."""
-        self._belt_watching = False
+        self._belt_watching.clear()
         th = self._belt_watch_th
         if th and th.is_alive():
             th.join(timeout=0.2)
@@ -1209,7 +1303,7 @@ class LineController:
     ):
         # mata watcher anterior
         self._stop_belt_watcher()
-        self._belt_watching = True
+        self._belt_watching.set()
 
         BELT_FWD = Inputs.Turntable1_Esteira_SaidaEntrada
         BELT_REV = Inputs.Turntable1_Esteira_EntradaSaida
@@ -1218,37 +1312,42 @@ class LineController:
         stop_evt = getattr(self.server, "_stop_evt", None)
 
         def _watch():
-            t_on = time.time()
+            t_on = self.server.clock.time()
             try:
                 # grace: dá tempo do motor iniciar (evita desligar se limite já começar True)
-                time.sleep(grace_s)
+                self.server.clock.sleep(grace_s)
 
                 # snapshot inicial para exigir BORDA (0->1)
                 start_state = bool(self.server.get_sensor(limit_addr))
-                deadline = time.time() + timeout_s
+                deadline = self.server.clock.time() + timeout_s
                 DEBOUNCE_N = 2
                 stable = 0
 
-                while time.time() < deadline:
+                while stable < DEBOUNCE_N:
+                    remaining = deadline - self.server.clock.time()
+                    if remaining <= 0:
+                        break
                     if stop_evt and stop_evt.is_set():
                         break
                     if self.server.machine_state != "running":
                         break
 
-                    cur = bool(self.server.get_sensor(limit_addr))
-                    if (not start_state) and cur:
-                        stable += 1
-                    else:
-                        stable = 0
-
-                    if stable >= DEBOUNCE_N:
-                        break
-                    time.sleep(0.02)
+                    # acorda na mudança do limite; a cada 250 ms revisa o estado da máquina
+                    slice_s = min(remaining, 0.25)
+                    if start_state:
+                        # limite já começou em 1: não há borda, só o timeout encerra
+                        self.server.clock.sleep(slice_s)
+                    elif self.server.wait_for(limit_addr, True, timeout=slice_s):
+                        # debounce: o limite precisa continuar em 1 por DEBOUNCE_N scans
+                        if not self.server.wait_for(
+                            limit_addr, False, timeout=DEBOUNCE_N * self.server.scan_time
+                        ):
+                            stable = DEBOUNCE_N
 
                 # tempo mínimo ligado antes de cortar
-                rem = min_on_s - (time.time() - t_on)
+                rem = min_on_s - (self.server.clock.time() - t_on)
                 if rem > 0:
-                    time.sleep(rem)
+                    self.server.clock.sleep(rem)
 
                 # corta belt por limite (estável) ou por timeout (fail-safe)
                 self.server.set_actuator(BELT_ADDR, False)
@@ -1265,7 +1364,7 @@ class LineController:
                             f"[turntable] timeout ({direction}); esteira interna parada por segurança."
                         )
             finally:
-                self._belt_watching = False
+                self._belt_watching.clear()
 
         self._belt_watch_th = threading.Thread(
             target=_watch, name=f"TWatch-Turntable-{direction}", daemon=True
@@ -1285,7 +1384,7 @@ class LineController:
 
         DEBOUNCE_N = 2
         stable = 0
-        t0 = time.time()
+        t0 = self.server.clock.time()
         print(
             f"[watcher] iniciado: direction={direction}, limit={limit_addr}, timeout={timeout_s}"
         )
@@ -1318,8 +1417,8 @@ class LineController:
                         f"[turntable] limite estável ({direction}); esteira interna parada."
                     )
                 break
-            time.sleep(0.25)
-            if (time.time() - t0) > timeout_s:
+            self.server.clock.sleep(0.25)
+            if (self.server.clock.time() - t0) > timeout_s:
                 # FAIL-SAFE: pare a direção ativa mesmo sem limite
                 if self.verbose:
                     print(
@@ -1333,9 +1432,9 @@ class LineController:
                     self._turntable_belt = "stop"
                 break
 
-            time.sleep(0.02)
+            self.server.clock.sleep(0.02)
 
-        self._belt_watching = False
+        self._belt_watching.clear()
 
     # =============== [ADD] API da TT2 (paralela à da TT1) ===============
     def set_turntable2_async(
@@ -0,0 +1,178 @@
+# occupancy.py
+import heapq
+import itertools
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+Cell = Tuple[int, int]  # (coluna, linha)
+
+# código do produto no vetor de ocupação (-1 = livre)
+PRODUCT_CODES: Dict[str, int] = {"BLUE": 0, "GREEN": 1, "OTHER": 2}
+PRODUCT_NAMES: Dict[int, str] = {v: k for k, v in PRODUCT_CODES.items()}
+EMPTY = -1
+
+
+class OccupancyGrid:
+    """
+    Ocupação do rack em vetores paralelos, indexados por `endereço - 1`
+    (`endereço = coluna + (linha - 1) * colunas`):
+
+    - `product[i]`: código do produto (`PRODUCT_CODES`) ou -1 se livre
+    - `timestamp[i]`: quando a posição foi ocupada
+    - `order_id[i]`: pedido associado
+
+    Índices mantidos a cada `occupy`/`free`:
+
+    - `_free[coluna]`: linhas livres da coluna (próxima livre = menor linha)
+    - `_fifo[(grupo, produto)]`: heap (timestamp, ordem, índice) das posições
+      ocupadas; entradas de posições já liberadas são descartadas ao chegar
+      no topo, então a mais antiga sai em O(log n)
+    - `_lifo[(grupo, produto)]`: o mesmo com a chave negada (a mais nova no topo)
+    - `_count[(grupo, produto)]`: quantidade armazenada
+    - `_column_count[(coluna, produto)]`: quantidade por coluna (ex.: por cliente)
+
+    O grupo de cada coluna (ex.: "storage", "client") vem de `groups`. Não é
+    thread-safe: quem usa (WarehouseExtension) segura o próprio lock.
+    """
+
+    def __init__(self, columns: int, rows: int, groups: Optional[Dict[int, str]] = None):
+        self.columns = columns
+        self.rows = rows
+        self.size = columns * rows
+        self.groups = dict(groups or {})
+
+        self.product = array("b", [EMPTY]) * self.size
+        self.timestamp = array("d", [0.0]) * self.size
+        self.order_id: List[Optional[str]] = [None] * self.size
+
+        self._stamp = array("q", [0]) * self.size  # ordem da ocupação atual (valida entradas do heap)
+        self._seq = itertools.count(1)
+        self._free: Dict[int, set] = {c: set(range(1, rows + 1)) for c in range(1, columns + 1)}
+        self._fifo: Dict[Tuple[str, int], List[Tuple[float, int, int]]] = {}
+        self._lifo: Dict[Tuple[str, int], List[Tuple[float, int, int]]] = {}
+        self._count: Dict[Tuple[str, int], int] = {}
+        self._column_count: Dict[Tuple[int, int], int] = {}
+        self.occupied_count = 0
+
+    # -------- endereços --------
+    def index(self, column: int, row: int) -> int:
+        if not (1 <= column <= self.columns) or not (1 <= row <= self.rows):
+            raise ValueError(f"Posição inválida: coluna={column}, linha={row}")
+        return (row - 1) * self.columns + (column - 1)
+
+    def cell(self, index: int) -> Cell:
+        return (index % self.columns + 1, index // self.columns + 1)
+
+    # -------- consultas O(1) --------
+    def is_occupied(self, column: int, row: int) -> bool:
+        return self.product[self.index(column, row)] != EMPTY
+
+    def product_at(self, column: int, row: int) -> Optional[str]:
+        return PRODUCT_NAMES.get(self.product[self.index(column, row)])
+
+    def position(self, column: int, row: int) -> dict:
+        """Posição no formato antigo do dicionário (`occupied`, `product_type`, `timestamp`, `order_id`)."""
+        i = self.index(column, row)
+        code = self.product[i]
+        return {
+            "occupied": code != EMPTY,
+            "product_type": PRODUCT_NAMES.get(code),
+            "timestamp": self.timestamp[i] if code != EMPTY else None,
+            "order_id": self.order_id[i],
+        }
+
+    def next_free_row(self, column: int) -> Optional[int]:
+        free = self._free[column]
+        return min(free) if free else None
+
+    def count(self, product: str, group: Optional[str] = None) -> int:
+        code = PRODUCT_CODES[product]
+        if group is not None:
+            return self._count.get((group, code), 0)
+        return sum(n for (_, c), n in self._count.items() if c == code)
+
+    def free_count(self, columns: Iterable[int]) -> int:
+        return sum(len(self._free[c]) for c in columns)
+
+    def column_count(self, column: int, product: Optional[str] = None) -> int:
+        if product is not None:
+            return self._column_count.get((column, PRODUCT_CODES[product]), 0)
+        return self.rows - len(self._free[column])
+
+    # -------- consultas por varredura de índice --------
+    def free_cells(self, columns: Iterable[int]) -> List[Cell]:
+        return [(c, r) for c in columns for r in sorted(self._free[c])]
+
+    def cells_with(self, product: str, group: str) -> List[Cell]:
+        """Posições do grupo com o produto, da mais antiga para a mais nova."""
+        code = PRODUCT_CODES[product]
+        heap = self._fifo.get((group, code), [])
+        return [self.cell(i) for _, s, i in sorted(heap) if self._stamp[i] == s]
+
+    def oldest(self, product: str, group: str) -> Optional[Cell]:
+        """Posição mais antiga com o produto no grupo (FIFO), O(log n) amortizado."""
+        return self._top(self._fifo.get((group, PRODUCT_CODES[product])), 1)
+
+    def newest(self, product: str, group: str) -> Optional[Cell]:
+        """Posição mais nova com o produto no grupo (LIFO), O(log n) amortizado."""
+        return self._top(self._lifo.get((group, PRODUCT_CODES[product])), -1)
+
+    def _top(self, heap: Optional[List[Tuple[float, int, int]]], sign: int) -> Optional[Cell]:
+        while heap:
+            _, s, i = heap[0]
+            if self._stamp[i] == s * sign:
+                return self.cell(i)
+            heapq.heappop(heap)  # posição já liberada ou reocupada
+        return None
+
+    def occupied(self) -> List[Tuple[int, int, str, float, Optional[str]]]:
+        """(coluna, linha, produto, timestamp, pedido) de cada posição ocupada, na ordem de ocupação."""
+        idx = sorted((self._stamp[i], i) for i, code in enumerate(self.product) if code != EMPTY)
+        out = []
+        for _, i in idx:
+            col, row = self.cell(i)
+            out.append((col, row, PRODUCT_NAMES[self.product[i]], self.timestamp[i], self.order_id[i]))
+        return out
+
+    # -------- alterações --------
+    def occupy(self, column: int, row: int, product: str, timestamp: float, order_id: Optional[str] = None) -> bool:
+        """False se a posição já estava ocupada."""
+        i = self.index(column, row)
+        if self.product[i] != EMPTY:
+            return False
+        code = PRODUCT_CODES[product]
+        s = next(self._seq)
+        self.product[i] = code
+        self.timestamp[i] = timestamp
+        self.order_id[i] = order_id
+        self._stamp[i] = s
+        self._free[column].discard(row)
+        key = (self.groups.get(column, ""), code)
+        heapq.heappush(self._fifo.setdefault(key, []), (timestamp, s, i))
+        heapq.heappush(self._lifo.setdefault(key, []), (-timestamp, -s, i))
+        self._count[key] = self._count.get(key, 0) + 1
+        self._column_count[(column, code)] = self._column_count.get((column, code), 0) + 1
+        self.occupied_count += 1
+        return True
+
+    def free(self, column: int, row: int) -> bool:
+        """False se a posição já estava livre."""
+        i = self.index(column, row)
+        code = self.product[i]
+        if code == EMPTY:
+            return False
+        key = (self.groups.get(column, ""), code)
+        self._count[key] -= 1
+        self._column_count[(column, code)] -= 1
+        self.occupied_count -= 1
+        self.product[i] = EMPTY
+        self.timestamp[i] = 0.0
+        self.order_id[i] = None
+        self._stamp[i] = 0  # invalida a entrada do heap
+        self._free[column].add(row)
+        for heap, sign in ((self._fifo[key], 1), (self._lifo[key], -1)):
+            if len(heap) > 2 * self._count[key] + 16:
+                # muitas entradas mortas no meio do heap: reconstrói só com as válidas
+                heap[:] = [e for e in heap if self._stamp[e[2]] == e[1] * sign]
+                heapq.heapify(heap)
+        return True
@@ -0,0 +1,148 @@
+# racks.py
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from addresses import Coils, Holding_Registers, Inputs
+from controllers.resources import CRANE
+
+
+def _default_clients() -> Dict[str, int]:
+    return {"rafael_ltda": 1, "maria_sa": 2, "joao_corp": 3, "ana_ind": 4}
+
+
+def _default_stock() -> List[Tuple[int, int, str]]:
+    # caixas já alocadas no cliente 1 e 2 e no estoque do warehouse atual
+    return [(1, 2, "BLUE"), (2, 2, "BLUE"), (9, 1, "BLUE"), (9, 2, "BLUE"), (8, 2, "BLUE"), (9, 4, "BLUE")]
+
+
+@dataclass
+class RackConfig:
+    """
+    Geometria e E/S de um rack com transelevador (AS/RS).
+
+    Endereço de uma posição: `address_offset + coluna + (linha - 1) * columns`
+    (coluna 1 = extrema direita, linha 1 = embaixo). Os padrões são os do
+    warehouse atual: 9×6, clientes nas colunas 1–4, estoque nas 5–9, E/S do
+    estoque no endereço 8 e do cliente no 1.
+
+    Cada rack tem seu próprio `posicao_alvo` (`target_register`), sensor de
+    movimento, garfo, sensores de entrada e recurso exclusivo em
+    `server.resources`; racks diferentes operam em paralelo. Os fins de curso
+    do garfo e da elevação, quando existem, confirmam cada passo do
+    `CraneStepEngine`.
+    """
+
+    name: str = "warehouse"
+    columns: int = 9
+    rows: int = 6
+    address_offset: int = 0
+    client_columns: Dict[str, int] = field(default_factory=_default_clients)
+    storage_columns: List[int] = field(default_factory=lambda: [5, 6, 7, 8, 9])
+
+    # endereços de E/S e estacionamento (no mesmo esquema de posicao_alvo)
+    storage_io: int = 8
+    client_io: int = 1
+    park_store: int = 5
+    park_retrieve: int = 300  # fora do rack (home)
+
+    # E/S Modbus do transelevador
+    target_register: int = Holding_Registers.posicao_alvo
+    moving_coil: int = Coils.sensor_move_warehouse
+    fork_out: int = Inputs.manejador_fora
+    fork_in: int = Inputs.manejador_dentro
+    fork_lift: int = Inputs.manejador_levantar
+
+    # fins de curso do garfo/elevação (None = sem sensor: o passo dura o tempo
+    # nominal abaixo). O mapa de endereços atual não tem nenhum deles.
+    fork_out_limit: Optional[int] = None
+    fork_in_limit: Optional[int] = None
+    fork_middle_limit: Optional[int] = None  # garfo recolhido (centro)
+    lift_up_limit: Optional[int] = None
+    lift_down_limit: Optional[int] = None
+    fork_s: float = 2.0
+    lift_s: float = 2.0
+    retract_s: float = 1.0
+
+    # sensores das entradas do rack (None = entrada inexistente)
+    storage_sensor: Optional[int] = Coils.sensor_storage_warehouse
+    client_sensor: Optional[int] = Coils.sensor_client_warehouse
+
+    resource: str = CRANE
+
+    # carga inicial (coluna, linha, produto) quando não há inventário persistido;
+    # vazia por padrão (só o rack de `default_rack()` vem com as caixas de antes)
+    initial_stock: List[Tuple[int, int, str]] = field(default_factory=list)
+
+    def __post_init__(self):
+        if self.columns < 1 or self.rows < 1:
+            raise ValueError(f"Rack {self.name}: dimensões inválidas {self.columns}x{self.rows}")
+        cols = list(self.storage_columns) + list(self.client_columns.values())
+        bad = [c for c in cols if not 1 <= c <= self.columns]
+        if bad:
+            raise ValueError(f"Rack {self.name}: colunas fora do rack: {bad}")
+        if set(self.storage_columns) & set(self.client_columns.values()):
+            raise ValueError(f"Rack {self.name}: coluna de cliente também marcada como estoque")
+        bad = [(c, r) for c, r, _ in self.initial_stock if not (1 <= c <= self.columns and 1 <= r <= self.rows)]
+        if bad:
+            raise ValueError(f"Rack {self.name}: carga inicial fora do rack: {bad}")
+
+    @property
+    def size(self) -> int:
+        return self.columns * self.rows
+
+    def address(self, column: int, row: int) -> int:
+        if not (1 <= column <= self.columns):
+            raise ValueError(f"Coluna deve estar entre 1 e {self.columns}, recebido: {column}")
+        if not (1 <= row <= self.rows):
+            raise ValueError(f"Linha deve estar entre 1 e {self.rows}, recebido: {row}")
+        return self.address_offset + column + (row - 1) * self.columns
+
+    def cell(self, address: int) -> Optional[Tuple[int, int]]:
+        """(coluna, linha) do endereço, ou None se estiver fora do rack."""
+        i = address - self.address_offset - 1
+        if not 0 <= i < self.size:
+            return None
+        return (i % self.columns + 1, i // self.columns + 1)
+
+    def column_role(self, column: int) -> str:
+        return "storage" if column in self.storage_columns else "client"
+
+    def shared_io(self, other: "RackConfig") -> List[str]:
+        """E/S e recurso que este rack divide com `other` (racks em paralelo não podem dividir nenhum)."""
+        shared = [
+            name
+            for name in ("resource", "target_register", "moving_coil")
+            if getattr(self, name) == getattr(other, name)
+        ]
+        outputs = {self.fork_out, self.fork_in, self.fork_lift}
+        shared += [f"saída {a}" for a in sorted(outputs & {other.fork_out, other.fork_in, other.fork_lift})]
+        sensors = {self.storage_sensor, self.client_sensor} - {None}
+        shared += [f"sensor {a}" for a in sorted(sensors & {other.storage_sensor, other.client_sensor})]
+        return shared
+
+
+def default_rack() -> RackConfig:
+    """O warehouse atual, com a carga inicial de antes (rack criado quando não se passa `racks`)."""
+    return RackConfig(initial_stock=_default_stock())
+
+
+class Rack:
+    """Um rack em operação: configuração, ocupação, fila e passos do transelevador e última posição confirmada."""
+
+    def __init__(self, config: RackConfig, warehouse, jobs=None, steps=None):
+        self.config = config
+        self.name = config.name
+        self.warehouse = warehouse  # WarehouseExtension
+        self.jobs = jobs  # CraneScheduler
+        self.steps = steps  # CraneStepEngine
+        # posição confirmada do transelevador (chegada da última viagem);
+        # None = desconhecida: no início e depois de uma viagem sem confirmação
+        self.crane_address: Optional[int] = None
+
+    @property
+    def crane_origin(self) -> int:
+        """Onde o transelevador está para estimar viagens (desconhecida = estacionamento da guarda)."""
+        return self.config.park_store if self.crane_address is None else self.crane_address
+
+    def __repr__(self) -> str:
+        return f"<Rack {self.name} {self.config.columns}x{self.config.rows}>"
@@ -0,0 +1,288 @@
+# resources.py
+import heapq
+import itertools
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from metrics import Histogram
+
+# recursos físicos de uso exclusivo
+TT1 = "TT1"
+TT2 = "TT2"
+TT3 = "TT3"
+CRANE = "CRANE"
+
+
+class Reservation:
+    """
+    Pedido de uso exclusivo de um recurso: funciona como um future da
+    aquisição (`wait`/`granted`) e como o "crachá" de quem está usando
+    (`release`, ou `with` para liberar no fim do bloco).
+
+    A reserva não pertence a uma thread: quem inicia uma sequência pode
+    liberar o recurso em outra (ex.: a TT1 é pega pelo arrival-worker e
+    liberada pela thread do pós-limite).
+    """
+
+    def __init__(self, manager: "ResourceManager", resource: str, owner: str, priority: int, requested_at: float):
+        self.manager = manager
+        self.resource = resource
+        self.owner = owner
+        self.priority = priority
+        self.requested_at = requested_at
+        self.granted_at: Optional[float] = None
+        self.released_at: Optional[float] = None
+        self.cancelled = False
+        self._event = threading.Event()
+
+    @property
+    def granted(self) -> bool:
+        return self._event.is_set()
+
+    @property
+    def active(self) -> bool:
+        """Concedida e ainda não liberada."""
+        return self.granted and self.released_at is None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Espera a concessão (no relógio do servidor). False em timeout."""
+        return self.manager.clock.wait(self._event, timeout)
+
+    def release(self) -> None:
+        self.manager.release(self)
+
+    def cancel(self) -> None:
+        self.manager.cancel(self)
+
+    def __enter__(self) -> "Reservation":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+    def __repr__(self) -> str:
+        state = "ativa" if self.active else "liberada" if self.released_at else "cancelada" if self.cancelled else "na fila"
+        return f"<Reservation {self.resource} owner={self.owner} {state}>"
+
+
+class _Resource:
+    def __init__(self, name: str):
+        self.name = name
+        self.holder: Optional[Reservation] = None
+        self.queue: List[Tuple[int, int, Reservation]] = []  # heap (-prioridade, ordem, reserva)
+        self.wait = Histogram()  # pedido -> concessão
+        self.hold = Histogram()  # concessão -> liberação
+        self.grants = 0
+        self.timeouts = 0
+
+
+class ResourceManager:
+    """
+    Gerente dos recursos físicos exclusivos (TT1, TT2, TT3 e transelevador).
+
+    Cada recurso tem um dono por vez e uma fila de espera ordenada por
+    prioridade (maior primeiro) e, na mesma prioridade, por ordem de chegada.
+    Quem espera fica bloqueado em um Event (sem polling) até a liberação
+    passar o recurso para o próximo da fila.
+
+    - `request()` devolve a reserva na hora (future); `acquire()` espera com timeout
+    - `try_acquire()` só pega se o recurso estiver livre e sem fila
+    - `status()`/`format_status()` mostram dono, tempo de posse e fila
+    - `contention[(quem_esperou, quem_segurava)]` conta quem bloqueou quem
+    """
+
+    def __init__(self, clock, names: Iterable[str] = (TT1, TT2, TT3, CRANE), verbose: bool = False):
+        self.clock = clock
+        self.verbose = verbose
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._resources: Dict[str, _Resource] = {n: _Resource(n) for n in names}
+        self.contention: Dict[Tuple[str, str], int] = {}
+
+    def add(self, name: str) -> None:
+        """Registra um recurso novo (ex.: o transelevador de outro rack). Já existente: nada muda."""
+        with self._lock:
+            self._resources.setdefault(name, _Resource(name))
+
+    # -------- aquisição --------
+    def request(self, name: str, owner: str, priority: int = 0) -> Reservation:
+        """Entra na fila de `name` e devolve a reserva (já concedida se o recurso estava livre)."""
+        res = self._get(name)
+        r = Reservation(self, name, owner, priority, self.clock.monotonic())
+        with self._lock:
+            if res.holder is None and not res.queue:
+                self._grant(res, r)
+            else:
+                heapq.heappush(res.queue, (-priority, next(self._seq), r))
+                if res.holder is not None:
+                    key = (owner, res.holder.owner)
+                    self.contention[key] = self.contention.get(key, 0) + 1
+                    if self.verbose:
+                        held = r.requested_at - res.holder.granted_at
+                        print(
+                            f"[RES] {name}: {owner} aguardando (com {res.holder.owner} há {held:.1f}s, "
+                            f"{len(res.queue)} na fila)"
+                        )
+        return r
+
+    def acquire(
+        self, name: str, owner: str, timeout: Optional[float] = None, priority: int = 0
+    ) -> Optional[Reservation]:
+        """Espera até ser dono de `name`; None em timeout (o pedido sai da fila)."""
+        r = self.request(name, owner, priority)
+        if r.wait(timeout):
+            return r
+        self.cancel(r)
+        # a concessão pode ter chegado entre o timeout e o cancelamento
+        if r.active:
+            return r
+        with self._lock:
+            self._resources[name].timeouts += 1
+        if self.verbose:
+            print(f"[RES] {name}: {owner} desistiu após {timeout}s")
+        return None
+
+    def try_acquire(self, name: str, owner: str) -> Optional[Reservation]:
+        """Pega `name` só se estiver livre e sem ninguém na fila."""
+        res = self._get(name)
+        with self._lock:
+            if res.holder is not None or res.queue:
+                return None
+            r = Reservation(self, name, owner, 0, self.clock.monotonic())
+            self._grant(res, r)
+            return r
+
+    # -------- liberação --------
+    def release(self, r: Reservation) -> None:
+        """Libera o recurso e concede ao próximo da fila. Liberar duas vezes não tem efeito."""
+        res = self._get(r.resource)
+        with self._lock:
+            if res.holder is not r:
+                self._drop(res, r)
+                return
+            r.released_at = self.clock.monotonic()
+            res.hold.record(r.released_at - r.granted_at)
+            res.holder = None
+            nxt = None
+            while res.queue and nxt is None:
+                _, _, cand = heapq.heappop(res.queue)
+                if not cand.cancelled:
+                    nxt = cand
+            if nxt is not None:
+                self._grant(res, nxt)
+        if self.verbose:
+            print(
+                f"[RES] {r.resource}: {r.owner} liberou após {r.released_at - r.granted_at:.1f}s"
+                + (f" -> {nxt.owner}" if nxt is not None else "")
+            )
+
+    def cancel(self, r: Reservation) -> None:
+        """Tira um pedido da fila (se já foi concedido, equivale a `release`)."""
+        if r.active:
+            self.release(r)
+            return
+        res = self._get(r.resource)
+        with self._lock:
+            self._drop(res, r)
+
+    # -------- consultas --------
+    def holder(self, name: str) -> Optional[Reservation]:
+        return self._get(name).holder
+
+    def busy(self, name: str) -> bool:
+        return self._get(name).holder is not None
+
+    def waiting(self, name: str) -> List[Reservation]:
+        res = self._get(name)
+        with self._lock:
+            return [r for _, _, r in sorted(res.queue) if not r.cancelled]
+
+    def status(self) -> dict:
+        now = self.clock.monotonic()
+        out = {}
+        with self._lock:
+            for name, res in self._resources.items():
+                h = res.holder
+                out[name] = {
+                    "owner": h.owner if h else None,
+                    "held_s": (now - h.granted_at) if h else 0.0,
+                    "waiting": [r.owner for _, _, r in sorted(res.queue) if not r.cancelled],
+                    "grants": res.grants,
+                    "timeouts": res.timeouts,
+                    "wait": res.wait.summary(),
+                    "hold": res.hold.summary(),
+                }
+        return out
+
+    def format_status(self) -> str:
+        lines = ["[RES] recursos:"]
+        for name, s in self.status().items():
+            dono = f"{s['owner']} há {s['held_s']:.1f}s" if s["owner"] else "livre"
+            fila = ", ".join(s["waiting"]) or "-"
+            w = s["wait"]
+            espera = f"espera p50={w['p50']:.2f}s max={w['max']:.2f}s" if w["count"] else "sem espera"
+            lines.append(
+                f"  {name:<6} {dono:<28} fila: {fila:<24} concessões={s['grants']} "
+                f"timeouts={s['timeouts']} {espera}"
+            )
+        for (waiter, holder), n in sorted(self.contention.items(), key=lambda kv: -kv[1]):
+            lines.append(f"  {waiter} esperou por {holder}: {n}x")
+        return "\n".join(lines)
+
+    # -------- internos (com _lock) --------
+    def _get(self, name: str) -> _Resource:
+        try:
+            return self._resources[name]
+        except KeyError:
+            raise ValueError(f"Recurso desconhecido: {name}") from None
+
+    def _grant(self, res: _Resource, r: Reservation) -> None:
+        r.granted_at = self.clock.monotonic()
+        res.holder = r
+        res.grants += 1
+        res.wait.record(r.granted_at - r.requested_at)
+        r._event.set()
+
+    def _drop(self, res: _Resource, r: Reservation) -> None:
+        if r.released_at is None and not r.granted:
+            r.cancelled = True
+            res.queue = [e for e in res.queue if e[2] is not r]
+            heapq.heapify(res.queue)
+
+
+class Signal:
+    """
+    Booleano compartilhado com espera por mudança (sem polling).
+
+    Substitui flags lidas em laço com `sleep`: `wait(valor, timeout)` bloqueia
+    até o valor ser atingido. `bool(sig)` lê o valor atual.
+    """
+
+    def __init__(self, clock, value: bool = False):
+        self.clock = clock
+        self._cond = threading.Condition()
+        self._value = value
+
+    def __bool__(self) -> bool:
+        return self._value
+
+    def set(self, value: bool = True) -> None:
+        with self._cond:
+            self._value = value
+            self._cond.notify_all()
+
+    def clear(self) -> None:
+        self.set(False)
+
+    def wait(self, value: bool = True, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else self.clock.monotonic() + timeout
+        with self._cond:
+            while self._value != value:
+                if deadline is None:
+                    self._cond.wait()
+                    continue
+                remaining = deadline - self.clock.monotonic()
+                if remaining <= 0:
+                    return False
+                self.clock.wait_condition(self._cond, remaining)
+            return True
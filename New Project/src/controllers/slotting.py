@@ -0,0 +1,209 @@
+# slotting.py
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from controllers.lines import WarehouseExtension
+
+Cell = Tuple[int, int]  # (coluna, linha)
+
+PRODUCTS = ("BLUE", "GREEN", "OTHER")
+
+
+class TravelModel:
+    """
+    Tempo de viagem do transelevador entre dois endereços do rack.
+
+    Usa a mesma geometria de `RackConfig.address`
+    (endereço = offset + coluna + (linha - 1) * colunas). Os eixos horizontal e vertical
+    andam juntos, então o tempo é o do eixo mais lento mais a acomodação.
+    Endereços fora do rack (ex.: 300) são a posição de repouso, na coluna 0.
+
+    Args:
+        col_s: Segundos por coluna (horizontal)
+        row_s: Segundos por linha (vertical)
+        settle_s: Acomodação no destino
+        columns: Colunas do rack
+        rows: Linhas do rack
+        offset: Endereço da posição (1, 1) menos 1
+    """
+
+    def __init__(
+        self,
+        col_s: float = 0.5,
+        row_s: float = 0.6,
+        settle_s: float = 0.4,
+        columns: int = 9,
+        rows: int = 6,
+        offset: int = 0,
+    ):
+        self.col_s = col_s
+        self.row_s = row_s
+        self.settle_s = settle_s
+        self.columns = columns
+        self.rows = rows
+        self.offset = offset
+
+    def cell(self, address: int) -> Cell:
+        i = address - self.offset - 1
+        if 0 <= i < self.columns * self.rows:
+            return (i % self.columns + 1, i // self.columns + 1)
+        return (0, 1)
+
+    def address(self, cell: Cell) -> int:
+        column, row = cell
+        return self.offset + column + (row - 1) * self.columns
+
+    def time(self, a: int, b: int) -> float:
+        (c0, r0), (c1, r1) = self.cell(a), self.cell(b)
+        if (c0, r0) == (c1, r1):
+            return 0.0
+        return max(abs(c1 - c0) * self.col_s, abs(r1 - r0) * self.row_s) + self.settle_s
+
+
+class SlotStrategy(ABC):
+    """
+    Escolha de posição do estoque (`WarehouseExtension.slotting`).
+
+    `choose_store` recebe a cor da caixa (None = não sabida);
+    `choose_retrieve` a cor pedida e o endereço onde o transelevador está.
+    Ambos consultam `wh.grid` (com o lock do warehouse adquirido) e devolvem
+    (coluna, linha) ou None.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def choose_store(self, wh: "WarehouseExtension", product: Optional[str]) -> Optional[Cell]:
+        ...
+
+    @abstractmethod
+    def choose_retrieve(self, wh: "WarehouseExtension", product: str, origin: int) -> Optional[Cell]:
+        ...
+
+    @staticmethod
+    def free_cells(wh: "WarehouseExtension") -> List[Cell]:
+        return wh.grid.free_cells(wh.storage_columns)
+
+    @staticmethod
+    def stored_cells(wh: "WarehouseExtension", product: str) -> List[Cell]:
+        """Posições de estoque com o produto, da mais antiga para a mais nova."""
+        return wh.grid.cells_with(product, "storage")
+
+
+class FirstFitStrategy(SlotStrategy):
+    """Comportamento original: primeira posição varrendo as colunas 5→9, de baixo para cima."""
+
+    name = "first_fit"
+
+    def choose_store(self, wh, product):
+        for col in wh.storage_columns:
+            row = wh.grid.next_free_row(col)
+            if row is not None:
+                return (col, row)
+        return None
+
+    def choose_retrieve(self, wh, product, origin):
+        stored = self.stored_cells(wh, product)
+        return min(stored, key=lambda c: (wh.storage_columns.index(c[0]), c[1]), default=None)
+
+
+class FifoStrategy(SlotStrategy):
+    """Guarda como o `FirstFitStrategy`; retira sempre a caixa mais antiga da cor (O(log n))."""
+
+    name = "fifo"
+
+    def choose_store(self, wh, product):
+        return FirstFitStrategy.choose_store(self, wh, product)
+
+    def choose_retrieve(self, wh, product, origin):
+        return wh.grid.oldest(product, "storage")
+
+
+class LifoStrategy(SlotStrategy):
+    """Guarda como o `FirstFitStrategy`; retira sempre a caixa mais nova da cor (O(log n))."""
+
+    name = "lifo"
+
+    def choose_store(self, wh, product):
+        return FirstFitStrategy.choose_store(self, wh, product)
+
+    def choose_retrieve(self, wh, product, origin):
+        return wh.grid.newest(product, "storage")
+
+
+class TravelTimeStrategy(SlotStrategy):
+    """
+    Minimiza o tempo de ciclo esperado do transelevador.
+
+    - Guarda: ponto de E/S → posição + posição → estacionamento (5)
+    - Retirada: posição atual → posição + posição → saída (8); no empate,
+      a caixa mais antiga sai primeiro
+
+    Args:
+        model: TravelModel
+        io_address: Ponto de entrada/saída do estoque
+        park_address: Onde o transelevador estaciona depois de uma guarda
+    """
+
+    name = "travel_time"
+
+    def __init__(self, model: Optional[TravelModel] = None, io_address: int = 8, park_address: int = 5):
+        self.model = model or TravelModel()
+        self.io_address = io_address
+        self.park_address = park_address
+
+    def store_cost(self, cell: Cell) -> float:
+        a = self.model.address(cell)
+        return self.model.time(self.io_address, a) + self.model.time(a, self.park_address)
+
+    def retrieve_cost(self, cell: Cell, origin: int) -> float:
+        a = self.model.address(cell)
+        return self.model.time(origin, a) + self.model.time(a, self.io_address)
+
+    def choose_store(self, wh, product):
+        return min(self.free_cells(wh), key=self.store_cost, default=None)
+
+    def choose_retrieve(self, wh, product, origin):
+        # `stored_cells` vem do mais antigo para o mais novo: no empate, `min` fica com o mais antigo
+        return min(self.stored_cells(wh, product), key=lambda c: round(self.retrieve_cost(c, origin), 6), default=None)
+
+
+class ClassBasedStrategy(TravelTimeStrategy):
+    """
+    Armazenagem por classe (ABC) pela demanda de cada cor.
+
+    As posições de estoque são ordenadas pelo custo de guarda e repartidas em
+    zonas contíguas, uma por cor, com tamanho proporcional à demanda
+    (`wh.demand`, pedidos de retirada por cor, +1 para nenhuma zona ficar
+    vazia). A cor mais pedida fica com as posições mais rápidas. A guarda usa
+    a posição livre mais próxima da zona da cor; com a zona cheia, a mais
+    próxima de qualquer zona. A retirada é a do `TravelTimeStrategy`.
+    """
+
+    name = "class_based"
+
+    def zones(self, wh: "WarehouseExtension") -> Dict[str, List[Cell]]:
+        cells = sorted(
+            ((col, row) for col in wh.storage_columns for row in range(1, wh.grid.rows + 1)),
+            key=self.store_cost,
+        )
+        weight = Counter({p: wh.demand.get(p, 0) + 1 for p in PRODUCTS})
+        total = sum(weight.values())
+        out: Dict[str, List[Cell]] = {}
+        start = 0
+        ranked = [p for p, _ in weight.most_common()]
+        for i, p in enumerate(ranked):
+            n = len(cells) - start if i == len(ranked) - 1 else round(len(cells) * weight[p] / total)
+            out[p] = cells[start:start + n]
+            start += n
+        return out
+
+    def choose_store(self, wh, product):
+        if product is not None:
+            zone = set(self.zones(wh).get(product, ()))
+            in_zone = [c for c in self.free_cells(wh) if c in zone]
+            if in_zone:
+                return min(in_zone, key=self.store_cost)
+        return super().choose_store(wh, product)
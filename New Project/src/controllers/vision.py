@@ -0,0 +1,145 @@
+# vision.py
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from addresses import Coils
+
+# cor -> coil do sensor de visão (ordem = prioridade no desempate da janela cheia)
+VISION_COILS: Dict[str, int] = {
+    "BLUE": Coils.Vision_Blue,
+    "GREEN": Coils.Vision_Green,
+}
+
+
+@dataclass(frozen=True)
+class HalResult:
+    klass: str  # "BLUE" | "GREEN" | "OTHER"
+    early: bool  # decidido pela regra de confiança (False = janela cheia)
+    elapsed: float  # segundos entre a abertura da janela e a decisão
+    samples: Dict[str, int]  # scans com cada cor acesa durante a janela
+    ambiguous: bool = False  # janela cheia sem leitura limpa (as duas cores, ou cor abaixo do debounce)
+
+
+class HalClassifier:
+    """
+    Classificação do HAL a partir das bordas dos sensores de visão.
+
+    O `EventProcessor` entrega cada borda de `Vision_Blue`/`Vision_Green`
+    (`on_edge`, na thread de scan) com o nº do scan. `classify()` abre a
+    janela e decide assim que uma cor fica acesa por `confirm_scans` scans
+    seguidos sem a outra acender; sem decisão antecipada, a janela cheia
+    decide como antes (azul tem prioridade, mínimo de `debounce` scans, senão
+    OTHER).
+
+    Args:
+        server: FactoryModbusEventServer (imagem do scan e relógio)
+        confirm_scans: Amostras consistentes para decidir cedo (0 = só janela cheia)
+        debounce: Mínimo de scans acesos para a cor valer na janela cheia
+    """
+
+    def __init__(self, server, confirm_scans: int = 2, debounce: int = 2, verbose: bool = False):
+        self.server = server
+        self.confirm_scans = confirm_scans
+        self.debounce = debounce
+        self.verbose = verbose
+
+        self._cond = threading.Condition()
+        self._open = False
+        self._since: Dict[str, Optional[int]] = {c: None for c in VISION_COILS}
+        self._high: Dict[str, int] = {c: 0 for c in VISION_COILS}
+
+        self.decisions = 0
+        self.early_decisions = 0
+
+    # -------- thread de scan --------
+    def on_edge(self, klass: str, level: bool) -> None:
+        img = self.server.image
+        seq = img.seq if img is not None else 0
+        with self._cond:
+            if not self._open:
+                return
+            if level:
+                if self._since[klass] is None:
+                    self._since[klass] = seq
+            elif self._since[klass] is not None:
+                self._high[klass] += seq - self._since[klass]
+                self._since[klass] = None
+            self._cond.notify_all()
+
+    # -------- thread do HAL --------
+    def classify(self, window_s: float, debounce: Optional[int] = None) -> HalResult:
+        """Abre a janela de `window_s` segundos e devolve a decisão."""
+        if debounce is None:
+            debounce = self.debounce
+        srv, clock = self.server, self.server.clock
+        img = srv.image
+        seq0 = img.seq if img is not None else 0
+        t0 = clock.monotonic()
+        deadline = t0 + window_s
+
+        with self._cond:
+            self._open = True
+            self._high = {c: 0 for c in VISION_COILS}
+            # o nível atual conta como a primeira amostra
+            self._since = {
+                c: seq0 if srv.get_sensor(coil) else None for c, coil in VISION_COILS.items()
+            }
+            try:
+                while True:
+                    img = srv.image
+                    seq = img.seq if img is not None else seq0
+                    klass = self._confirmed(img, seq)
+                    now = clock.monotonic()
+                    if klass is not None:
+                        return self._result(klass, True, now - t0, seq)
+                    if now >= deadline or srv.machine_state != "running":
+                        return self._result(self._full_window(seq, debounce), False, now - t0, seq, debounce)
+                    # com cor acesa, revalida a cada scan; senão só a borda acorda
+                    wait = deadline - now
+                    if any(s is not None for s in self._since.values()):
+                        wait = min(wait, srv.scan_time)
+                    clock.wait_condition(self._cond, wait)
+            finally:
+                self._open = False
+
+    # -------- regras (com _cond) --------
+    def _confirmed(self, img, seq: int) -> Optional[str]:
+        if self.confirm_scans <= 0 or img is None:
+            return None
+        lit = [c for c, s in self._since.items() if s is not None]
+        if len(lit) != 1:
+            return None  # nenhuma ou as duas cores: espera
+        c = lit[0]
+        # amostras = scans desde a borda de subida, inclusive; a imagem atual
+        # precisa confirmar o nível (a borda deste scan pode não ter chegado)
+        if img.coil(VISION_COILS[c]) and seq - self._since[c] + 1 >= self.confirm_scans:
+            return c
+        return None
+
+    def _full_window(self, seq: int, debounce: int) -> str:
+        for c, since in self._since.items():
+            if since is not None:
+                self._high[c] += seq - since + 1
+        for c in VISION_COILS:
+            if self._high[c] >= debounce:
+                return c
+        return "OTHER"
+
+    def _result(
+        self, klass: str, early: bool, elapsed: float, seq: int, debounce: int = 0
+    ) -> HalResult:
+        samples = dict(self._high)
+        for c, since in self._since.items():
+            if early and since is not None:
+                samples[c] += seq - since + 1
+        lit = [n for n in samples.values() if n]
+        ambiguous = not early and (len(lit) > 1 or any(n < debounce for n in lit))
+        self.decisions += 1
+        if early:
+            self.early_decisions += 1
+        if self.verbose:
+            modo = "antecipada" if early else "janela cheia"
+            extra = " (ambígua)" if ambiguous else ""
+            print(f"[HAL] decisão {modo}{extra}: {klass} em {elapsed * 1e3:.0f} ms {samples}")
+        return HalResult(klass, early, elapsed, samples, ambiguous)
@@ -0,0 +1,205 @@
+# warehouse_map.py
+import threading
+from array import array
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+
+from controllers.occupancy import EMPTY, PRODUCT_NAMES
+
+if TYPE_CHECKING:
+    from controllers.lines import WarehouseExtension
+
+SYMBOLS = {"BLUE": "B", "GREEN": "G", "OTHER": "O"}
+
+MAP_MODES = ("full", "diff", "off")
+
+
+def format_map(wh: "WarehouseExtension", product: array) -> str:
+    """
+    Mapa visual do rack (vista frontal) a partir de uma cópia do vetor de
+    ocupação (`grid.product`):
+
+    - Esquerda do mapa = última coluna (esquerda física)
+    - Direita do mapa = Coluna 1 (direita física)
+    - Topo do mapa = última linha (topo físico)
+    - Base do mapa = Linha 1 (base física)
+    """
+    cfg, grid = wh.rack_config, wh.grid
+    out: List[str] = []
+    out.append("\n" + "=" * 95)
+    out.append(f" WAREHOUSE MAP ({cfg.name}) - VISTA FRONTAL ".center(95, "="))
+    out.append("=" * 95)
+
+    out.append(f"{'Posição':>10} | " + "".join(f" Col {c}  | " for c in range(cfg.columns, 0, -1)))
+
+    header = f"{'':>10} | "
+    for c in range(cfg.columns, 0, -1):
+        if c in wh.storage_columns:
+            header += " (Stor) | "
+        else:
+            client_name = next((name[:6] for name, col in wh.client_columns.items() if col == c), "")
+            header += f" ({client_name:^6}) | "
+    out.append(header)
+    out.append("-" * 95)
+
+    for row in range(cfg.rows, 0, -1):
+        if row == cfg.rows:
+            row_label = f"L{row} (topo)"
+        elif row == 1:
+            row_label = f"L{row} (base)"
+        else:
+            row_label = f"L{row}"
+        line = f"{row_label:>10} | "
+        for col in range(cfg.columns, 0, -1):
+            code = product[grid.index(col, row)]
+            symbol = SYMBOLS.get(PRODUCT_NAMES.get(code), " ") if code != EMPTY else " "
+            line += f"  [{symbol}]   | "
+        out.append(line)
+    out.append("-" * 95)
+
+    out.append("\nLEGENDA:")
+    out.append("  [B] = Produto BLUE  |  [G] = Produto GREEN  |  [O] = Caixote vazio  |  [ ] = Vazio")
+    out.append("\nCLIENTES:")
+    for name, col in sorted(wh.client_columns.items(), key=lambda x: x[1]):
+        out.append(f"  • {name:15} = Coluna {col}")
+    out.append(f"\nSTORAGE: {wh.storage_columns}")
+    out.append("\nORIENTAÇÃO:")
+    out.append("  • Coluna 1 = Extrema DIREITA")
+    out.append(f"  • Coluna {cfg.columns} = Extrema ESQUERDA")
+    out.append("  • Linha 1 = BASE (embaixo)")
+    out.append(f"  • Linha {cfg.rows} = TOPO (em cima)")
+    out.append("=" * 95 + "\n")
+    return "\n".join(out)
+
+
+class WarehouseMapRenderer:
+    """
+    Impressão do mapa do rack fora da thread do transelevador
+    (`WarehouseExtension.map`).
+
+    `request()` só marca o mapa como desatualizado e acorda a thread
+    `map-<rack>`, que copia a ocupação com o lock do warehouse (`version` +
+    vetor `grid.product`), monta o texto e imprime numa única escrita. Vários
+    pedidos dentro de `min_interval_s` viram uma impressão só, e nada é
+    impresso se a ocupação não mudou desde a última.
+
+    Modos:
+        - "full": mapa inteiro (padrão; o texto fica em cache por versão)
+        - "diff": só as posições que mudaram (`+G(6,1)` ocupada, `-B(9,2)`
+          liberada); o mapa inteiro sai na primeira impressão
+        - "off": não imprime
+
+    Args:
+        wh: WarehouseExtension
+        mode: "full" | "diff" | "off"
+        min_interval_s: Intervalo mínimo entre impressões (relógio do warehouse)
+        sink: Função que recebe o texto (padrão: print)
+    """
+
+    def __init__(
+        self,
+        wh: "WarehouseExtension",
+        mode: str = "full",
+        min_interval_s: float = 1.0,
+        sink: Optional[Callable[[str], None]] = None,
+    ):
+        if mode not in MAP_MODES:
+            raise ValueError(f"Modo de mapa inválido: {mode}. Use um de {MAP_MODES}")
+        self.wh = wh
+        self.mode = mode
+        self.min_interval_s = min_interval_s
+        self.sink = sink or print
+
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._dirty = False
+        self._stopping = False
+        self._last_at: Optional[float] = None
+
+        self._cache: Tuple[int, str] = (-1, "")  # (versão, mapa inteiro)
+        self._shown: Optional[Tuple[int, array]] = None  # última ocupação impressa
+        self.renders = 0
+        self.skipped = 0  # pedidos que não geraram impressão (sem mudança)
+
+    # -------- pedidos (qualquer thread, sem I/O) --------
+    def request(self) -> None:
+        if self.mode == "off":
+            return
+        with self._cond:
+            self._dirty = True
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name=f"map-{self.wh.rack_config.name}", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # -------- texto --------
+    def snapshot(self) -> Tuple[int, array]:
+        wh = self.wh
+        with wh._warehouse_lock:
+            return wh.version, array("b", wh.grid.product)
+
+    def full_text(self, snap: Optional[Tuple[int, array]] = None) -> str:
+        """Mapa inteiro da versão atual (ou de `snap`), montado uma vez por versão."""
+        version, product = snap or self.snapshot()
+        cached_version, text = self._cache
+        if cached_version != version:
+            text = format_map(self.wh, product)
+            self._cache = (version, text)
+        return text
+
+    def diff_text(self, old: array, new: array, version: int) -> str:
+        grid = self.wh.grid
+        changes = []
+        for i, (a, b) in enumerate(zip(old, new)):
+            if a == b:
+                continue
+            col, row = grid.cell(i)
+            if a != EMPTY:
+                changes.append(f"-{SYMBOLS[PRODUCT_NAMES[a]]}({col},{row})")
+            if b != EMPTY:
+                changes.append(f"+{SYMBOLS[PRODUCT_NAMES[b]]}({col},{row})")
+        used = sum(1 for c in new if c != EMPTY)
+        return f"[MAP] {self.wh.rack_config.name} v{version}: {' '.join(changes)} | ocupação {used}/{grid.size}"
+
+    def render(self) -> Optional[str]:
+        """Texto a imprimir agora, ou None se nada mudou desde a última impressão."""
+        snap = self.snapshot()
+        version, product = snap
+        if self._shown is not None and self._shown[0] == version:
+            return None
+        if self.mode == "diff" and self._shown is not None:
+            text = self.diff_text(self._shown[1], product, version)
+        else:
+            text = self.full_text(snap)
+        self._shown = snap
+        return text
+
+    # -------- thread --------
+    def _run(self) -> None:
+        clock = self.wh.clock
+        while True:
+            with self._cond:
+                while not self._dirty and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                # limite de taxa: pedidos que chegarem até lá saem na mesma impressão
+                if self._last_at is not None:
+                    deadline = self._last_at + self.min_interval_s
+                    while not self._stopping and clock.monotonic() < deadline:
+                        clock.wait_condition(self._cond, deadline - clock.monotonic())
+                self._dirty = False
+            text = self.render()
+            if text is None:
+                self.skipped += 1
+                continue
+            self.sink(text)
+            self.renders += 1
+            self._last_at = clock.monotonic()
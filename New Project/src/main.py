@@ -54,7 +54,11 @@ def main():
     print_banner()
 
     srv = FactoryModbusEventServer(
-        host="0.0.0.0", port=5020, scan_time=0.05, verbose=False
+        host="0.0.0.0",
+        port=5020,
+        scan_time=0.05,
+        verbose=False,
+        inventory_dir=str(Path(__file__).resolve().parent / "inventory"),
     )
 
     auto = AutoController(srv, verbose=False)
@@ -0,0 +1,172 @@
+import math
+import threading
+from typing import Dict, Optional
+
+
+class Histogram:
+    """
+    Histograma log-linear no estilo HDR para durações.
+
+    Os valores são guardados em µs: abaixo de `2**sub_bits` µs cada valor tem
+    sua própria faixa; acima disso cada potência de 2 é dividida em
+    `2**(sub_bits-1)` faixas, então o erro relativo fica abaixo de
+    `1 / 2**(sub_bits-1)` (~3% com o padrão) em qualquer escala.
+    `record()` é O(1) e a memória só cresce com as faixas usadas.
+    """
+
+    def __init__(self, sub_bits: int = 6):
+        self._bits = sub_bits
+        self._sub = 1 << sub_bits
+        self._half = self._sub >> 1
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts: Dict[int, int] = {}
+            self.count = 0
+            self._total_us = 0
+            self._min_us: Optional[int] = None
+            self._max_us = 0
+
+    # -------- faixas --------
+    def _index(self, v: int) -> int:
+        if v < self._sub:
+            return v
+        shift = v.bit_length() - self._bits
+        return shift * self._half + (v >> shift)
+
+    def _upper(self, idx: int) -> int:
+        """Maior valor (µs) que cai na faixa `idx`."""
+        if idx < self._sub:
+            return idx
+        shift = idx // self._half - 1
+        m = idx - shift * self._half
+        return ((m + 1) << shift) - 1
+
+    # -------- API --------
+    def record(self, seconds: float) -> None:
+        v = max(0, int(seconds * 1e6))
+        idx = self._index(v)
+        with self._lock:
+            self._counts[idx] = self._counts.get(idx, 0) + 1
+            self.count += 1
+            self._total_us += v
+            if self._min_us is None or v < self._min_us:
+                self._min_us = v
+            if v > self._max_us:
+                self._max_us = v
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Valor (s) abaixo do qual estão `q`% das amostras (None se vazio)."""
+        with self._lock:
+            if not self.count:
+                return None
+            target = max(1, math.ceil(q / 100.0 * self.count))
+            seen = 0
+            for idx in sorted(self._counts):
+                seen += self._counts[idx]
+                if seen >= target:
+                    return min(self._upper(idx), self._max_us) / 1e6
+            return self._max_us / 1e6
+
+    def fraction_below(self, seconds: float) -> Optional[float]:
+        """Fração das amostras <= `seconds` (na resolução das faixas)."""
+        limit = int(seconds * 1e6)
+        with self._lock:
+            if not self.count:
+                return None
+            ok = sum(n for idx, n in self._counts.items() if self._upper(idx) <= limit)
+            return ok / self.count
+
+    def summary(self) -> dict:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "min": self._min_us / 1e6,
+            "mean": self._total_us / self.count / 1e6,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "p999": self.percentile(99.9),
+            "max": self._max_us / 1e6,
+        }
+
+
+class ScanMetrics:
+    """
+    Métricas do loop de scan do servidor (`server.metrics`):
+
+    - `scan_duration`: tempo de trabalho de cada scan
+    - `period_jitter`: atraso do início do scan em relação ao prazo agendado
+    - `overruns`: scans que terminaram depois do prazo do próximo
+    - `edge_latency[nome]`: da leitura do scan até o início do handler da borda
+    """
+
+    def __init__(self, scan_time: float):
+        self.scan_time = scan_time
+        self.scan_duration = Histogram()
+        self.period_jitter = Histogram()
+        self.edge_latency: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+        self.scans = 0
+        self.overruns = 0
+
+    def record_scan(self, duration: float, jitter: float, overrun: bool) -> None:
+        self.scan_duration.record(duration)
+        self.period_jitter.record(jitter)
+        self.scans += 1
+        if overrun:
+            self.overruns += 1
+
+    def record_edge(self, name: str, latency: float) -> None:
+        h = self.edge_latency.get(name)
+        if h is None:
+            with self._lock:
+                h = self.edge_latency.setdefault(name, Histogram())
+        h.record(latency)
+
+    def reset(self) -> None:
+        self.scan_duration.reset()
+        self.period_jitter.reset()
+        with self._lock:
+            self.edge_latency = {}
+        self.scans = 0
+        self.overruns = 0
+
+    def summary(self) -> dict:
+        edges = {}
+        for name, h in sorted(self.edge_latency.items()):
+            s = h.summary()
+            s["within_period"] = h.fraction_below(self.scan_time)
+            edges[name] = s
+        return {
+            "scan_time": self.scan_time,
+            "scans": self.scans,
+            "overruns": self.overruns,
+            "scan_duration": self.scan_duration.summary(),
+            "period_jitter": self.period_jitter.summary(),
+            "edge_latency": edges,
+        }
+
+    def format_summary(self) -> str:
+        def _ms(v: Optional[float]) -> str:
+            return "-" if v is None else f"{v * 1e3:.2f}"
+
+        s = self.summary()
+        lines = [
+            f"[METRICS] scans={s['scans']} overruns={s['overruns']} (scan_time={self.scan_time * 1e3:.0f} ms)"
+        ]
+        for label in ("scan_duration", "period_jitter"):
+            h = s[label]
+            lines.append(
+                f"  {label:<14} p50={_ms(h.get('p50'))} p99={_ms(h.get('p99'))} max={_ms(h.get('max'))} ms"
+            )
+        for name, h in s["edge_latency"].items():
+            within = h["within_period"]
+            lines.append(
+                f"  {name:<32} n={h['count']:<5} p50={_ms(h['p50'])} p99={_ms(h['p99'])} "
+                f"max={_ms(h['max'])} ms  <=1 período: {within:.1%}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,420 @@
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from scan import ScanImage
+
+# Formato (little-endian):
+#   cabeçalho: MAGIC, versão, t0 (double), nº de coils, DIs, input regs, holding regs
+#   registro:  varint Δt (µs desde o registro anterior) | flags (1 byte)
+#              [coils]  varint nbytes + XOR com o scan anterior
+#              [dis]    varint nbytes + XOR com o scan anterior
+#              [regs]   varint n + n × (varint índice, varint valor)
+#   Registros com FLAG_KEY são deltas contra zero (quadro completo): todo
+#   arquivo novo começa com um, e a cada `keyframe_every` registros.
+MAGIC = b"MBTR"
+VERSION = 1
+_HEADER = struct.Struct("<4sBdHHHH")
+
+FLAG_COILS = 0x01
+FLAG_DIS = 0x02
+FLAG_REGS = 0x04
+FLAG_KEY = 0x08
+
+
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+class _Truncated(Exception):
+    """Registro cortado no fim do arquivo (gravação interrompida antes do flush)."""
+
+
+def _read_varint(buf: bytes, i: int) -> Tuple[int, int]:
+    n = shift = 0
+    while True:
+        if i >= len(buf):
+            raise _Truncated
+        b = buf[i]
+        i += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, i
+        shift += 7
+
+
+def _read_bytes(buf: bytes, i: int) -> Tuple[int, int]:
+    n, i = _read_varint(buf, i)
+    if i + n > len(buf):
+        raise _Truncated
+    return int.from_bytes(buf[i : i + n], "little"), i + n
+
+
+def _word_bytes(word: int) -> bytes:
+    raw = word.to_bytes((word.bit_length() + 7) // 8, "little")
+    return _varint(len(raw)) + raw
+
+
+@dataclass(frozen=True)
+class TraceFrame:
+    """Um scan gravado: coils, DIs e registradores já reconstruídos."""
+
+    timestamp: float  # monotônico, mesmo relógio do servidor
+    coils: int  # bit i = coil i
+    dis: int  # bit i = discrete input i
+    input_registers: Tuple[int, ...]
+    holding_registers: Tuple[int, ...]
+
+    def coil(self, addr: int) -> bool:
+        return bool(self.coils >> addr & 1)
+
+    def di(self, addr: int) -> bool:
+        return bool(self.dis >> addr & 1)
+
+
+class TraceRecorder:
+    """
+    Gravador de scans em arquivo binário rotativo.
+
+    O servidor chama `record()` uma vez por scan (na thread de scan). Cada
+    registro guarda só o que mudou desde o scan anterior (XOR das coils/DIs
+    empacotadas e registradores alterados), então um scan sem mudanças custa
+    2 bytes. Ao passar de `max_bytes` o arquivo gira como no
+    `logging.handlers.RotatingFileHandler` (`trace.bin` → `trace.bin.1` …).
+
+    O arquivo vai para o disco a cada `flush_interval_s` (tempo gravado) ou
+    `flush_every` registros, o que vier primeiro: se o processo morrer, perde
+    no máximo esse trecho, e `read_trace` para no último registro completo.
+
+    Args:
+        path: Arquivo de saída
+        max_bytes: Tamanho máximo de cada arquivo
+        backup_count: Quantos arquivos antigos manter
+        keyframe_every: Intervalo (em registros) entre quadros completos
+        flush_interval_s: Intervalo máximo (s) entre flushes do arquivo
+        flush_every: Nº máximo de registros entre flushes do arquivo
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 16 * 1024 * 1024,
+        backup_count: int = 5,
+        keyframe_every: int = 1000,
+        flush_interval_s: float = 1.0,
+        flush_every: int = 1000,
+        n_coils: int = 120,
+        n_dis: int = 128,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.keyframe_every = keyframe_every
+        self.flush_interval_s = flush_interval_s
+        self.flush_every = flush_every
+        self.n_coils = n_coils
+        self.n_dis = n_dis
+
+        self._lock = threading.Lock()
+        self._f: Optional[BinaryIO] = None
+        self._size = 0
+        self._since_key = 0
+        self._last_ts = 0.0
+        self._last_flush = 0.0
+        self._unflushed = 0
+        self._prev_coils = 0
+        self._prev_dis = 0
+        self._prev_regs: Tuple[int, ...] = ()
+        self._n_ir = self._n_hr = 0
+
+        self.records = 0
+        self.rotations = 0
+
+    # -------- gravação --------
+    def record(self, img: ScanImage, dis: int) -> None:
+        """Grava um scan (`dis` = discrete inputs empacotados)."""
+        with self._lock:
+            if self._f is None:
+                self._open(img)
+            key = self._since_key >= self.keyframe_every
+            if key:
+                self._prev_coils = self._prev_dis = 0
+                self._prev_regs = (0,) * (self._n_ir + self._n_hr)
+                self._since_key = 0
+
+            dt_us = max(0, int(round((img.timestamp - self._last_ts) * 1e6)))
+            self._last_ts = img.timestamp
+            flags = FLAG_KEY if key else 0
+            body = []
+
+            x = img.word ^ self._prev_coils
+            if x:
+                flags |= FLAG_COILS
+                body.append(_word_bytes(x))
+                self._prev_coils = img.word
+            x = dis ^ self._prev_dis
+            if x:
+                flags |= FLAG_DIS
+                body.append(_word_bytes(x))
+                self._prev_dis = dis
+            regs = img.input_registers + img.holding_registers
+            if regs != self._prev_regs:
+                changed = [
+                    (i, v)
+                    for i, (v, p) in enumerate(zip(regs, self._prev_regs))
+                    if v != p
+                ]
+                if changed:
+                    flags |= FLAG_REGS
+                    body.append(_varint(len(changed)))
+                    body.extend(_varint(i) + _varint(v) for i, v in changed)
+                self._prev_regs = regs
+
+            rec = _varint(dt_us) + bytes((flags,)) + b"".join(body)
+            self._f.write(rec)
+            self._size += len(rec)
+            self._since_key += 1
+            self.records += 1
+            self._unflushed += 1
+            if self._size >= self.max_bytes:
+                self._rotate(img)
+            elif (
+                self._unflushed >= self.flush_every
+                or img.timestamp - self._last_flush >= self.flush_interval_s
+            ):
+                self._flush(img.timestamp)
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._f is not None:
+                self._flush(self._last_ts)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._f is not None:
+                self._f.close()
+                self._f = None
+
+    # -------- internos --------
+    def _flush(self, timestamp: float) -> None:
+        self._f.flush()
+        self._last_flush = timestamp
+        self._unflushed = 0
+
+    def _open(self, img: ScanImage) -> None:
+        self._n_ir = len(img.input_registers)
+        self._n_hr = len(img.holding_registers)
+        self._f = open(self.path, "wb", buffering=64 * 1024)
+        self._f.write(
+            _HEADER.pack(
+                MAGIC, VERSION, img.timestamp, self.n_coils, self.n_dis, self._n_ir, self._n_hr
+            )
+        )
+        self._size = _HEADER.size
+        self._last_ts = img.timestamp
+        self._last_flush = img.timestamp
+        self._unflushed = 0
+        # primeiro registro de cada arquivo é um quadro completo
+        self._since_key = self.keyframe_every
+
+    def _rotate(self, img: ScanImage) -> None:
+        self._f.close()
+        self._f = None
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                src = f"{self.path}.{i}"
+                if os.path.exists(src):
+                    os.replace(src, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        self.rotations += 1
+        self._open(img)
+
+
+# -------- leitura --------
+def trace_files(path: str) -> List[str]:
+    """Arquivos de uma gravação rotativa, do mais antigo para o mais novo."""
+    files = []
+    i = 1
+    while os.path.exists(f"{path}.{i}"):
+        files.append(f"{path}.{i}")
+        i += 1
+    files.reverse()
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def read_trace(path: str, rotated: bool = True) -> Iterator[TraceFrame]:
+    """
+    Reconstrói os scans gravados (incluindo os arquivos girados, se `rotated`).
+
+    Um registro incompleto no fim do arquivo (processo morto entre dois
+    flushes) encerra a leitura daquele arquivo sem erro.
+    """
+    for fname in trace_files(path) if rotated else [path]:
+        with open(fname, "rb") as f:
+            buf = f.read()
+        if len(buf) < _HEADER.size:
+            continue  # nem o cabeçalho chegou ao disco
+        magic, version, t0, _, _, n_ir, n_hr = _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Arquivo de trace inválido: {fname}")
+
+        i = _HEADER.size
+        ts, coils, dis = t0, 0, 0
+        regs = [0] * (n_ir + n_hr)
+        while i < len(buf):
+            try:
+                dt_us, i = _read_varint(buf, i)
+                if i >= len(buf):
+                    raise _Truncated
+                flags = buf[i]
+                i += 1
+                if flags & FLAG_KEY:
+                    coils = dis = 0
+                    regs = [0] * (n_ir + n_hr)
+                if flags & FLAG_COILS:
+                    x, i = _read_bytes(buf, i)
+                    coils ^= x
+                if flags & FLAG_DIS:
+                    x, i = _read_bytes(buf, i)
+                    dis ^= x
+                if flags & FLAG_REGS:
+                    count, i = _read_varint(buf, i)
+                    for _ in range(count):
+                        idx, i = _read_varint(buf, i)
+                        regs[idx], i = _read_varint(buf, i)
+            except _Truncated:
+                break  # registro parcial no fim: o resto não chegou ao disco
+            ts += dt_us / 1e6
+            yield TraceFrame(ts, coils, dis, tuple(regs[:n_ir]), tuple(regs[n_ir:]))
+
+
+def trace_coil_count(path: str) -> int:
+    """Nº de coils lidas por scan na gravação (do cabeçalho)."""
+    with open(trace_files(path)[0], "rb") as f:
+        return _HEADER.unpack(f.read(_HEADER.size))[3]
+
+
+# -------- replay --------
+@dataclass
+class ReplayStats:
+    frames: int
+    coil_changes: int  # scans com alguma coil diferente do anterior
+    trace_s: float  # duração gravada
+    wall_s: float  # duração do replay
+
+    @property
+    def speedup(self) -> float:
+        return self.trace_s / self.wall_s if self.wall_s > 0 else float("inf")
+
+
+class TraceReplayer:
+    """
+    Reproduz uma gravação no `EventProcessor` de um servidor.
+
+    O replay faz o papel do loop de scan, numa thread própria (`trace-replay`):
+    publica cada quadro como `ScanImage` (para `get_sensor`/`wait_for`), chama
+    `events.handle_scan` e encerra o scan gravando (servidor iniciado) ou
+    descartando (sem servidor Modbus) as saídas. O loop de scan do servidor
+    não pode estar rodando.
+
+    Entre quadros o replay dorme o Δt gravado no relógio do servidor, o mesmo
+    dos handlers: cada handler vê as bordas no ritmo da gravação. Para
+    acelerar, crie o servidor com `SimClock(speed=k)`; o modo passo-a-passo
+    (`speed=None`) não serve, porque ninguém avançaria o tempo dos handlers.
+
+    Args:
+        server: FactoryModbusEventServer (não iniciado, ou parado)
+    """
+
+    def __init__(self, server, verbose: bool = False):
+        if server.clock.speed is None:
+            raise ValueError("Replay precisa de um relógio que ande sozinho (SimClock com speed).")
+        self.server = server
+        self.verbose = verbose
+
+    def run(self, path: str, limit: Optional[int] = None) -> ReplayStats:
+        srv = self.server
+        if srv._event_thread is not None and srv._event_thread.is_alive():
+            raise RuntimeError("Pare o loop de scan do servidor antes do replay.")
+
+        n_coils = trace_coil_count(path)
+        srv.stop_event.clear()
+        srv.events.dispatcher.start()
+        result: list = []
+        th = threading.Thread(
+            target=self._loop, args=(path, limit, n_coils, result), name="trace-replay", daemon=True
+        )
+        # o replay é a "thread de scan" enquanto roda: quem chamou e os
+        # handlers (inclusive os de key=None) podem usar wait_for
+        srv._event_thread = th
+        wall0 = time.monotonic()
+        try:
+            th.start()
+            th.join()
+        finally:
+            srv._event_thread = None
+        if isinstance(result[0], BaseException):
+            raise result[0]
+        frames, changes, trace_s = result[0]
+
+        stats = ReplayStats(
+            frames=frames,
+            coil_changes=changes,
+            trace_s=trace_s,
+            wall_s=time.monotonic() - wall0,
+        )
+        if self.verbose:
+            print(
+                f"[REPLAY] {stats.frames} scans ({stats.coil_changes} com mudança) "
+                f"em {stats.wall_s:.2f}s — {stats.speedup:.0f}x o tempo real"
+            )
+        return stats
+
+    def _loop(self, path: str, limit: Optional[int], n_coils: int, result: list) -> None:
+        srv = self.server
+        frames = changes = 0
+        first_ts = last_ts = None
+        prev_word = None
+        try:
+            for frame in read_trace(path):
+                if limit is not None and frames >= limit:
+                    break
+                if last_ts is not None:
+                    srv.clock.sleep(frame.timestamp - last_ts)
+                if first_ts is None:
+                    first_ts = frame.timestamp
+                last_ts = frame.timestamp
+
+                img = ScanImage(
+                    seq=frames + 1,
+                    timestamp=frame.timestamp,
+                    coils=tuple(frame.coils >> a & 1 for a in range(n_coils)),
+                    word=frame.coils,
+                    input_registers=frame.input_registers,
+                    holding_registers=frame.holding_registers,
+                )
+                srv._publish_scan(img)
+                srv.events.handle_scan(img.coils, img.word)
+                if srv._server is not None:
+                    srv.flush_outputs()
+                else:
+                    srv._outputs.take()
+
+                if prev_word is not None and frame.coils != prev_word:
+                    changes += 1
+                prev_word = frame.coils
+                frames += 1
+        except BaseException as e:
+            result.append(e)
+            return
+        result.append((frames, changes, (last_ts - first_ts) if frames else 0.0))
@@ -0,0 +1,91 @@
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from utils import pack_bits
+
+
+@dataclass(frozen=True)
+class ScanImage:
+    """
+    Imagem imutável de um scan, publicada uma vez por ciclo pelo servidor.
+
+    Leitores de qualquer thread pegam a referência atual (`server.image`) sem
+    lock: todas as leituras feitas na mesma imagem enxergam o mesmo scan.
+    """
+
+    seq: int  # nº sequencial do scan (começa em 1)
+    timestamp: float  # instante da leitura (monotônico)
+    coils: Tuple[int, ...]
+    word: int  # coils empacotadas (bit i = coil i)
+    input_registers: Tuple[int, ...] = ()
+    holding_registers: Tuple[int, ...] = ()
+
+    def coil(self, addr: int) -> bool:
+        return bool(self.word >> addr & 1)
+
+
+class OutputBuffer:
+    """
+    Buffer write-behind das saídas (discrete inputs lidos pelo Factory IO).
+
+    Mantém uma cópia (`shadow`) do último valor de cada DI; as escritas ficam
+    pendentes até `take()`, que junta os endereços alterados em faixas
+    contíguas (preenchendo os buracos com o valor do shadow) para que cada
+    faixa vire uma única chamada `set_discrete_inputs`.
+    """
+
+    def __init__(self, size: int = 128, max_gap: Optional[int] = None):
+        self.size = size
+        # buracos maiores que max_gap quebram a faixa (None = sempre uma faixa só)
+        self.max_gap = max_gap
+        self._lock = threading.Lock()
+        self._shadow: List[int] = [0] * size
+        self._dirty: Set[int] = set()
+
+    def load(self, values: Sequence[int]) -> None:
+        """Sincroniza o shadow com o banco, sem sobrescrever escritas pendentes."""
+        with self._lock:
+            for addr, v in enumerate(values[: self.size]):
+                if addr not in self._dirty:
+                    self._shadow[addr] = 1 if v else 0
+
+    def set(self, values: Dict[int, bool]) -> None:
+        with self._lock:
+            for addr, v in values.items():
+                if not (0 <= addr < self.size):
+                    raise ValueError(f"Endereço de saída inválido: {addr}")
+                v = 1 if v else 0
+                if self._shadow[addr] != v or addr in self._dirty:
+                    self._shadow[addr] = v
+                    self._dirty.add(addr)
+
+    def get(self, addr: int) -> bool:
+        """Valor mais recente (pendente ou já escrito) da saída."""
+        return bool(self._shadow[addr])
+
+    def word(self) -> int:
+        """Shadow empacotado (bit i = DI i)."""
+        return pack_bits(self._shadow)
+
+    @property
+    def pending(self) -> int:
+        return len(self._dirty)
+
+    def take(self) -> List[Tuple[int, List[int]]]:
+        """Retira as escritas pendentes como [(endereço_inicial, valores), ...]."""
+        with self._lock:
+            if not self._dirty:
+                return []
+            addrs = sorted(self._dirty)
+            self._dirty.clear()
+
+            ranges = []
+            start = end = addrs[0]
+            for a in addrs[1:]:
+                if self.max_gap is not None and a - end - 1 > self.max_gap:
+                    ranges.append((start, self._shadow[start : end + 1]))
+                    start = a
+                end = a
+            ranges.append((start, self._shadow[start : end + 1]))
+            return ranges
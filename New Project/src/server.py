@@ -1,11 +1,18 @@
 import inspect
-import time
 import threading
 from datetime import datetime
-from typing import Optional, List
+from typing import Callable, Dict, Iterable, Optional, List
 from pyModbusTCP.server import ModbusServer
 
-from utils import Stoppable, now
+from utils import Stoppable, now, pack_bits
+from scan import ScanImage, OutputBuffer
+from clock import Clock, RealClock
+from recorder import TraceRecorder
+from metrics import ScanMetrics
+from services.inventory import InventoryService
+from services.tracking import BoxTracker
+from controllers.resources import ResourceManager
+from controllers.racks import RackConfig
 from addresses import Inputs, Coils, Esteiras
 from controllers.lines import LineController
 from controllers.events import EventProcessor
@@ -19,17 +26,52 @@ class FactoryModbusEventServer(Stoppable):
         port: int = 5020,
         scan_time: float = 0.05,
         verbose: bool = True,
+        image_registers: int = 8,
+        clock: Optional[Clock] = None,
+        recorder: Optional[TraceRecorder] = None,
+        metrics_summary_s: Optional[float] = None,
+        racks: Optional[List[RackConfig]] = None,
+        inventory_dir: Optional[str] = None,
     ):
         super().__init__()
+        # todo sleep/timeout/timestamp dos controladores passa por aqui
+        self.clock = clock or RealClock()
         self.host = host
         self.port = port
         self.scan_time = scan_time
         self.verbose = verbose
+        # quantos input/holding registers (a partir do 0) entram na imagem do scan
+        self.image_registers = image_registers
 
         self._server: Optional[ModbusServer] = None
         self._event_thread: Optional[threading.Thread] = None
         self._lock = threading.Lock()
 
+        # Espera sincronizada com o scan: o loop notifica `_coil_cond` quando
+        # muda alguma coil que tenha alguém esperando (`_wait_mask`)
+        self._coil_cond = threading.Condition()
+        self._image: Optional[ScanImage] = None  # último scan publicado
+        # registradores escritos por este processo -> seq da imagem na escrita;
+        # até a imagem seq+2 (lida toda depois da escrita) a leitura vai ao banco
+        self._written_ir: Dict[int, int] = {}
+        self._written_hr: Dict[int, int] = {}
+
+        # Saídas (discrete inputs): escritas acumuladas e gravadas uma vez por scan
+        self._outputs = OutputBuffer(size=128)
+        self._flush_lock = threading.Lock()
+        self.output_flushes = 0  # nº de chamadas set_discrete_inputs feitas
+        self._wait_counts: Dict[int, int] = {}
+        self._wait_mask = 0
+
+        # gravação opcional de cada scan (coils, DIs e registradores)
+        self.recorder = recorder
+
+        # latência/jitter do scan e das bordas; resumo impresso a cada
+        # `metrics_summary_s` segundos (None = só via `metrics.summary()`)
+        self.metrics = ScanMetrics(scan_time)
+        self.metrics_summary_s = metrics_summary_s
+        self._metrics_thread: Optional[threading.Thread] = None
+
         # Estado de máquina
         self.machine_state = "emergency"
         self.sequence_step = "idle"
@@ -38,8 +80,17 @@ class FactoryModbusEventServer(Stoppable):
         self.turntable_state1 = False
         self.turntable_state2 = False
 
+        # posição de cada caixa na planta (alimentado pelas bordas do EventProcessor)
+        self.tracker = BoxTracker(self.clock, verbose=verbose)
+
+        # posse exclusiva de TT1/TT2/TT3/transelevador, com fila de espera
+        self.resources = ResourceManager(self.clock, verbose=verbose)
+
         # Controladores
-        self.lines = LineController(self, verbose=verbose)
+        # `inventory_dir`: ocupação dos racks persistida entre execuções (None = só em memória)
+        self.lines = LineController(self, verbose=verbose, racks=racks, inventory_dir=inventory_dir)
+        # consultas de estoque (contadores, FIFO/LIFO, snapshot para IHM)
+        self.inventory = InventoryService(self.lines, verbose=verbose)
         self.auto = AutoController(self, verbose=verbose)
         self.events = EventProcessor(self, self.lines, verbose=verbose)
 
@@ -49,24 +100,44 @@ class FactoryModbusEventServer(Stoppable):
             return
         self._server = ModbusServer(host=self.host, port=self.port, no_block=True)
         self._server.start()
+        self._outputs.load(self._server.data_bank.get_discrete_inputs(0, 128) or [])
 
         self.stop_event.clear()
+        self.events.dispatcher.start()
         self._event_thread = threading.Thread(
             target=self._event_loop, name="modbus-event-loop", daemon=True
         )
         self._event_thread.start()
+        if self.metrics_summary_s:
+            self._metrics_thread = threading.Thread(
+                target=self._metrics_loop, name="scan-metrics", daemon=True
+            )
+            self._metrics_thread.start()
 
         if self.verbose:
             print(f"\n[{now()}] Servidor Modbus em {self.host}:{self.port}")
 
     def stop(self) -> None:
         self.stop_event.set()
+        if self._server:
+            self.flush_outputs()
+        with self._coil_cond:
+            self._coil_cond.notify_all()  # acorda quem estiver em wait_for
         if self._event_thread and self._event_thread.is_alive():
             self._event_thread.join(timeout=2.0)
+        self.events.dispatcher.stop(timeout=2.0)
         self.auto.join(timeout=2.0)
+        if self.recorder is not None:
+            self.recorder.flush()
+        for rack in self.lines.racks.values():
+            # a fila do transelevador não roda mais tarefas depois do banco parar
+            rack.jobs.stop()
+            rack.warehouse.map.stop()
+            rack.warehouse.checkpoint()
         if self._server:
             self._server.stop()
             self._server = None
+        self._image = None
         if self.verbose:
             print("Servidor parado.")
 
@@ -78,7 +149,9 @@ class FactoryModbusEventServer(Stoppable):
     
     # ------------ to registers
 
-    def read_input_register(self, address: int, count: int = 1) -> List[int]:
+    def read_input_register(
+        self, address: int, count: int = 1, fresh: bool = False
+    ) -> List[int]:
         """
         Lê Input Register(s) do banco de dados Modbus.
         
@@ -88,6 +161,7 @@ class FactoryModbusEventServer(Stoppable):
         Args:
             address: Endereço inicial do Input Register (0-65535)
             count: Número de registradores a ler (padrão: 1)
+            fresh: Lê direto do banco em vez da imagem do último scan
         
         Returns:
             Lista de valores inteiros (16-bit unsigned) lidos
@@ -106,6 +180,15 @@ class FactoryModbusEventServer(Stoppable):
         if address < 0 or address > 65535:
             raise ValueError(f"Endereço inválido: {address}")
         
+        img = self._image
+        if (
+            not fresh
+            and img is not None
+            and address + count <= len(img.input_registers)
+            and not self._stale(img, self._written_ir, address, count)
+        ):
+            return list(img.input_registers[address : address + count])
+
         db = self._db()
         values = db.get_input_registers(address, count)
         
@@ -142,8 +225,11 @@ class FactoryModbusEventServer(Stoppable):
         db = self._db()
         with self._lock:
             db.set_input_registers(address, [value])
+            self._mark_written(self._written_ir, address)
 
-    def read_holding_register(self, address: int, count: int = 1) -> List[int]:
+    def read_holding_register(
+        self, address: int, count: int = 1, fresh: bool = False
+    ) -> List[int]:
         """
         Lê Holding Register(s) do banco de dados Modbus (função 03).
         
@@ -152,6 +238,7 @@ class FactoryModbusEventServer(Stoppable):
         Args:
             address: Endereço inicial do Holding Register (0-65535)
             count: Número de registradores a ler (padrão: 1)
+            fresh: Lê direto do banco em vez da imagem do último scan
         
         Returns:
             Lista de valores inteiros (16-bit unsigned) lidos
@@ -170,6 +257,15 @@ class FactoryModbusEventServer(Stoppable):
         if address < 0 or address > 65535:
             raise ValueError(f"Endereço inválido: {address}")
         
+        img = self._image
+        if (
+            not fresh
+            and img is not None
+            and address + count <= len(img.holding_registers)
+            and not self._stale(img, self._written_hr, address, count)
+        ):
+            return list(img.holding_registers[address : address + count])
+
         db = self._db()
         values = db.get_holding_registers(address, count)
         
@@ -205,25 +301,100 @@ class FactoryModbusEventServer(Stoppable):
         db = self._db()
         with self._lock:
             db.set_holding_registers(address, [value])
+            self._mark_written(self._written_hr, address)
+
+    def _mark_written(self, written: Dict[int, int], address: int) -> None:
+        if address < self.image_registers:
+            img = self._image
+            written[address] = img.seq if img is not None else 0
+
+    def _prune_written(self, img: ScanImage) -> None:
+        """Esquece as escritas que a imagem `img` já contém (volta ao caminho rápido)."""
+        with self._lock:
+            for written in (self._written_ir, self._written_hr):
+                for a in [a for a, seq in written.items() if img.seq >= seq + 2]:
+                    del written[a]
+
+    @staticmethod
+    def _stale(img: ScanImage, written: Dict[int, int], address: int, count: int) -> bool:
+        """
+        A imagem pode não ter a última escrita de algum registrador da faixa:
+        o scan `seq+1` pode ter lido o banco antes dela; o `seq+2` já começou
+        depois (leitura do próprio processo enxerga a própria escrita).
+        """
+        if not written:
+            return False
+        for a in range(address, address + count):
+            seq = written.get(a)
+            if seq is not None and img.seq < seq + 2:
+                return True
+        return False
 
     # ------------ to digital inputs and ouputs
     
-    def get_sensor(self, sensor_address: int) -> bool:
+    @property
+    def image(self) -> Optional[ScanImage]:
+        """Imagem imutável do último scan (None antes do primeiro)."""
+        return self._image
+
+    def get_sensor(self, sensor_address: int, fresh: bool = False) -> bool:
+        """
+        Lê a coil na imagem do último scan (sem lock).
+        `fresh=True` lê direto do banco, para os raros casos que não podem
+        esperar o próximo scan.
+        """
+        img = self._image
+        if not fresh and img is not None and sensor_address < len(img.coils):
+            return bool(img.coils[sensor_address])
         db = self._db()
         return bool(db.get_coils(sensor_address, 1)[0])
 
     def get_actuator(self, di_address: int) -> bool:
-        """Lê o estado do Discrete Input no endereço informado (debug/telemetria)."""
+        """Lê o estado do Discrete Input no endereço informado (inclui escritas ainda pendentes)."""
+        if di_address < self._outputs.size:
+            return self._outputs.get(di_address)
         db = self._db()
         val = db.get_discrete_inputs(di_address, 1)
         return bool(val and val[0])
 
-    def set_actuator(self, coil_address: int, value: bool) -> None:
+    def set_actuator(self, coil_address: int, value: bool, immediate: bool = False) -> None:
         # print(
         #     f"[DEBUG ACTUATOR] {coil_address} <= {value}  (chamado por {inspect.stack()[1].function})"
         # )
-        db = self._db()
-        db.set_discrete_inputs(coil_address, [int(value)])
+        self.set_actuators({coil_address: value}, immediate=immediate)
+
+    def set_actuators(self, values: Dict[int, bool], immediate: bool = False) -> None:
+        """
+        Agenda a escrita de vários atuadores (Discrete Inputs) de uma vez.
+
+        As escritas ficam no buffer e são gravadas juntas no fim do scan
+        corrente, em faixas contíguas; assim o Factory IO nunca vê uma imagem
+        de saídas pela metade.
+
+        Args:
+            values: Mapa {endereço: valor}
+            immediate: Grava já, sem esperar o scan (saídas de segurança).
+                Use também para pulsos mais curtos que `scan_time`.
+
+        Example:
+            >>> server.set_actuators({Inputs.RED: True, Inputs.GREEN: False})
+        """
+        self._outputs.set(values)
+        loop_alive = self._event_thread is not None and self._event_thread.is_alive()
+        if immediate or not loop_alive:
+            self.flush_outputs()
+
+    def flush_outputs(self) -> int:
+        """Grava as escritas pendentes no banco. Retorna o nº de faixas gravadas."""
+        with self._flush_lock:
+            ranges = self._outputs.take()
+            if not ranges:
+                return 0
+            db = self._db()
+            for start, values in ranges:
+                db.set_discrete_inputs(start, values)
+            self.output_flushes += len(ranges)
+            return len(ranges)
 
     def _write_coil(self, addr: int, value: bool) -> None:
         db = self._db()
@@ -233,27 +404,171 @@ class FactoryModbusEventServer(Stoppable):
     def _all_off(self) -> None:
         self._write_coil(Inputs.EntryConveyor, False)
 
-        for name, addr in Esteiras.__members__.items():
-            self.set_actuator(addr.value, False)
+        self.set_actuators(
+            {addr.value: False for addr in Esteiras.__members__.values()},
+            immediate=True,
+        )
 
     def _all_on(self) -> None:
         # self._write_coil(Inputs.EntryConveyor, False)
-        self.set_actuator(Inputs.GREEN, True)
-        self.set_actuator(Inputs.Running, True)
-        for name, addr in Esteiras.__members__.items():
-            self.set_actuator(addr.value, True)
-
-        self.set_actuator(Inputs.Turntable1_Esteira_EntradaSaida, self.turntable_state1)            
-        self.set_actuator(Inputs.Turntable1_Esteira_SaidaEntrada, self.turntable_state2)
+        values = {Inputs.GREEN: True, Inputs.Running: True}
+        values.update({addr.value: True for addr in Esteiras.__members__.values()})
+        values[Inputs.Turntable1_Esteira_EntradaSaida] = self.turntable_state1
+        values[Inputs.Turntable1_Esteira_SaidaEntrada] = self.turntable_state2
+        self.set_actuators(values)
 
     # -------- loop de eventos --------
     def _event_loop(self):
         db = self._db()
+        clock = self.clock
+        # scans agendados contra um prazo monotônico: o período real é
+        # scan_time (e não scan_time + trabalho)
+        deadline = clock.monotonic()
         while not self.stop_event.is_set():
+            start = clock.monotonic()
             coils = db.get_coils(0, 120) or []
+            img = None
             if coils:
-                self.events.handle_scan(coils)
-            self.stop_event.wait(self.scan_time)
+                img = self._read_image(db, coils)
+                self._publish_scan(img)
+                # o EventProcessor faz o XOR com o scan anterior e só
+                # despacha os endereços que mudaram
+                self.events.handle_scan(img.coils, img.word, img.timestamp)
+            # fim do ciclo: grava de uma vez tudo que os controladores escreveram
+            self.flush_outputs()
+            if img is not None and self.recorder is not None:
+                self.recorder.record(img, self._outputs.word())
+
+            end = clock.monotonic()
+            deadline += self.scan_time
+            overrun = end > deadline
+            self.metrics.record_scan(
+                end - start, max(0.0, start - (deadline - self.scan_time)), overrun
+            )
+            if overrun:
+                # não tenta recuperar os períodos perdidos com uma rajada de scans
+                deadline = end
+            clock.wait(self.stop_event, deadline - end)
+
+    def _metrics_loop(self) -> None:
+        while not self.clock.wait(self.stop_event, self.metrics_summary_s):
+            print(f"[{now()}] " + self.metrics.format_summary())
+
+    def _read_image(self, db, coils) -> ScanImage:
+        prev = self._image
+        n = self.image_registers
+        return ScanImage(
+            seq=prev.seq + 1 if prev else 1,
+            timestamp=self.clock.monotonic(),
+            coils=tuple(coils),
+            word=pack_bits(coils),
+            input_registers=tuple(db.get_input_registers(0, n) or ()) if n else (),
+            holding_registers=tuple(db.get_holding_registers(0, n) or ()) if n else (),
+        )
+
+    def _publish_scan(self, img: ScanImage) -> None:
+        prev = self._image
+        # troca de referência atômica: leitores nunca veem uma imagem parcial
+        self._image = img
+        if self._written_ir or self._written_hr:
+            self._prune_written(img)
+        # só pega o lock se alguma coil esperada mudou (ou no primeiro scan)
+        if prev is None or ((img.word ^ prev.word) & self._wait_mask):
+            with self._coil_cond:
+                self._coil_cond.notify_all()
+
+    # -------- espera por coils (sincronizada com o scan) --------
+    def wait_for(
+        self, coil: int, value: bool = True, timeout: Optional[float] = None
+    ) -> bool:
+        """
+        Bloqueia até a coil `coil` valer `value` no scan publicado.
+
+        Acorda no máximo um período de scan depois da mudança, sem polling.
+
+        Args:
+            coil: Endereço da coil (sensor)
+            value: Valor esperado (padrão: True)
+            timeout: Tempo máximo em segundos (None = sem limite)
+
+        Returns:
+            True se a condição foi atingida, False em timeout ou parada do servidor
+
+        Example:
+            >>> server.wait_for(Coils.sensor_move_warehouse, False)  # crane parado
+            True
+        """
+        return self.wait_any([coil], value, timeout) is not None
+
+    def wait_any(
+        self, coils: Iterable[int], value: bool = True, timeout: Optional[float] = None
+    ) -> Optional[int]:
+        """
+        Bloqueia até QUALQUER uma das coils valer `value`.
+
+        Returns:
+            Endereço da primeira coil (na ordem informada) que satisfez a condição,
+            ou None em timeout/parada do servidor
+        """
+        coils = list(coils)
+        hit: List[int] = []
+
+        def _check() -> bool:
+            word = self._image.word
+            for c in coils:
+                if bool(word >> c & 1) == value:
+                    hit.append(c)
+                    return True
+            return False
+
+        return hit[0] if self._wait(coils, _check, timeout) else None
+
+    def wait_all(
+        self, coils: Iterable[int], value: bool = True, timeout: Optional[float] = None
+    ) -> bool:
+        """Bloqueia até TODAS as coils valerem `value` no mesmo scan."""
+        coils = list(coils)
+        mask = 0
+        for c in coils:
+            mask |= 1 << c
+        target = mask if value else 0
+        return self._wait(coils, lambda: (self._image.word & mask) == target, timeout)
+
+    def _wait(
+        self, coils: List[int], check: Callable[[], bool], timeout: Optional[float]
+    ) -> bool:
+        if threading.current_thread() is self._event_thread:
+            raise RuntimeError("wait_for não pode ser chamado na thread de scan.")
+        if self._event_thread is None or not self._event_thread.is_alive():
+            raise RuntimeError("Loop de scan não está rodando.")
+
+        clock = self.clock
+        deadline = None if timeout is None else clock.monotonic() + timeout
+        with self._coil_cond:
+            for c in coils:
+                self._wait_counts[c] = self._wait_counts.get(c, 0) + 1
+                self._wait_mask |= 1 << c
+            try:
+                while True:
+                    if self.stop_event.is_set():
+                        return False
+                    if self._image is not None and check():
+                        return True
+                    if deadline is None:
+                        self._coil_cond.wait()
+                    else:
+                        remaining = deadline - clock.monotonic()
+                        if remaining <= 0:
+                            return False
+                        clock.wait_condition(self._coil_cond, remaining)
+            finally:
+                for c in coils:
+                    n = self._wait_counts[c] - 1
+                    if n:
+                        self._wait_counts[c] = n
+                    else:
+                        del self._wait_counts[c]
+                        self._wait_mask &= ~(1 << c)
 
     # -------- handlers de botões (mantidos) --------
     def _on_start(self):
@@ -263,13 +578,16 @@ class FactoryModbusEventServer(Stoppable):
             return
         self.machine_state = "running"
         self.sequence_step = "idle"
-        self.set_actuator(Inputs.RED, False)
-        self.set_actuator(Inputs.GREEN, True)
-        self.set_actuator(Inputs.YELLOW, False)
-
-        self.set_actuator(Inputs.Stop, False)
-        self.set_actuator(Inputs.Running, True)
-        self.set_actuator(Inputs.Emergency, False)
+        self.set_actuators(
+            {
+                Inputs.RED: False,
+                Inputs.GREEN: True,
+                Inputs.YELLOW: False,
+                Inputs.Stop: False,
+                Inputs.Running: True,
+                Inputs.Emergency: False,
+            }
+        )
         self.auto.start()
 
     def _on_stop(self):
@@ -277,13 +595,16 @@ class FactoryModbusEventServer(Stoppable):
             print("Stop")
         self.machine_state = "Stopped"
         self.sequence_step = "idle"
-        self.set_actuator(Inputs.RED, True)
-        self.set_actuator(Inputs.GREEN, False)
-        self.set_actuator(Inputs.YELLOW, False)
-
-        self.set_actuator(Inputs.Stop, True)
-        self.set_actuator(Inputs.Running, False)
-        self.set_actuator(Inputs.Emergency, False)
+        self.set_actuators(
+            {
+                Inputs.RED: True,
+                Inputs.GREEN: False,
+                Inputs.YELLOW: False,
+                Inputs.Stop: True,
+                Inputs.Running: False,
+                Inputs.Emergency: False,
+            }
+        )
         self._all_off()
 
     def _on_reset(self):
@@ -292,13 +613,16 @@ class FactoryModbusEventServer(Stoppable):
         if self.get_sensor(Coils.RestartButton) is True:
             self.sequence_step = "idle"
             self.machine_state = "Running"
-            self.set_actuator(Inputs.RED, False)
-            self.set_actuator(Inputs.GREEN, True)
-            self.set_actuator(Inputs.YELLOW, False)
-
-            self.set_actuator(Inputs.Stop, False)
-            self.set_actuator(Inputs.Running, True)
-            self.set_actuator(Inputs.Emergency, False)
+            self.set_actuators(
+                {
+                    Inputs.RED: False,
+                    Inputs.GREEN: True,
+                    Inputs.YELLOW: False,
+                    Inputs.Stop: False,
+                    Inputs.Running: True,
+                    Inputs.Emergency: False,
+                }
+            )
             self._all_on()
 
     def _on_emergency_toggle(self):
@@ -312,14 +636,17 @@ class FactoryModbusEventServer(Stoppable):
                 print("Emergency ON")
             self.machine_state = "emergency"
             self.sequence_step = "idle"
-            self.set_actuator(Inputs.RED, True)
-            self.set_actuator(Inputs.YELLOW, False)
-            self.set_actuator(Inputs.GREEN, True)
-
-            self.set_actuator(Inputs.Stop, True)
-            self.set_actuator(Inputs.Running, False)
-            self.set_actuator(Inputs.Emergency, True)
-            self._all_off()
+            self.set_actuators(
+                {
+                    Inputs.RED: True,
+                    Inputs.YELLOW: False,
+                    Inputs.GREEN: True,
+                    Inputs.Stop: True,
+                    Inputs.Running: False,
+                    Inputs.Emergency: True,
+                }
+            )
+            self._all_off()  # grava imediatamente (saída de segurança)
 
         elif (
             self.machine_state == "emergency"
@@ -366,10 +693,8 @@ class FactoryModbusEventServer(Stoppable):
         self.server.set_actuator(atuador_giro, True) # Liga o atuador de giro
 
         # Espera até que o sensor de limite 90 seja ativado
-        timeout = time.time() + 1.0 
-        while self.server.get_sensor(sensor_alvo) == False and time.time() < timeout:
-            time.sleep(self.server.scan_time)
-            
+        self.server.wait_for(sensor_alvo, True, timeout=1.0)
+
         self.server.set_actuator(atuador_giro, False) # Desliga o atuador de giro
 
         if self.server.get_sensor(sensor_alvo) == False:
@@ -394,10 +719,8 @@ class FactoryModbusEventServer(Stoppable):
         self.set_actuator(Inputs.Turntable3_roll, True) 
         
         # Espera até o sensor central (Coil 20) ser ativado
-        timeout = time.time() + 1.0 
-        while self.get_sensor(Coils.Sensor_turntable3) == False and time.time() < timeout:
-            time.sleep(self.scan_time)
-                     
+        self.wait_for(Coils.Sensor_turntable3, True, timeout=1.0)
+
         if self.get_sensor(Coils.Sensor_turntable3) == False:
             print("⚠️ ERRO: Caixa não chegou ao sensor central da TT3 (Coil 20). Abortando.")
             return 
@@ -425,10 +748,8 @@ class FactoryModbusEventServer(Stoppable):
         self.server.set_actuator(atuador_giro, True) 
 
         # Espera até que o sensor de limite 0 seja ativado
-        timeout = time.time() + 1.0 
-        while self.server.get_sensor(sensor_alvo) == False and time.time() < timeout:
-            time.sleep(self.server.scan_time)
-            
+        self.server.wait_for(sensor_alvo, True, timeout=1.0)
+
         self.server.set_actuator(atuador_giro, False) 
 
         if self.server.get_sensor(sensor_alvo) == False:
@@ -457,9 +778,7 @@ class FactoryModbusEventServer(Stoppable):
         self.server.set_actuator(atuador_roll, True)
         
         # Espera a caixa SAIR da Turntable (Coils.Sensor_turntable3, Coil 20)
-        timeout = time.time() + 5.0 
-        while self.server.get_sensor(Coils.Sensor_turntable3) == True and time.time() < timeout:
-            time.sleep(self.server.scan_time)
+        self.server.wait_for(Coils.Sensor_turntable3, False, timeout=5.0)
 
         self.server.set_actuator(atuador_roll, False) # Desliga o Roll Forward
         
@@ -471,10 +790,8 @@ class FactoryModbusEventServer(Stoppable):
         print("[PEDIDO] Caixa saiu da Turntable 3. Aguardando parada no destino.")
 
         # 4. AGUARDAR PARADA NO DESTINO (Sensor Coil 6)
-        timeout = time.time() + 2.0 
-        while self.server.get_sensor(sensor_parada_destino) == False and time.time() < timeout:
-            time.sleep(self.server.scan_time)
-            
+        self.server.wait_for(sensor_parada_destino, True, timeout=2.0)
+
         self.server.set_actuator(esteira_destino, False) # DESLIGA a esteira de destino
         
         if self.server.get_sensor(sensor_parada_destino) == False:
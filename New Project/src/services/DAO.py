@@ -52,6 +52,16 @@ class MES:
 
     _instance: Optional["MES"] = None
     _lock = threading.Lock()
+    _config_override: Optional[Path] = None
+
+    @classmethod
+    def use_config_path(cls, config_path) -> None:
+        """Troca o arquivo de pedidos (benchmark/testes); vale também para a instância já criada."""
+        with cls._lock:
+            cls._config_override = Path(config_path)
+            if cls._instance is not None and cls._instance._initialized:
+                cls._instance._config_path = cls._config_override
+                cls._instance._config = cls._instance._load_config()
 
     def __new__(
         cls,
@@ -73,7 +83,7 @@ class MES:
         if self._initialized:
             return
 
-        self._config_path = Path(config_path)
+        self._config_path = self._config_override or Path(config_path)
         self._config: OrderConfig = self._load_config()
         self._initialized = True
 
@@ -210,10 +220,12 @@ class MES:
         # return the client key (no numeric suffix)
         return client
 
-    def consume_persistent_order_by_color(self, color: str) -> bool:
+    def consume_persistent_order_by_color(self, color: str, enqueue_client: bool = True) -> bool:
         """
         Decrementa 1 caixa de um pedido persistido que tenha a cor informada.
         Se o pedido atingir 0 caixas, remove o cliente do `orders`.
+        Com `enqueue_client=False` o cliente não entra em `queue_orders` (a
+        caixa saiu do estoque e não passa pela coluna do cliente).
         Retorna True se uma ordem foi atualizada/removida, False caso nenhum pedido compatível exista.
         """
         color = str(color).upper()
@@ -238,32 +250,33 @@ class MES:
 
                 if info_color == color and boxes > 0:
                     # antes de decrementar/remover, adiciona na fila de orders (cliente)
-                    try:
-                        clt = {
-                            "client": client,
-                            "color_box": info_color,
-                            "resources": (
-                                int(info.get("resource", 0))
-                                if info.get("resource") is not None
-                                else None
-                            ),
-                        }
-                        # garante que as filas existem
+                    if enqueue_client:
                         try:
-                            self.queue_orders.append(clt)
-                            # debug: imprimir estado das filas
+                            clt = {
+                                "client": client,
+                                "color_box": info_color,
+                                "resources": (
+                                    int(info.get("resource", 0))
+                                    if info.get("resource") is not None
+                                    else None
+                                ),
+                            }
+                            # garante que as filas existem
                             try:
-                                print(f"[MES] queue_orders appended: {clt}")
-                                print(
-                                    f"[MES] queue_orders (len)={len(self.queue_orders)} queue_storage (len)={len(self.queue_storage)}"
-                                )
+                                self.queue_orders.append(clt)
+                                # debug: imprimir estado das filas
+                                try:
+                                    print(f"[MES] queue_orders appended: {clt}")
+                                    print(
+                                        f"[MES] queue_orders (len)={len(self.queue_orders)} queue_storage (len)={len(self.queue_storage)}"
+                                    )
+                                except Exception:
+                                    pass
                             except Exception:
+                                # se a instância atual não tiver queues (incomum), ignore
                                 pass
                         except Exception:
-                            # se a instância atual não tiver queues (incomum), ignore
                             pass
-                    except Exception:
-                        pass
 
                     boxes -= 1
                     if boxes <= 0:
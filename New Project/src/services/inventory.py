@@ -0,0 +1,159 @@
+# inventory.py
+import threading
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from controllers.occupancy import PRODUCT_CODES
+
+if TYPE_CHECKING:
+    from controllers.lines import LineController
+    from controllers.racks import Rack
+
+PRODUCTS = tuple(PRODUCT_CODES)
+POLICIES = ("fifo", "lifo")
+
+# (rack, coluna, linha, endereço)
+Location = Tuple[str, int, int, int]
+
+
+class InventoryService:
+    """
+    Consultas de estoque sobre os racks do `LineController` (`server.inventory`).
+
+    Os contadores vivem no `OccupancyGrid` de cada rack e são atualizados a
+    cada `occupy`/`free`, então as consultas não varrem o rack:
+
+    - `count(produto)`: caixas no estoque (todas as colunas de estoque, todos
+      os racks), O(racks)
+    - `client_count(cliente, produto=None)`: caixas na coluna do cliente
+    - `available(produto)` / `can_fulfill(produto, caixas)`: estoque menos o
+      já reservado para retiradas em andamento (admissão de pedido)
+    - `locate(produto, "fifo" | "lifo")`: posição da caixa mais antiga/mais
+      nova, O(log n)
+    - `snapshot()`: estado completo para IHM, em cache por versão do rack
+
+    As contagens são lidas sem lock (um `dict.get` de inteiro, atômico no
+    CPython) enquanto a thread do transelevador altera o rack; `locate` e
+    `snapshot` usam o lock do warehouse para devolver um estado coerente.
+    `reserve`/`release` usam o lock do serviço, então duas admissões
+    simultâneas não prometem a mesma caixa.
+    """
+
+    def __init__(self, lines: "LineController", verbose: bool = False):
+        self.lines = lines
+        self.verbose = verbose
+        self._lock = threading.Lock()
+        self.reserved: Counter = Counter()
+        self._snapshots: Dict[str, Tuple[int, dict]] = {}  # rack -> (versão, snapshot)
+
+    def _racks(self, rack: Optional[str] = None) -> List["Rack"]:
+        if rack is None:
+            return list(self.lines.racks.values())
+        return [self.lines._rack(rack)]
+
+    # -------- contadores O(1) --------
+    def count(self, product: str, group: str = "storage", rack: Optional[str] = None) -> int:
+        product = product.upper()
+        return sum(r.warehouse.grid.count(product, group) for r in self._racks(rack))
+
+    def client_count(self, client: str, product: Optional[str] = None, rack: Optional[str] = None) -> int:
+        total = 0
+        for r in self._racks(rack):
+            col = r.warehouse.client_columns.get(client)
+            if col is not None:
+                total += r.warehouse.grid.column_count(col, product.upper() if product else None)
+        return total
+
+    def free_slots(self, group: str = "storage", rack: Optional[str] = None) -> int:
+        total = 0
+        for r in self._racks(rack):
+            wh = r.warehouse
+            cols = wh.storage_columns if group == "storage" else list(wh.client_columns.values())
+            total += wh.grid.free_count(cols)
+        return total
+
+    def available(self, product: str) -> int:
+        """Caixas no estoque ainda não reservadas para uma retirada."""
+        product = product.upper()
+        return self.count(product) - self.reserved[product]
+
+    def can_fulfill(self, product: str, boxes: int = 1) -> bool:
+        return self.available(product) >= boxes
+
+    # -------- reservas (admissão) --------
+    def reserve(self, product: str, boxes: int = 1) -> bool:
+        """Reserva `boxes` caixas do estoque; False (sem reservar nada) se não houver."""
+        product = product.upper()
+        with self._lock:
+            if self.count(product) - self.reserved[product] < boxes:
+                return False
+            self.reserved[product] += boxes
+        if self.verbose:
+            print(f"[INVENTORY] reservadas {boxes} {product} (reservado={self.reserved[product]})")
+        return True
+
+    def release(self, product: str, boxes: int = 1) -> None:
+        """Devolve uma reserva (caixa retirada ou retirada cancelada)."""
+        product = product.upper()
+        with self._lock:
+            self.reserved[product] = max(0, self.reserved[product] - boxes)
+
+    # -------- índice por timestamp --------
+    def locate(self, product: str, policy: str = "fifo", rack: Optional[str] = None) -> Optional[Location]:
+        """Caixa mais antiga (`fifo`) ou mais nova (`lifo`) do produto no estoque, entre os racks."""
+        if policy not in POLICIES:
+            raise ValueError(f"Política inválida: {policy}. Use um de {POLICIES}")
+        product = product.upper()
+        best: Optional[Tuple[float, Location]] = None
+        for r in self._racks(rack):
+            wh = r.warehouse
+            with wh._warehouse_lock:
+                cell = wh.grid.oldest(product, "storage") if policy == "fifo" else wh.grid.newest(product, "storage")
+                if cell is None:
+                    continue
+                ts = wh.grid.timestamp[wh.grid.index(*cell)]
+            key = ts if policy == "fifo" else -ts
+            if best is None or key < best[0]:
+                best = (key, (r.name, cell[0], cell[1], r.config.address(*cell)))
+        return best[1] if best else None
+
+    # -------- IHM --------
+    def snapshot(self) -> dict:
+        """
+        Estado de todos os racks:
+
+            {"racks": {nome: {"version", "storage", "clients", "free", "cells"}},
+             "totals": {produto: n}, "reserved": {produto: n}}
+        """
+        racks = {}
+        for r in self._racks():
+            wh = r.warehouse
+            cached = self._snapshots.get(r.name)
+            if cached is not None and cached[0] == wh.version:
+                racks[r.name] = cached[1]
+                continue
+            with wh._warehouse_lock:
+                version = wh.version
+                cells = [
+                    {"column": c, "row": row, "address": r.config.address(c, row), "product": p, "timestamp": ts, "order_id": o}
+                    for c, row, p, ts, o in wh.grid.occupied()
+                ]
+                data = {
+                    "version": version,
+                    "storage": {p: wh.grid.count(p, "storage") for p in PRODUCTS},
+                    "clients": {
+                        name: {p: wh.grid.column_count(col, p) for p in PRODUCTS}
+                        for name, col in wh.client_columns.items()
+                    },
+                    "free": {
+                        "storage": wh.grid.free_count(wh.storage_columns),
+                        "client": wh.grid.free_count(wh.client_columns.values()),
+                    },
+                    "cells": cells,
+                }
+            self._snapshots[r.name] = (version, data)
+            racks[r.name] = data
+        totals = {p: sum(d["storage"][p] for d in racks.values()) for p in PRODUCTS}
+        with self._lock:
+            reserved = {p: self.reserved[p] for p in PRODUCTS}
+        return {"racks": racks, "totals": totals, "reserved": reserved}
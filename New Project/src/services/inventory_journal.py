@@ -0,0 +1,182 @@
+# inventory_journal.py
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import IO, Optional
+
+from controllers.occupancy import OccupancyGrid
+
+SNAPSHOT_VERSION = 1
+
+
+class InventoryJournal:
+    """
+    Persistência da ocupação de um rack: diário só de acréscimo + snapshot.
+
+    Cada `occupy`/`free` bem-sucedido do `WarehouseExtension` vira uma linha
+    JSON em `<dir>/<rack>.journal`, com número de sequência crescente:
+
+        {"seq": 12, "op": "occupy", "col": 6, "row": 1, "product": "GREEN", "ts": 1718…, "order": "6_1_order"}
+        {"seq": 13, "op": "free", "col": 6, "row": 1}
+
+    A cada `snapshot_every` registros a ocupação inteira é gravada em
+    `<dir>/<rack>.snapshot` (arquivo temporário + `os.replace`, atômico) com a
+    sequência do último registro aplicado, e o diário é zerado.
+
+    Na partida, `load(grid)` lê o snapshot e reaplica só os registros do
+    diário com sequência maior que a dele, então uma queda entre a troca do
+    snapshot e o truncamento do diário não aplica nada duas vezes. Uma linha
+    incompleta no fim do diário (queda no meio da escrita) é descartada.
+
+    Args:
+        directory: Pasta dos arquivos (criada se não existir)
+        name: Nome do rack (prefixo dos arquivos)
+        snapshot_every: Registros no diário antes de compactar
+        fsync: `os.fsync` a cada registro (sobrevive a queda de energia, não só do processo)
+    """
+
+    def __init__(self, directory: str, name: str = "warehouse", snapshot_every: int = 500, fsync: bool = True):
+        self.directory = Path(directory)
+        self.name = name
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.journal_path = self.directory / f"{name}.journal"
+        self.snapshot_path = self.directory / f"{name}.snapshot"
+
+        self._lock = threading.Lock()
+        self._f: Optional[IO[str]] = None
+        self._grid: Optional[OccupancyGrid] = None
+        self.seq = 0
+        self.pending = 0  # registros no diário desde o último snapshot
+        self.replayed = 0
+        self.discarded = 0
+        self.snapshots = 0
+        self.load_ms = 0.0
+
+    # -------- partida --------
+    def exists(self) -> bool:
+        return self.snapshot_path.exists() or self.journal_path.exists()
+
+    def load(self, grid: OccupancyGrid) -> int:
+        """
+        Reconstrói `grid` (vazio) a partir do snapshot + diário e abre o diário
+        para acréscimo. Devolve quantos registros do diário foram reaplicados.
+        """
+        t0 = time.perf_counter()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self._grid = grid
+            base = self._load_snapshot(grid)
+            self.seq = base
+            valid_bytes = 0
+            if self.journal_path.exists():
+                with open(self.journal_path, "rb") as f:
+                    for raw in f:
+                        rec = self._parse(raw)
+                        if rec is None:
+                            self.discarded += 1
+                            break  # tudo depois de uma linha corrompida é lixo da mesma escrita
+                        valid_bytes += len(raw)
+                        if rec["seq"] <= base:
+                            continue
+                        self._apply(grid, rec)
+                        self.seq = rec["seq"]
+                        self.replayed += 1
+                        self.pending += 1
+                if valid_bytes != self.journal_path.stat().st_size:
+                    os.truncate(self.journal_path, valid_bytes)
+            self._f = open(self.journal_path, "a", encoding="utf-8")
+            self.load_ms = (time.perf_counter() - t0) * 1000
+            return self.replayed
+
+    def _load_snapshot(self, grid: OccupancyGrid) -> int:
+        if not self.snapshot_path.exists():
+            return 0
+        with open(self.snapshot_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Snapshot de inventário com versão desconhecida: {self.snapshot_path}")
+        if (data["columns"], data["rows"]) != (grid.columns, grid.rows):
+            raise ValueError(
+                f"Snapshot de inventário {self.snapshot_path} é de um rack {data['columns']}x{data['rows']}, "
+                f"esperado {grid.columns}x{grid.rows}"
+            )
+        # da ocupação mais antiga para a mais nova: preserva a ordem FIFO no empate de timestamp
+        for col, row, product, ts, order_id in data["cells"]:
+            grid.occupy(col, row, product, ts, order_id)
+        return int(data["seq"])
+
+    @staticmethod
+    def _parse(raw: bytes) -> Optional[dict]:
+        if not raw.endswith(b"\n"):
+            return None
+        try:
+            rec = json.loads(raw)
+        except ValueError:
+            return None
+        return rec if isinstance(rec, dict) and "seq" in rec and "op" in rec else None
+
+    @staticmethod
+    def _apply(grid: OccupancyGrid, rec: dict) -> None:
+        if rec["op"] == "occupy":
+            grid.occupy(rec["col"], rec["row"], rec["product"], rec["ts"], rec.get("order"))
+        elif rec["op"] == "free":
+            grid.free(rec["col"], rec["row"])
+
+    # -------- gravação --------
+    def occupy(self, column: int, row: int, product: str, timestamp: float, order_id: Optional[str]) -> None:
+        self._append({"op": "occupy", "col": column, "row": row, "product": product, "ts": timestamp, "order": order_id})
+
+    def free(self, column: int, row: int) -> None:
+        self._append({"op": "free", "col": column, "row": row})
+
+    def _append(self, rec: dict) -> None:
+        with self._lock:
+            if self._f is None:
+                raise RuntimeError(f"Diário de inventário {self.journal_path} não foi carregado (load)")
+            self.seq += 1
+            self._f.write(json.dumps({"seq": self.seq, **rec}, separators=(",", ":")) + "\n")
+            self._f.flush()
+            if self.fsync:
+                os.fsync(self._f.fileno())
+            self.pending += 1
+            if self.pending >= self.snapshot_every:
+                self._snapshot()
+
+    def snapshot(self) -> None:
+        """Grava o snapshot agora e zera o diário (com o lock do warehouse adquirido)."""
+        with self._lock:
+            if self._grid is not None:
+                self._snapshot()
+
+    def _snapshot(self) -> None:
+        grid = self._grid
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "seq": self.seq,
+            "columns": grid.columns,
+            "rows": grid.rows,
+            "cells": grid.occupied(),
+        }
+        tmp = self.snapshot_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+        self._f.truncate(0)
+        self._f.seek(0)
+        self.pending = 0
+        self.snapshots += 1
+
+    def close(self) -> None:
+        """Compacta o que estiver no diário e fecha (com o lock do warehouse adquirido)."""
+        with self._lock:
+            if self._f is None:
+                return
+            if self.pending and self._grid is not None:
+                self._snapshot()
+            self._f.close()
+            self._f = None
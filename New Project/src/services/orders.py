@@ -1,6 +1,8 @@
 # orders.py
+import threading
 from collections import deque
 from dataclasses import dataclass
+from typing import Callable, List, Optional
 from services.DAO import MES
 
 
@@ -9,14 +11,20 @@ class Order:
     color: str  # "BLUE" | "GREEN" | "OTHER"
     boxes_total: int  # quantas caixas esse pedido precisa
     boxes_done: int = 0  # progresso
+    boxes_allocated: int = 0  # caixas já a caminho (retirada do estoque / classificada no HAL)
 
     @property
     def done(self) -> bool:
         return self.boxes_done >= self.boxes_total
 
+    @property
+    def open_boxes(self) -> int:
+        """Caixas ainda sem origem definida (nem entregues, nem a caminho)."""
+        return max(0, self.boxes_total - self.boxes_done - self.boxes_allocated)
+
     def can_fulfill(self, klass: str) -> bool:
-        # atende somente se a cor bate e ainda falta caixa
-        return (klass == self.color) and (not self.done)
+        # atende somente se a cor bate e ainda falta caixa sem origem
+        return (klass == self.color) and self.open_boxes > 0
 
     def consume_one_box(self) -> None:
         if not self.done:
@@ -24,19 +32,35 @@ class Order:
 
 
 class OrderManager:
+    """
+    Fila de pedidos em memória.
+
+    Uma caixa pode ser prometida a um pedido antes de chegar (`allocate`):
+    a retirada do estoque pedida pelo `FulfillmentPlanner` ou a caixa que o
+    HAL mandou para a Central. A promessa tira a caixa de `can_fulfill` (outra
+    caixa da mesma cor não atende o mesmo pedido) e é fechada com `complete`
+    (entregue) ou `release` (desistiu). `on_created` recebe cada pedido novo.
+    """
+
     def __init__(self, verbose: bool = True):
         self.q = deque()
         self.verbose = verbose
+        self._lock = threading.RLock()
+        self.on_created: List[Callable[[Order], None]] = []
 
     def has_pending(self) -> bool:
         return any(not o.done for o in self.q)
 
     def create_order(self, color: str, boxes: int, count: int = 1) -> None:
         # empilha N pedidos iguais (count)
-        for _ in range(max(1, int(count))):
-            self.q.append(Order(color=color, boxes_total=int(boxes)))
+        created = [Order(color=color, boxes_total=int(boxes)) for _ in range(max(1, int(count)))]
+        with self._lock:
+            self.q.extend(created)
         if self.verbose:
             print(f"[ORDER] criados: {count} pedido(s) - cor={color} caixas={boxes}")
+        for order in created:
+            for callback in list(self.on_created):
+                callback(order)
 
     def can_fulfill(self, klass: str) -> bool:
         # Retorna True se EXISTE algum pedido aberto que possa ser atendido
@@ -47,28 +71,72 @@ class OrderManager:
                 return True
         return False
 
+    def open_orders(self) -> List[Order]:
+        """Pedidos com caixa ainda sem origem, na ordem da fila."""
+        with self._lock:
+            return [o for o in self.q if o.open_boxes > 0]
+
     def consume(self, klass: str) -> None:
         # consome no primeiro pedido compatível/aberto
-        for o in self.q:
-            if o.can_fulfill(klass):
-                o.consume_one_box()
-                if self.verbose:
-                    print(
-                        f"[ORDER] consumido 1 caixa {klass} -> {o.boxes_done}/{o.boxes_total}"
-                    )
-                # atualiza o armazenamento persistente (orders.json)
-                try:
-                    cfg = MES()
-                    consumed = cfg.consume_persistent_order_by_color(klass)
-                    if self.verbose and consumed:
-                        print(f"[ORDER] ordem persistida atualizada para cor={klass}")
-                except Exception:
-                    # não interrompe o fluxo de execução principal se falhar
+        with self._lock:
+            for o in self.q:
+                if o.can_fulfill(klass):
+                    o.consume_one_box()
                     if self.verbose:
                         print(
-                            f"[ORDER] aviso: não foi possível atualizar orders persistido para {klass}"
+                            f"[ORDER] consumido 1 caixa {klass} -> {o.boxes_done}/{o.boxes_total}"
                         )
-                break
+                    self._consume_persistent(klass)
+                    break
+            self._cleanup()
+
+    # -------- caixas prometidas --------
+    def allocate(self, klass: str) -> Optional[Order]:
+        """Promete uma caixa `klass` ao primeiro pedido compatível; None se não houver."""
+        with self._lock:
+            for o in self.q:
+                if o.can_fulfill(klass):
+                    o.boxes_allocated += 1
+                    return o
+        return None
+
+    def complete(self, order: Order, enqueue_client: bool = True) -> None:
+        """
+        Caixa prometida entregue. `enqueue_client=False` não coloca o cliente
+        na fila de guarda do warehouse (caixa que saiu do estoque, não vai
+        para a coluna do cliente).
+        """
+        with self._lock:
+            order.boxes_allocated = max(0, order.boxes_allocated - 1)
+            order.consume_one_box()
+            if self.verbose:
+                print(
+                    f"[ORDER] entregue 1 caixa {order.color} -> {order.boxes_done}/{order.boxes_total}"
+                )
+            self._consume_persistent(order.color, enqueue_client)
+            self._cleanup()
+
+    def release(self, order: Order) -> None:
+        """Desfaz a promessa: a caixa volta a faltar no pedido."""
+        with self._lock:
+            order.boxes_allocated = max(0, order.boxes_allocated - 1)
+
+    # -------- internos (com _lock) --------
+    def _consume_persistent(self, klass: str, enqueue_client: bool = True) -> None:
+        # atualiza o armazenamento persistente (orders.json)
+        try:
+            cfg = MES()
+            consumed = cfg.consume_persistent_order_by_color(klass, enqueue_client=enqueue_client)
+            if self.verbose and consumed:
+                print(f"[ORDER] ordem persistida atualizada para cor={klass}")
+        except Exception:
+            # não interrompe o fluxo de execução principal se falhar
+            if self.verbose:
+                print(
+                    f"[ORDER] aviso: não foi possível atualizar orders persistido para {klass}"
+                )
+
+    def _cleanup(self) -> None:
         # limpeza de pedidos finalizados à esquerda
         while self.q and self.q[0].done:
             finished = self.q.popleft()
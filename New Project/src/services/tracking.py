@@ -0,0 +1,239 @@
+# tracking.py
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+from addresses import Coils
+from metrics import Histogram
+
+# Trechos da planta, na ordem do fluxo. Cada trecho é uma fila FIFO (as caixas
+# não se ultrapassam dentro dele); uma borda de sensor move a caixa da frente
+# de um trecho para o seguinte.
+LINE_STAGES = {"blue": "linha_blue", "green": "linha_green", "other": "linha_other"}
+FILA_TT1 = "fila_tt1"  # parada no Sensor_2, esperando a TT1
+TT1 = "tt1"  # na TT1 ou na Esteira_Producao_2 até o HAL
+HAL = "hal"  # debaixo da câmera, esperando a classificação
+PRODUCAO_2 = "producao_2"  # classificada, a caminho da TT2
+TT2 = "tt2"
+ESTOQUE = "estoque"  # esteira de estoque + cadeia de acumulação
+ENTRADA_STORAGE = "entrada_storage"  # na ponta da cadeia, esperando o transelevador
+CENTRAL = "central"
+TT3 = "tt3"
+PEDIDO = "pedido"  # esteiras de pedido e carregamento
+ENTRADA_CLIENTE = "entrada_cliente"
+TRANSELEVADOR = "transelevador"
+RACK = "rack"  # terminal: armazenada
+
+# trechos que comportam uma caixa por vez: uma borda repetida (ex.: os dois
+# fins de curso da TT1 no giro) não puxa a próxima caixa da fila
+CAPACITY = {TT1: 1, HAL: 1, TT2: 1, TT3: 1, TRANSELEVADOR: 1}
+
+# (coil, borda, trecho de origem, trecho de destino)
+TRANSITIONS: List[Tuple[int, str, str, str]] = [
+    (Coils.Sensor_2_Caixote_Azul, "rising", LINE_STAGES["blue"], FILA_TT1),
+    (Coils.Sensor_2_Caixote_Verde, "rising", LINE_STAGES["green"], FILA_TT1),
+    (Coils.Sensor_2_Caixote_Vazio, "rising", LINE_STAGES["other"], FILA_TT1),
+    (Coils.Turntable1_BackLimit, "rising", FILA_TT1, TT1),
+    (Coils.Turntable1_FrontLimit, "rising", FILA_TT1, TT1),
+    (Coils.Sensor_Hall, "rising", TT1, HAL),
+    (Coils.Load_Sensor, "rising", PRODUCAO_2, TT2),
+    (Coils.Sensor_Final_Producao, "rising", TT2, ESTOQUE),
+    (Coils.sensor_storage_warehouse, "rising", ESTOQUE, ENTRADA_STORAGE),
+    (Coils.sensor_storage_warehouse, "falling", ENTRADA_STORAGE, TRANSELEVADOR),
+    (Coils.SENSOR_TT2, "rising", TT2, CENTRAL),
+    (Coils.SENSOR_TT3, "rising", CENTRAL, TT3),
+    (Coils.SENSOR_HALL_1_6, "rising", TT3, PEDIDO),
+    (Coils.SENSOR_WAREHOUSE, "rising", PEDIDO, ENTRADA_CLIENTE),
+    (Coils.SENSOR_WAREHOUSE, "falling", ENTRADA_CLIENTE, TRANSELEVADOR),
+]
+
+# emissores: a caixa nasce quando o Sensor_1 da linha vê o caixote (1 -> 0)
+EMITTERS: List[Tuple[int, str]] = [
+    (Coils.Sensor_1_Caixote_Azul, "blue"),
+    (Coils.Sensor_1_Caixote_Verde, "green"),
+    (Coils.Sensor_1_Caixote_Vazio, "other"),
+]
+
+
+@dataclass
+class TrackedBox:
+    """Uma caixa rastreada, do emissor até o rack."""
+
+    id: int
+    origin: Optional[str]  # linha de origem ("blue" | "green" | "other"); None = não rastreada
+    created_at: float
+    stage: str = ""
+    klass: Optional[str] = None  # classificação do HAL ("BLUE" | "GREEN" | "OTHER")
+    slot: Optional[int] = None  # posição de destino no warehouse (posicao_alvo)
+    history: List[Tuple[str, float]] = field(default_factory=list)  # (trecho, entrada)
+
+    def dwell(self) -> Dict[str, float]:
+        """Tempo (s) em cada trecho já concluído."""
+        out: Dict[str, float] = {}
+        for (stage, t0), (_, t1) in zip(self.history, self.history[1:]):
+            out[stage] = out.get(stage, 0.0) + (t1 - t0)
+        return out
+
+
+class BoxTracker:
+    """
+    Registrador de deslocamento virtual: sabe em que trecho da planta está
+    cada caixa.
+
+    A caixa recebe um ID quando o Sensor_1 da linha detecta o caixote (seja do
+    `RandomFeeder`, do botão do emissor ou do simulador) e avança um trecho a
+    cada borda de sensor de `TRANSITIONS`. O `AutoController` anexa a
+    classificação do HAL (`classify`) e o `LineController` o endereço do rack
+    (`store`). Os handlers são curtos e rodam na thread de scan.
+
+    Uma borda sem caixa no trecho de origem (partida com caixas na planta,
+    emissão manual no Factory IO) cria uma caixa "não rastreada", contada em
+    `untracked`; uma borda que encontraria o destino cheio é ignorada e contada
+    em `ignored`.
+
+    Tempos de permanência por trecho ficam em `dwell[trecho]` (Histogram).
+    """
+
+    def __init__(self, clock, history: int = 1000, verbose: bool = False):
+        self.clock = clock
+        self.verbose = verbose
+
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._stages: Dict[str, Deque[TrackedBox]] = {}
+        self.boxes: Dict[int, TrackedBox] = {}  # caixas na planta
+        self.finished: Deque[TrackedBox] = deque(maxlen=history)  # já armazenadas
+        self.dwell: Dict[str, Histogram] = {}
+
+        self.created = 0
+        self.untracked = 0
+        self.ignored = 0
+
+    # -------- consultas --------
+    def queue(self, stage: str) -> List[TrackedBox]:
+        """Caixas de um trecho, da frente para trás."""
+        with self._lock:
+            return list(self._stages.get(stage, ()))
+
+    def head(self, stage: str) -> Optional[TrackedBox]:
+        """Caixa da frente do trecho (a próxima a sair), ou None."""
+        with self._lock:
+            q = self._stages.get(stage)
+            return q[0] if q else None
+
+    def occupancy(self) -> Dict[str, int]:
+        with self._lock:
+            return {s: len(q) for s, q in self._stages.items() if q}
+
+    # -------- eventos --------
+    def emit(self, origin: str) -> TrackedBox:
+        """Nova caixa na linha `origin`."""
+        with self._lock:
+            box = self._new_box(origin)
+            self._enter(box, LINE_STAGES[origin], box.created_at)
+            self.created += 1
+        if self.verbose:
+            print(f"[TRACK] caixa #{box.id} emitida na linha {origin}")
+        return box
+
+    def advance(self, src: str, dst: str) -> Optional[TrackedBox]:
+        """Move a caixa da frente de `src` para `dst`."""
+        now = self.clock.monotonic()
+        with self._lock:
+            if len(self._stages.get(dst, ())) >= CAPACITY.get(dst, 1 << 30):
+                self.ignored += 1
+                return None
+            box = self._pop(src, now)
+            if box is None:
+                box = self._new_box(None)
+                self.untracked += 1
+            self._enter(box, dst, now)
+        if self.verbose:
+            print(f"[TRACK] caixa #{box.id}: {src} -> {dst}")
+        return box
+
+    def classify(self, klass: str) -> Optional[TrackedBox]:
+        """Anexa a classificação do HAL à caixa debaixo da câmera e a libera."""
+        now = self.clock.monotonic()
+        with self._lock:
+            src = HAL
+            if not self._stages.get(HAL):
+                # a borda do HAL ainda não foi vista pelo rastreador
+                src = TT1
+            box = self._pop(src, now)
+            if box is None:
+                box = self._new_box(None)
+                self.untracked += 1
+            box.klass = klass
+            self._enter(box, PRODUCAO_2, now)
+        if self.verbose:
+            print(f"[TRACK] caixa #{box.id} classificada: {klass}")
+        return box
+
+    def store(self, slot: int) -> Optional[TrackedBox]:
+        """Caixa do transelevador guardada no rack em `slot`."""
+        now = self.clock.monotonic()
+        with self._lock:
+            box = self._pop(TRANSELEVADOR, now)
+            if box is None:
+                return None
+            box.slot = slot
+            box.stage = RACK
+            box.history.append((RACK, now))
+            self.boxes.pop(box.id, None)
+            self.finished.append(box)
+        if self.verbose:
+            print(f"[TRACK] caixa #{box.id} ({box.klass}) armazenada em {slot}")
+        return box
+
+    # -------- resumo --------
+    def summary(self) -> dict:
+        with self._lock:
+            stages = dict(self.dwell)
+        return {
+            "created": self.created,
+            "in_plant": len(self.boxes),
+            "stored": len(self.finished),
+            "untracked": self.untracked,
+            "ignored": self.ignored,
+            "occupancy": self.occupancy(),
+            "dwell": {s: h.summary() for s, h in stages.items()},
+        }
+
+    def format_summary(self) -> str:
+        s = self.summary()
+        lines = [
+            f"[TRACK] criadas={s['created']} na planta={s['in_plant']} "
+            f"armazenadas={s['stored']} não rastreadas={s['untracked']} ignoradas={s['ignored']}"
+        ]
+        for stage, h in s["dwell"].items():
+            if h["count"]:
+                lines.append(
+                    f"  {stage:<16} n={h['count']:<5} média={h['mean']:.1f}s "
+                    f"p90={h['p90']:.1f}s max={h['max']:.1f}s"
+                )
+        return "\n".join(lines)
+
+    # -------- internos (com _lock) --------
+    def _new_box(self, origin: Optional[str]) -> TrackedBox:
+        box = TrackedBox(id=self._next_id, origin=origin, created_at=self.clock.monotonic())
+        self._next_id += 1
+        self.boxes[box.id] = box
+        return box
+
+    def _enter(self, box: TrackedBox, stage: str, now: float) -> None:
+        box.stage = stage
+        box.history.append((stage, now))
+        self._stages.setdefault(stage, deque()).append(box)
+
+    def _pop(self, stage: str, now: float) -> Optional[TrackedBox]:
+        q = self._stages.get(stage)
+        if not q:
+            return None
+        box = q.popleft()
+        h = self.dwell.get(stage)
+        if h is None:
+            h = self.dwell[stage] = Histogram()
+        h.record(now - box.history[-1][1])
+        return box
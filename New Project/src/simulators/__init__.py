@@ -1,3 +1,4 @@
 from .random_feeder import RandomFeeder
+from .plant import PlantSimulator
 
-__all__ = ["RandomFeeder"]
+__all__ = ["RandomFeeder", "PlantSimulator"]
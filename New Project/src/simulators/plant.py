@@ -0,0 +1,708 @@
+# simulators/plant.py
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from addresses import Coils, Holding_Registers, Inputs
+
+
+@dataclass
+class SimBox:
+    id: int
+    color: str  # "BLUE" | "GREEN" | "OTHER"
+    created_at: float
+    pos: float = 0.0  # segundos de esteira percorridos no trecho atual
+    where: str = ""
+    history: List[Tuple[str, float]] = field(default_factory=list)  # (trecho, instante)
+
+    def move_to(self, where: str, now: float) -> None:
+        self.where = where
+        self.history.append((where, now))
+
+    def entered(self, where: str) -> Optional[float]:
+        """Instante em que a caixa entrou em `where` (None se nunca entrou)."""
+        for w, t in self.history:
+            if w == where:
+                return t
+        return None
+
+
+@dataclass(frozen=True)
+class _Sensor:
+    coil: int
+    start: float
+    end: float
+    inverted: bool = False  # retrorreflexivo: 1 quando NÃO há caixa
+    colors: Optional[Tuple[str, ...]] = None  # sensor de visão: só vê estas cores
+
+
+class Conveyor:
+    """
+    Esteira linear. Posições em "segundos de transporte": uma caixa anda
+    `dt` quando qualquer um dos DIs de `drives` está ligado e para no fim,
+    esperando o próximo trecho aceitar. Acumulação sem pressão: as caixas
+    mantêm `box_s` de distância entre si.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        length_s: float,
+        drives: Tuple[int, ...],
+        sensors: Tuple[_Sensor, ...] = (),
+        box_s: float = 0.6,
+    ):
+        self.name = name
+        self.length_s = length_s
+        self.drives = drives
+        self.sensors = sensors
+        self.box_s = box_s
+        self.boxes: List[SimBox] = []  # [0] = a mais adiantada
+
+    def running(self, di: List[int]) -> bool:
+        return any(di[d] for d in self.drives)
+
+    def can_accept(self, pos: float = 0.0) -> bool:
+        return not self.boxes or self.boxes[-1].pos - pos >= self.box_s
+
+    def accept(self, box: SimBox, pos: float = 0.0, now: float = 0.0) -> None:
+        box.pos = pos
+        box.move_to(self.name, now)
+        self.boxes.append(box)
+
+    def head(self, tol: float = 0.0) -> Optional[SimBox]:
+        """Caixa no fim do trecho (ou a menos de `tol` segundos dele)."""
+        if self.boxes and self.boxes[0].pos >= self.length_s - tol:
+            return self.boxes[0]
+        return None
+
+    def pop_head(self) -> SimBox:
+        return self.boxes.pop(0)
+
+    def advance(self, dt: float, di: List[int]) -> None:
+        if not self.running(di):
+            return
+        limit = self.length_s
+        for b in self.boxes:
+            b.pos = max(b.pos, min(b.pos + dt, limit))
+            limit = b.pos - self.box_s
+
+    def coils(self, out: Dict[int, bool]) -> None:
+        for s in self.sensors:
+            hit = any(
+                s.start <= b.pos <= s.end and (s.colors is None or b.color in s.colors)
+                for b in self.boxes
+            )
+            out[s.coil] = out.get(s.coil, False) or (hit != s.inverted)
+
+
+class Turntable:
+    """
+    Mesa giratória com rolo: `angle` vai de 0.0 (0°) a 1.0 (90°) em `turn_s`
+    enquanto o DI de giro está ligado (e volta quando desligado). A caixa
+    sobre a mesa anda para frente (`pos` → length_s) ou para trás (→ 0).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        turn_di: int,
+        fwd_dis: Tuple[int, ...],
+        rev_dis: Tuple[int, ...],
+        length_s: float,
+        turn_s: float,
+        sensors: Tuple[_Sensor, ...] = (),
+        angle_coils: Tuple[Optional[int], Optional[int]] = (None, None),
+    ):
+        self.name = name
+        self.turn_di = turn_di
+        self.fwd_dis = fwd_dis
+        self.rev_dis = rev_dis
+        self.length_s = length_s
+        self.turn_s = turn_s
+        self.sensors = sensors
+        self.angle_coils = angle_coils
+        self.angle = 0.0
+        self.box: Optional[SimBox] = None
+        self.busy_s = 0.0  # tempo com caixa ou girando (utilização)
+
+    def direction(self, di: List[int]) -> Optional[str]:
+        fwd = any(di[d] for d in self.fwd_dis)
+        rev = any(di[d] for d in self.rev_dis)
+        if fwd and not rev:
+            return "forward"
+        if rev and not fwd:
+            return "backward"
+        return None
+
+    @property
+    def at0(self) -> bool:
+        return self.angle <= 0.0
+
+    @property
+    def at90(self) -> bool:
+        return self.angle >= 1.0
+
+    def advance(self, dt: float, di: List[int]) -> None:
+        target = 1.0 if di[self.turn_di] else 0.0
+        step = dt / self.turn_s
+        turning = self.angle != target
+        if self.angle < target:
+            self.angle = min(target, self.angle + step)
+        elif self.angle > target:
+            self.angle = max(target, self.angle - step)
+
+        if self.box is not None:
+            d = self.direction(di)
+            if d == "forward":
+                self.box.pos = min(self.length_s, self.box.pos + dt)
+            elif d == "backward":
+                self.box.pos = max(0.0, self.box.pos - dt)
+        if turning or self.box is not None:
+            self.busy_s += dt
+
+    def accept(self, box: SimBox, pos: float, now: float = 0.0) -> None:
+        box.pos = pos
+        box.move_to(self.name, now)
+        self.box = box
+
+    def coils(self, out: Dict[int, bool]) -> None:
+        for s in self.sensors:
+            hit = self.box is not None and s.start <= self.box.pos <= s.end
+            out[s.coil] = out.get(s.coil, False) or (hit != s.inverted)
+        at0_coil, at90_coil = self.angle_coils
+        if at0_coil is not None:
+            out[at0_coil] = self.at0
+        if at90_coil is not None:
+            out[at90_coil] = self.at90
+
+
+class Crane:
+    """
+    Transelevador do warehouse. Lê `posicao_alvo` (input register 0), viaja
+    até o endereço com `sensor_move_warehouse` em 1 e troca caixas com as
+    estações de E/S (garfo para fora, endereços 8 e 1) ou com o rack
+    (garfo para dentro) ao levantar/baixar o garfo.
+    """
+
+    def __init__(
+        self,
+        columns: int = 9,
+        rows: int = 6,
+        col_s: float = 0.5,
+        row_s: float = 0.6,
+        settle_s: float = 0.4,
+        fork_s: float = 1.5,
+        lift_s: float = 1.2,
+    ):
+        self.columns = columns
+        self.rows = rows
+        self.col_s = col_s
+        self.row_s = row_s
+        self.settle_s = settle_s
+        self.fork_s = fork_s
+        self.lift_s = lift_s
+
+        self.col = 0.0  # posição atual (0 = home, fora do rack)
+        self.row = 1.0
+        self.target_addr: Optional[int] = None
+        self._move_left = 0.0
+        self._from = (0.0, 1.0)
+        self._to = (0.0, 1.0)
+        self._move_total = 0.0
+
+        self.fork_out = 0.0
+        self.fork_in = 0.0
+        self.lift = 0.0
+        self.load: Optional[SimBox] = None
+        self.busy_s = 0.0
+        self.moves = 0
+
+    def address_to_cell(self, address: int) -> Tuple[float, float]:
+        if 1 <= address <= self.columns * self.rows:
+            return (
+                float((address - 1) % self.columns + 1),
+                float((address - 1) // self.columns + 1),
+            )
+        return (0.0, 1.0)  # endereços fora do rack (ex.: 300) = home
+
+    def travel_time(self, src: Tuple[float, float], dst: Tuple[float, float]) -> float:
+        dc = abs(dst[0] - src[0]) * self.col_s
+        dr = abs(dst[1] - src[1]) * self.row_s
+        if dc == 0 and dr == 0:
+            return 0.0
+        return max(dc, dr) + self.settle_s  # eixos X e Y andam juntos
+
+    @property
+    def moving(self) -> bool:
+        return self._move_left > 0
+
+    @property
+    def address(self) -> Optional[int]:
+        if self.moving or self.col < 1:
+            return None
+        return int(self.col) + (int(self.row) - 1) * self.columns
+
+    def command(self, address: int) -> None:
+        if address == self.target_addr:
+            return
+        self.target_addr = address
+        self._from = (self.col, self.row)
+        self._to = self.address_to_cell(address)
+        self._move_total = self.travel_time(self._from, self._to)
+        self._move_left = self._move_total
+        if self._move_total > 0:
+            self.moves += 1
+
+    def advance(self, dt: float) -> None:
+        if self._move_left > 0:
+            self._move_left = max(0.0, self._move_left - dt)
+            f = 1.0 - (self._move_left / self._move_total) if self._move_total else 1.0
+            self.col = self._from[0] + (self._to[0] - self._from[0]) * f
+            self.row = self._from[1] + (self._to[1] - self._from[1]) * f
+            self.busy_s += dt
+
+
+class PlantSimulator:
+    """
+    Simulador local da planta Staudinger (substitui o Factory IO).
+
+    Lê os discrete inputs escritos pelos controladores e escreve as coils dos
+    sensores no data bank do `FactoryModbusEventServer`, a cada `tick_s` do
+    relógio do servidor. Modela:
+
+    - Linhas azul/verde/vazio (Sensor_1 retrorreflexivo, Sensor_2 na chegada)
+    - TT1 com `Turntable1_FrontLimit`/`BackLimit`
+    - Esteira de produção 2 com HAL e sensores de visão
+    - TT2 (Load/Discharg), saída de estoque e as 4 esteiras até o warehouse
+    - Esteira central, TT3 (`tt3_limit_0/90`), esteira de pedido e carregamento
+    - Transelevador com `posicao_alvo` e `sensor_move_warehouse`
+
+    Caixas retiradas do rack e entregues no endereço 8 saem da simulação
+    (contadas em `delivered`) em vez de voltarem à esteira de entrada.
+
+    `crane_limits` publica fins de curso do garfo e da elevação, que a planta
+    real não tem no mapa de endereços: nome do campo do `RackConfig`
+    (`fork_out_limit`, `fork_in_limit`, `fork_middle_limit`, `lift_up_limit`,
+    `lift_down_limit`) -> coil.
+    """
+
+    EMITTERS = {
+        Inputs.Emmiter_Caixote_Azul: "BLUE",
+        Inputs.Emmiter_Caixote_Verde: "GREEN",
+        Inputs.Emmiter_Caixote_Vazio: "OTHER",
+    }
+
+    STORAGE_IO_ADDRESS = 8
+    CLIENT_IO_ADDRESS = 1
+    PICK_TOL_S = 0.3  # a esteira de E/S para com a caixa sobre o sensor, antes do fim
+
+    def __init__(
+        self,
+        server,
+        tick_s: Optional[float] = None,
+        initial_rack: Optional[Dict[int, str]] = None,
+        verbose: bool = False,
+        crane_limits: Optional[Dict[str, int]] = None,
+    ):
+        self.server = server
+        self.clock = server.clock
+        self.tick_s = tick_s if tick_s is not None else server.scan_time / 2
+        self.verbose = verbose
+        self.crane_limits = dict(crane_limits or {})
+
+        self._th: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._prev_di: List[int] = [0] * 128
+        self._written: Dict[int, bool] = {}
+        self._held: Dict[int, bool] = {}  # botões pressionados via press()/set_coil()
+
+        self.boxes: Dict[int, SimBox] = {}
+        self.rack: Dict[int, SimBox] = {}
+        self.delivered: List[SimBox] = []
+        self.stored: List[Tuple[float, SimBox, int]] = []  # (instante, caixa, endereço)
+
+        self._build()
+        for addr, color in (initial_rack or {}).items():
+            box = self._new_box(color)
+            box.move_to(f"rack:{addr}", box.created_at)
+            self.rack[addr] = box
+
+    # -------- layout --------
+    def _build(self) -> None:
+        S = _Sensor
+        self.line_blue = Conveyor(
+            "linha_azul",
+            5.0,
+            (Inputs.Caixote_Azul_Esteira_1, Inputs.Caixote_Azul_Esteira_2),
+            (S(Coils.Sensor_1_Caixote_Azul, 0.0, 0.6, inverted=True),
+             S(Coils.Sensor_2_Caixote_Azul, 4.7, 5.0)),
+        )
+        self.line_green = Conveyor(
+            "linha_verde",
+            6.0,
+            (
+                Inputs.Caixote_Verde_Esteira_1,
+                Inputs.Caixote_Verde_Esteira_2,
+                Inputs.Caixote_Verde_Esteira_3,
+                Inputs.Caixote_Verde_Esteira_4,
+            ),
+            (S(Coils.Sensor_1_Caixote_Verde, 0.0, 0.6, inverted=True),
+             S(Coils.Sensor_2_Caixote_Verde, 5.7, 6.0)),
+        )
+        self.line_other = Conveyor(
+            "linha_vazio",
+            6.0,
+            (
+                Inputs.Caixote_Vazio_Esteira_1,
+                Inputs.Caixote_Vazio_Esteira_2,
+                Inputs.Caixote_Vazio_Esteira_3,
+                Inputs.Caixote_Vazio_Esteira_4,
+            ),
+            (S(Coils.Sensor_1_Caixote_Vazio, 0.0, 0.6, inverted=True),
+             S(Coils.Sensor_2_Caixote_Vazio, 5.7, 6.0)),
+        )
+        self.tt1 = Turntable(
+            "tt1",
+            Inputs.Turntable1_turn,
+            (Inputs.Turntable1_Esteira_SaidaEntrada,),
+            (Inputs.Turntable1_Esteira_EntradaSaida,),
+            length_s=1.5,
+            turn_s=1.5,
+            sensors=(
+                S(Coils.Turntable1_FrontLimit, 0.0, 0.1),
+                S(Coils.Turntable1_BackLimit, 1.4, 1.5),
+            ),
+        )
+        self.prod2 = Conveyor(
+            "producao_2",
+            6.0,
+            (Inputs.Esteira_Producao_2,),
+            (
+                S(Coils.Sensor_Hall, 3.0, 3.3),
+                S(Coils.Vision_Blue, 2.9, 3.8, colors=("BLUE",)),
+                S(Coils.Vision_Green, 2.9, 3.8, colors=("GREEN",)),
+            ),
+        )
+        self.tt2 = Turntable(
+            "tt2",
+            Inputs.Turntable2_turn,
+            (Inputs.Discharg_turn, Inputs.Load_turn),
+            (),
+            length_s=1.5,
+            turn_s=1.5,
+            sensors=(
+                S(Coils.Load_Sensor, 0.0, 0.4),
+                S(Coils.Discharg_Sensor, 1.2, 1.5),
+            ),
+        )
+        self.estoque = Conveyor(
+            "estoque",
+            4.0,
+            (Inputs.Esteira_Estoque,),
+            (S(Coils.Sensor_Final_Producao, 0.0, 0.5), S(Coils.sensor_hall_1_0, 3.7, 4.0)),
+        )
+        self.storage = [
+            Conveyor(
+                "conveyor_storage_1",
+                3.0,
+                (Inputs.conveyor_storage_1,),
+                (S(Coils.is_box_conveyor_1, 1.3, 1.7), S(Coils.sensor_conveyor_storage_1, 2.7, 3.0)),
+            ),
+            Conveyor(
+                "conveyor_storage_2",
+                3.0,
+                (Inputs.conveyor_storage_2,),
+                (S(Coils.is_box_conveyor_2, 1.3, 1.7), S(Coils.sensor_conveyor_storage_2, 2.7, 3.0)),
+            ),
+            Conveyor(
+                "conveyor_storage_3",
+                3.0,
+                (Inputs.conveyor_storage_3,),
+                (S(Coils.is_box_conveyor_3, 1.3, 1.7), S(Coils.sensor_conveyor_storage_3, 2.7, 3.0)),
+            ),
+            Conveyor(
+                "conveyor_storage_4",
+                3.0,
+                (Inputs.conveyor_storage_4,),
+                (S(Coils.sensor_storage_warehouse, 2.7, 3.0),),
+            ),
+        ]
+        self.central = Conveyor(
+            "central",
+            4.0,
+            (Inputs.Esteira_Central,),
+            (S(Coils.SENSOR_TT2, 3.7, 4.0),),
+        )
+        self.tt3 = Turntable(
+            "tt3",
+            Inputs.Turntable3_turn,
+            (Inputs.Turntable3_forward,),
+            (),
+            length_s=1.5,
+            turn_s=1.5,
+            sensors=(S(Coils.SENSOR_TT3, 0.6, 1.5),),
+            angle_coils=(Coils.tt3_limit_0, Coils.tt3_limit_90),
+        )
+        self.pedido = Conveyor(
+            "pedido",
+            9.0,
+            (Inputs.ESTEIRA_PEDIDO,),
+            (
+                S(Coils.SENSOR_HALL_1_6, 1.0, 1.3),
+                S(Coils.SENSOR_HALL_1_5, 4.0, 4.3),
+                S(Coils.SENSOR_HALL_1_4, 8.7, 9.0),
+            ),
+        )
+        self.carregamento = Conveyor(
+            "carregamento",
+            3.0,
+            (Inputs.ESTEIRA_CARREGAMENTO,),
+            (S(Coils.SENSOR_WAREHOUSE, 2.7, 3.0),),
+        )
+        self.crane = Crane()
+
+        self.conveyors = [
+            self.line_blue,
+            self.line_green,
+            self.line_other,
+            self.prod2,
+            self.estoque,
+            *self.storage,
+            self.central,
+            self.pedido,
+            self.carregamento,
+        ]
+        self.tables = [self.tt1, self.tt2, self.tt3]
+
+    # -------- lifecycle --------
+    def power_on(self) -> None:
+        """Escreve o estado inicial dos sensores (Emergency NF liberado, linhas vazias)."""
+        with self._lock:
+            self._held[Coils.Emergency] = True
+            self._write_coils(self._sensor_image())
+
+    def start(self) -> None:
+        if self._th and self._th.is_alive():
+            return
+        self._stop.clear()
+        self.power_on()
+        self._th = threading.Thread(target=self._loop, name="plant-sim", daemon=True)
+        self._th.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._th:
+            self._th.join(timeout=2.0)
+
+    # -------- operador --------
+    def set_coil(self, coil: int, value: bool) -> None:
+        """Mantém uma coil de botão no valor informado."""
+        with self._lock:
+            self._held[coil] = bool(value)
+            self._write_coils({coil: bool(value)})
+
+    def press(self, coil: int, hold_s: float = 0.3) -> None:
+        """Pulso em um botão (bloqueia `hold_s` no relógio do servidor)."""
+        self.set_coil(coil, True)
+        self.clock.sleep(hold_s)
+        self.set_coil(coil, False)
+
+    def emit(self, color: str) -> Optional[SimBox]:
+        """Coloca uma caixa no início da linha da cor (como o emitter do Factory IO)."""
+        line = {"BLUE": self.line_blue, "GREEN": self.line_green}.get(
+            color.upper(), self.line_other
+        )
+        with self._lock:
+            if not line.can_accept():
+                return None
+            box = self._new_box(color.upper())
+            line.accept(box, now=box.created_at)
+            return box
+
+    # -------- loop --------
+    def _loop(self) -> None:
+        last = self.clock.monotonic()
+        while not self._stop.is_set():
+            self.clock.sleep(self.tick_s)
+            now = self.clock.monotonic()
+            self.step(now - last)
+            last = now
+
+    def step(self, dt: float) -> None:
+        """Avança a planta `dt` segundos e publica os sensores."""
+        db = self.server._db()
+        di = list(db.get_discrete_inputs(0, 128) or [0] * 128)
+        target = (db.get_input_registers(Holding_Registers.posicao_alvo, 1) or [0])[0]
+
+        with self._lock:
+            for addr, color in self.EMITTERS.items():
+                if di[addr] and not self._prev_di[addr]:
+                    line = {"BLUE": self.line_blue, "GREEN": self.line_green}.get(
+                        color, self.line_other
+                    )
+                    if line.can_accept():
+                        box = self._new_box(color)
+                        line.accept(box, now=box.created_at)
+            self._prev_di = di
+
+            for c in self.conveyors:
+                c.advance(dt, di)
+            for t in self.tables:
+                t.advance(dt, di)
+            self._transfer(di)
+            self._crane_step(dt, di, target)
+            self._write_coils(self._sensor_image())
+
+    # -------- transferências entre trechos --------
+    def _transfer(self, di: List[int]) -> None:
+        tt1, tt2, tt3 = self.tt1, self.tt2, self.tt3
+        now = self.clock.monotonic()
+
+        # linhas -> TT1 (azul alinhada em 0°, verde/vazio em 90°)
+        if tt1.box is None:
+            d = tt1.direction(di)
+            if tt1.at0 and d == "forward" and self.line_blue.head():
+                tt1.accept(self.line_blue.pop_head(), 0.0, now)
+            elif tt1.at90 and d == "forward" and self.line_green.head():
+                tt1.accept(self.line_green.pop_head(), 0.0, now)
+            elif tt1.at90 and d == "backward" and self.line_other.head():
+                tt1.accept(self.line_other.pop_head(), tt1.length_s, now)
+
+        # TT1 (0°, para frente) -> produção 2
+        if (
+            tt1.box is not None
+            and tt1.at0
+            and tt1.direction(di) == "forward"
+            and tt1.box.pos >= tt1.length_s
+            and self.prod2.running(di)
+            and self.prod2.can_accept()
+        ):
+            self.prod2.accept(tt1.box, now=now)
+            tt1.box = None
+
+        # produção 2 -> TT2
+        if tt2.box is None and tt2.at0 and tt2.direction(di) == "forward" and self.prod2.head():
+            tt2.accept(self.prod2.pop_head(), 0.0, now)
+
+        # TT2 -> central (0°, pedido) ou estoque (90°)
+        if tt2.box is not None and tt2.box.pos >= tt2.length_s and tt2.direction(di) == "forward":
+            dest = self.central if tt2.at0 else self.estoque if tt2.at90 else None
+            if dest is not None and dest.running(di) and dest.can_accept():
+                dest.accept(tt2.box, now=now)
+                tt2.box = None
+
+        # cadeia até o warehouse: estoque -> storage 1..4
+        chain = [self.estoque, *self.storage]
+        for src, dst in zip(chain[-2::-1], chain[:0:-1]):
+            if src.head() and src.running(di) and dst.running(di) and dst.can_accept():
+                dst.accept(src.pop_head(), now=now)
+
+        # central -> TT3 (0°) ; TT3 (90°) -> pedido
+        if tt3.box is None and tt3.at0 and tt3.direction(di) == "forward" and self.central.head():
+            tt3.accept(self.central.pop_head(), 0.0, now)
+        if (
+            tt3.box is not None
+            and tt3.at90
+            and tt3.direction(di) == "forward"
+            and tt3.box.pos >= tt3.length_s
+            and self.pedido.running(di)
+            and self.pedido.can_accept()
+        ):
+            self.pedido.accept(tt3.box, now=now)
+            tt3.box = None
+
+        # pedido -> carregamento
+        if (
+            self.pedido.head()
+            and self.pedido.running(di)
+            and self.carregamento.running(di)
+            and self.carregamento.can_accept()
+        ):
+            self.carregamento.accept(self.pedido.pop_head(), now=now)
+
+    # -------- transelevador --------
+    def _crane_step(self, dt: float, di: List[int], target: int) -> None:
+        crane = self.crane
+        if target:
+            crane.command(target)
+        crane.advance(dt)
+
+        def _toward(value: float, on: bool, span: float) -> float:
+            step = dt / span
+            return min(1.0, value + step) if on else max(0.0, value - step)
+
+        lift_before = crane.lift
+        crane.fork_out = _toward(crane.fork_out, bool(di[Inputs.manejador_fora]), crane.fork_s)
+        crane.fork_in = _toward(crane.fork_in, bool(di[Inputs.manejador_dentro]), crane.fork_s)
+        crane.lift = _toward(crane.lift, bool(di[Inputs.manejador_levantar]), crane.lift_s)
+        if crane.fork_out > 0 or crane.fork_in > 0:
+            crane.busy_s += 0.0 if crane.moving else dt
+
+        addr = crane.address
+        if addr is None:
+            return
+        lifted = lift_before < 1.0 <= crane.lift
+        lowered = lift_before > 0.0 >= crane.lift
+
+        if lifted and crane.load is None:
+            if crane.fork_out >= 1.0:
+                src = {
+                    self.STORAGE_IO_ADDRESS: self.storage[-1],
+                    self.CLIENT_IO_ADDRESS: self.carregamento,
+                }.get(addr)
+                if src is not None and src.head(tol=self.PICK_TOL_S):
+                    crane.load = src.pop_head()
+            elif crane.fork_in >= 1.0 and addr in self.rack:
+                crane.load = self.rack.pop(addr)
+            if crane.load is not None:
+                crane.load.move_to("crane", self.clock.monotonic())
+
+        elif lowered and crane.load is not None:
+            box, now = crane.load, self.clock.monotonic()
+            if crane.fork_in >= 1.0 and addr not in self.rack:
+                box.move_to(f"rack:{addr}", now)
+                self.rack[addr] = box
+                self.stored.append((now, box, addr))
+                crane.load = None
+            elif crane.fork_out >= 1.0:
+                box.move_to("delivered", now)
+                self.delivered.append(box)
+                crane.load = None
+
+    # -------- coils --------
+    def _sensor_image(self) -> Dict[int, bool]:
+        out: Dict[int, bool] = {}
+        for c in self.conveyors:
+            c.coils(out)
+        for t in self.tables:
+            t.coils(out)
+        out[Coils.sensor_move_warehouse] = self.crane.moving
+        if self.crane_limits:
+            crane = self.crane
+            state = {
+                "fork_out_limit": crane.fork_out >= 1.0,
+                "fork_in_limit": crane.fork_in >= 1.0,
+                "fork_middle_limit": crane.fork_out <= 0.0 and crane.fork_in <= 0.0,
+                "lift_up_limit": crane.lift >= 1.0,
+                "lift_down_limit": crane.lift <= 0.0,
+            }
+            for name, coil in self.crane_limits.items():
+                out[coil] = state[name]
+        out.update(self._held)
+        return out
+
+    def _write_coils(self, values: Dict[int, bool]) -> None:
+        db = self.server._db()
+        for coil, v in values.items():
+            if self._written.get(coil) != v:
+                db.set_coils(coil, [1 if v else 0])
+                self._written[coil] = v
+
+    def _new_box(self, color: str) -> SimBox:
+        box = SimBox(id=self._next_id, color=color, created_at=self.clock.monotonic())
+        self._next_id += 1
+        self.boxes[box.id] = box
+        return box
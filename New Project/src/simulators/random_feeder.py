@@ -1,7 +1,6 @@
 # simulators/random_feeder.py
 import random
 import threading
-import time
 from typing import Optional, Iterable, Tuple
 from addresses import Esteiras, Inputs  # seus DIs
 
@@ -37,7 +36,7 @@ class RandomFeeder:
 
     def _pulse(self, di_addr: int):
         self.server.set_actuator(di_addr, True)
-        time.sleep(self.pulse_ms / 1000.0)
+        self.server.clock.sleep(self.pulse_ms / 1000.0)
         self.server.set_actuator(di_addr, False)
 
     def _pulse_combo(self, items: Iterable[Tuple[int, int]]):
@@ -49,15 +48,15 @@ class RandomFeeder:
         min_off = min((off for _, off in items), default=0)
 
         # 2) defina um "marco" no futuro que garanta que até o menor offset tenha tempo
-        base = time.time() + max(0.0, (-min_off) / 1000.0)
+        base = self.server.clock.time() + max(0.0, (-min_off) / 1000.0)
 
         threads = []
 
         def _runner(addr: int, off_ms: int):
             fire_at = base + (off_ms / 1000.0)
-            delay = fire_at - time.time()
+            delay = fire_at - self.server.clock.time()
             if delay > 0:
-                time.sleep(delay)
+                self.server.clock.sleep(delay)
             self._pulse(addr)
 
         for addr, off_ms in items:
@@ -91,14 +90,14 @@ class RandomFeeder:
                     (addr, off) for (addr, off) in self.combos[pick] if addr is not None
                 ]
 
-                now = time.time()
+                now = self.server.clock.time()
                 if now - last < min_gap:
-                    time.sleep(min_gap - (now - last))
+                    self.server.clock.sleep(min_gap - (now - last))
 
                 if combo:
                     if getattr(self.server, "verbose", False):
                         print(f"[feeder] {pick} -> {combo}")
                     self._pulse_combo(combo)
-                    last = time.time()
+                    last = self.server.clock.time()
 
-            time.sleep(random.uniform(*self.period_s))
+            self.server.clock.sleep(random.uniform(*self.period_s))
@@ -18,3 +18,20 @@ class Stoppable:
     def stop(self) -> None:
         self._stop_evt.set()
 
+
+
+def pack_bits(values) -> int:
+    """Empacota uma sequência de coils (0/1, bool) em um inteiro (bit i = endereço i)."""
+    word = 0
+    for i, v in enumerate(values):
+        if v:
+            word |= 1 << i
+    return word
+
+
+def iter_set_bits(word: int):
+    """Itera os índices dos bits em 1 de ``word``, do menor para o maior."""
+    while word:
+        low = word & -word
+        yield low.bit_length() - 1
+        word ^= low